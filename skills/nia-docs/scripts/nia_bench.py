@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Client-side benchmarks for nia_docs.py against the local stand-in server.
+
+Starts nia_standin.py on a free port and measures requests/sec, p50/p95
+latency and peak Python memory for each scenario:
+
+- single:     sequential status lookups (per-request overhead)
+- concurrent: parallel universal searches on the shared pool
+- batch:      JSONL batch of page reads through ``run_batch``
+- stream:     SSE event streams (ops are events)
+- tree:       large repository trees, walked with ``iter_tree_files``
+- replay:     the single scenario answered from a cassette (no network)
+
+Usage:
+  python scripts/nia_bench.py
+  python scripts/nia_bench.py --scenarios single,tree --tree-files 100000
+  python scripts/nia_bench.py --json after.json --compare before.json
+
+Requires: aiohttp
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import nia_docs
+from nia_docs import Cassette, LatencyHistory, NiaClient, RateLimiter, Tracer, percentile
+
+SCENARIOS = ("single", "concurrent", "batch", "stream", "tree", "replay")
+
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+
+async def bench_single(client: NiaClient, args) -> int:
+    for i in range(args.requests):
+        await client.repos_status(f"repo-{i % 10}")
+    return args.requests
+
+
+async def bench_concurrent(client: NiaClient, args) -> int:
+    await asyncio.gather(*(client.search_universal(f"query {i}") for i in range(args.requests)))
+    return args.requests
+
+
+async def bench_batch(client: NiaClient, args) -> int:
+    jobs = "".join(
+        json.dumps({"op": "sources_read", "source_id": "src-1", "path": f"page-{i}.md"}) + "\n"
+        for i in range(args.requests)
+    )
+    counts = await nia_docs.run_batch(client, io.StringIO(jobs), args.concurrency, io.StringIO())
+    return counts["ok"]
+
+
+async def bench_stream(client: NiaClient, args) -> int:
+    events = 0
+    for i in range(args.streams):
+        async for _ in client.stream_events("GET", f"/v2/oracle/jobs/job-{i}/events"):
+            events += 1
+    return events
+
+
+async def bench_tree(client: NiaClient, args) -> int:
+    for i in range(args.trees):
+        tree = await client.repos_tree(f"repo-{i}")
+        files = sum(1 for _ in nia_docs.iter_tree_files(tree))
+        if files != args.tree_files:
+            raise RuntimeError(f"tree has {files} files, expected {args.tree_files}")
+    return args.trees
+
+
+async def bench_replay(client: NiaClient, args) -> int:
+    return await bench_single(client, args)
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+
+def start_standin(args) -> tuple:
+    """Launch the stand-in server; returns the process and its base URL."""
+    script = Path(__file__).with_name("nia_standin.py")
+    command = [
+        sys.executable,
+        str(script),
+        "--port=0",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+        f"--error-rate={args.error_rate}",
+        f"--tree-files={args.tree_files}",
+        f"--content-bytes={args.content_bytes}",
+        f"--events={args.events}",
+    ]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError("stand-in server failed to start")
+    return proc, line.split()[-1]
+
+
+async def run_scenario(name: str, base_url: str, args, cassette: Cassette = None) -> dict:
+    """Run one scenario twice: once timed, once under tracemalloc for peak memory."""
+    scenario = globals()[f"bench_{name}"]
+    result = {"scenario": name}
+    for measure_memory in (False, True):
+        tracer = Tracer()
+        if measure_memory:
+            tracemalloc.start()
+        async with NiaClient(
+            api_key="bench",
+            base_url=base_url,
+            limit_per_host=args.concurrency,
+            limiter=RateLimiter(0),
+            tracer=tracer,
+            cassette=Cassette(cassette.path) if cassette else None,
+            # Stand-in latencies must not feed the real hedge thresholds
+            latency=LatencyHistory(args.latency_file),
+        ) as client:
+            started = time.perf_counter()
+            ops = await scenario(client, args)
+            elapsed = time.perf_counter() - started
+        if measure_memory:
+            result["peak_mib"] = round(tracemalloc.get_traced_memory()[1] / 1024**2, 2)
+            tracemalloc.stop()
+            continue
+        latencies = [span["ms"] for span in tracer.spans if span["type"] == "request"]
+        result.update(
+            ops=ops,
+            seconds=round(elapsed, 3),
+            ops_per_sec=round(ops / elapsed, 1),
+            p50_ms=round(percentile(latencies, 50), 2) if latencies else None,
+            p95_ms=round(percentile(latencies, 95), 2) if latencies else None,
+        )
+    return result
+
+
+async def record_cassette(base_url: str, args, path: str) -> Cassette:
+    """Record the single scenario so the replay scenario can run offline."""
+    cassette = Cassette(path, "record")
+    async with NiaClient(
+        api_key="bench", base_url=base_url, limiter=RateLimiter(0), cassette=cassette
+    ) as client:
+        await bench_single(client, args)
+    return cassette
+
+
+def print_table(results: list, baseline: dict) -> None:
+    print(
+        f"{'scenario':<12} {'ops':>7} {'seconds':>8} {'ops/s':>9} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'peak MiB':>9}"
+    )
+    for r in results:
+        p50 = f"{r['p50_ms']:.2f}" if r["p50_ms"] is not None else "-"
+        p95 = f"{r['p95_ms']:.2f}" if r["p95_ms"] is not None else "-"
+        line = (
+            f"{r['scenario']:<12} {r['ops']:>7} {r['seconds']:>8.3f} {r['ops_per_sec']:>9.1f} "
+            f"{p50:>8} {p95:>8} {r['peak_mib']:>9.2f}"
+        )
+        before = baseline.get(r["scenario"])
+        if before:
+            change = (r["ops_per_sec"] - before["ops_per_sec"]) / before["ops_per_sec"] * 100
+            line += f"   ops/s {change:+.1f}% vs baseline"
+        print(line)
+
+
+async def run(args) -> list:
+    proc, base_url = start_standin(args)
+    try:
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            args.latency_file = f"{tmp}/latency.json"
+            for name in args.scenarios:
+                cassette = None
+                if name == "replay":
+                    cassette = await record_cassette(base_url, args, f"{tmp}/cassette.jsonl")
+                results.append(await run_scenario(name, base_url, args, cassette))
+                print(f"  {name} done", file=sys.stderr)
+        return results
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark nia_docs.py against a local stand-in")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Pool size / batch workers")
+    parser.add_argument("--streams", type=int, default=20, help="Streams in the stream scenario")
+    parser.add_argument("--events", type=int, default=200, help="Events per stream")
+    parser.add_argument("--trees", type=int, default=5, help="Tree fetches in the tree scenario")
+    parser.add_argument("--tree-files", type=int, default=20000, help="Files per tree")
+    parser.add_argument("--content-bytes", type=int, default=4096, help="Size of page content")
+    parser.add_argument("--latency", type=float, default=2, help="Server latency in ms")
+    parser.add_argument("--jitter", type=float, default=1, help="Server latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction answered 429")
+    parser.add_argument("--json", metavar="FILE", help="Write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="Show ops/s change against a --json run")
+    args = parser.parse_args()
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["scenario"]: r for r in json.load(f)}
+
+    results = asyncio.run(run(args))
+    print_table(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Thin client for the nia_docs.py daemon.
+
+Forwards its arguments to a resident ``nia_docs.py serve`` process over a
+Unix socket, starting the daemon on first use. The daemon keeps aiohttp
+imported, the API key loaded and connections warm, so short calls skip the
+interpreter and import start-up of a full nia_docs.py run. Commands the
+daemon cannot serve (stdin input, local paths, --trace/--record/--replay)
+run in-process through nia_docs.py instead.
+
+Usage:
+  python scripts/nia_client.py search universal "authentication middleware"
+  python scripts/nia_client.py repos tree owner/repo
+
+Only the standard library is imported here; keep it that way.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+
+NIA_DOCS = Path(__file__).with_name("nia_docs.py")
+
+# Same default as nia_docs.DAEMON_SOCKET
+CACHE_DIR = Path(
+    os.environ.get("NIA_CACHE_DIR")
+    or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "nia-docs"
+)
+SOCKET_PATH = Path(os.environ.get("NIA_DAEMON_SOCKET") or CACHE_DIR / "daemon.sock")
+
+# Same list as nia_docs.DAEMON_ENV_VARS
+ENV_VARS = (
+    "NIA_POOL_LIMIT",
+    "NIA_POOL_PER_HOST",
+    "NIA_CACHE_MAX_MB",
+    "NIA_RATE_LIMIT",
+    "NIA_RESEARCH_TTL",
+    "NIA_PREFETCH_PAGES",
+    "NIA_PREFETCH_BYTES",
+)
+
+START_TIMEOUT = 10.0
+
+
+def load_api_key() -> str:
+    """The API key nia_docs.py would use here: the environment, then the nearest
+    ``.env`` up to five levels above the working directory, then ``~/.claude/.env``."""
+    if os.environ.get("NIA_API_KEY"):
+        return os.environ["NIA_API_KEY"]
+    cwd = Path.cwd().resolve()
+    candidates = [parent / ".env" for parent in [cwd, *cwd.parents][:6]]
+    candidates.append(Path.home() / ".claude" / ".env")
+    for env_path in candidates:
+        if env_path.exists():
+            with open(env_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("NIA_API_KEY="):
+                        return line.split("=", 1)[1].strip("\"'")
+    return ""
+
+
+def connect():
+    """Connect to the daemon, starting it if nothing is listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(SOCKET_PATH))
+        return sock
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, str(NIA_DOCS), "serve"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            sock.connect(str(SOCKET_PATH))
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.02)
+    sock.close()
+    return None
+
+
+def run_local(argv: list) -> None:
+    """Replace this process with a direct nia_docs.py run."""
+    os.execv(sys.executable, [sys.executable, str(NIA_DOCS), *argv])
+
+
+def main():
+    argv = [arg for arg in sys.argv[1:] if not arg.endswith(".py")]
+    if not argv or argv[0] in ("-h", "--help", "serve"):
+        run_local(argv)
+
+    sock = connect()
+    if sock is None:
+        print("nia daemon did not start; running directly", file=sys.stderr)
+        run_local(argv)
+
+    # The daemon pools clients per key and URL, and hands back a different cache
+    # dir or tunables
+    request = {
+        "argv": argv,
+        "api_key": load_api_key(),
+        "api_url": os.environ.get("NIA_API_URL"),
+        "cache_dir": str(CACHE_DIR),
+        "env": {name: os.environ[name] for name in ENV_VARS if name in os.environ},
+    }
+    with sock, sock.makefile("rb") as frames:
+        sock.sendall((json.dumps(request) + "\n").encode())
+        for line in frames:
+            frame = json.loads(line)
+            if "out" in frame:
+                sys.stdout.write(frame["out"])
+                sys.stdout.flush()
+            elif "err" in frame:
+                sys.stderr.write(frame["err"])
+                sys.stderr.flush()
+            elif frame.get("local"):
+                run_local(argv)
+            elif "exit" in frame:
+                sys.exit(frame["exit"])
+    print("Error: nia daemon closed the connection", file=sys.stderr)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:
+        # The reader went away (e.g. output piped into head); discard the rest quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
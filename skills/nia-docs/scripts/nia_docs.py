@@ -57,20 +57,45 @@ Usage Examples:
   # Search contexts
   uv run python -m runtime.harness scripts/nia_docs.py context search "embeddings"
 
+  # Run many operations concurrently from a JSONL job file (NDJSON results)
+  uv run python -m runtime.harness scripts/nia_docs.py batch jobs.jsonl --concurrency 16
+
 Requires: NIA_API_KEY environment variable
 """
 
 import argparse
 import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
 import json
 import os
 import sys
+import time
 from pathlib import Path
-from typing import List
+from typing import List, NamedTuple, Optional
 
 # API base URL
 NIA_API_URL = os.environ.get("NIA_API_URL", "https://apigcp.trynia.ai")
 
+# Connection pool sizing (total connections / connections per API host)
+NIA_POOL_LIMIT = int(os.environ.get("NIA_POOL_LIMIT", "100"))
+NIA_POOL_PER_HOST = int(os.environ.get("NIA_POOL_PER_HOST", "16"))
+
+# Local state (response cache, ...) lives under the user cache directory
+NIA_CACHE_DIR = Path(
+    os.environ.get("NIA_CACHE_DIR")
+    or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "nia-docs"
+)
+NIA_CACHE_MAX_MB = int(os.environ.get("NIA_CACHE_MAX_MB", "256"))
+
+# Client-side request pacing (requests/second, 0 disables)
+NIA_RATE_LIMIT = float(os.environ.get("NIA_RATE_LIMIT", "10"))
+
+# Lifetime of cached Oracle and deep research results, in seconds
+NIA_RESEARCH_TTL = float(os.environ.get("NIA_RESEARCH_TTL", "86400"))
+
 
 def load_api_key() -> str:
     """Load API key from environment or .env file."""
@@ -99,7 +124,9 @@ def load_api_key() -> str:
     return ""
 
 
+_key_load_started = time.perf_counter()
 NIA_API_KEY = load_api_key()
+KEY_LOAD_SECONDS = time.perf_counter() - _key_load_started
 
 
 def get_headers() -> dict:
@@ -108,755 +135,4902 @@ def get_headers() -> dict:
 
 
 # =============================================================================
-# ORACLE RESEARCH API
+# JSON CODEC
 # =============================================================================
 
+try:
+    import orjson  # optional: several times faster than the json module
+except ImportError:
+    orjson = None
 
-async def oracle_research(
-    query: str,
-    repositories: list[str] = None,
-    data_sources: list[str] = None,
-    output_format: str = None,
-    model: str = "claude-opus-4-5-20251101",
-) -> dict:
-    """Oracle autonomous research agent (Pro only).
 
-    Args:
-        query: Research question to investigate
-        repositories: Optional list of repository identifiers
-        data_sources: Optional list of documentation source IDs
-        output_format: Optional format specification
-        model: Model to use (claude-opus-4-5-20251101, claude-sonnet-4-5-20250929, claude-sonnet-4-5-1m)
+def loads_json(data):
+    """Decode JSON from bytes or str, with orjson when it is installed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
 
-    Returns:
-        Research report with citations, tool calls, iterations, duration
+
+def dumps_json(obj, indent: bool = False) -> str:
+    """Encode JSON (2-space indented if ``indent``), with orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=str, option=option).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the json module copes
+    return json.dumps(obj, indent=2 if indent else None, default=str)
+
+
+def truncated_json(obj, limit: int) -> str:
+    """Indented JSON for ``obj`` cut at ``limit`` characters.
+
+    Encodes incrementally and stops once ``limit`` is reached, so a large
+    response is never rendered in full just to show its beginning.
     """
-    import aiohttp
+    parts, size = [], 0
+    for chunk in json.JSONEncoder(indent=2, default=str).iterencode(obj):
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return "".join(parts)[:limit]
 
-    url = f"{NIA_API_URL}/v2/oracle"
-    payload = {"query": query, "model": model}
 
-    if repositories:
-        payload["repositories"] = repositories
-    if data_sources:
-        payload["data_sources"] = data_sources
-    if output_format:
-        payload["output_format"] = output_format
+# =============================================================================
+# RESPONSE CACHE
+# =============================================================================
 
-    async with aiohttp.ClientSession() as session:
-        timeout = aiohttp.ClientTimeout(total=300)  # 5 min for deep research
-        async with session.post(url, headers=get_headers(), json=payload, timeout=timeout) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+# Literal path segments of the v2 routes; any other segment is an identifier.
+ROUTE_SEGMENTS = frozenset(
+    {
+        "v2",
+        "oracle",
+        "stream",
+        "sessions",
+        "messages",
+        "chat",
+        "jobs",
+        "events",
+        "search",
+        "query",
+        "web",
+        "deep",
+        "universal",
+        "package-search",
+        "hybrid",
+        "grep",
+        "repositories",
+        "rename",
+        "tree",
+        "content",
+        "data-sources",
+        "ls",
+        "read",
+        "research-papers",
+        "contexts",
+        "semantic-search",
+    }
+)
+
+# POST routes that only read data. Every other non-GET request is a mutation.
+READ_ONLY_ROUTES = frozenset(
+    {
+        "POST /v2/search/query",
+        "POST /v2/search/web",
+        "POST /v2/search/universal",
+        "POST /v2/package-search/hybrid",
+        "POST /v2/package-search/grep",
+        "POST /v2/repositories/{id}/content",
+        "POST /v2/repositories/{id}/grep",
+        "POST /v2/data-sources/{id}/content",
+        "POST /v2/data-sources/{id}/grep",
+    }
+)
+
+# Cache lifetime in seconds per route. Routes not listed are never cached.
+CACHE_TTLS = {
+    "GET /v2/oracle/sessions": 60,
+    "GET /v2/repositories": 300,
+    "GET /v2/repositories/{id}": 30,
+    "GET /v2/repositories/{id}/tree": 3600,
+    "POST /v2/repositories/{id}/content": 3600,
+    "GET /v2/data-sources": 300,
+    "GET /v2/data-sources/{id}": 30,
+    "GET /v2/data-sources/{id}/tree": 3600,
+    "GET /v2/data-sources/{id}/ls": 3600,
+    "GET /v2/data-sources/{id}/read": 3600,
+    "POST /v2/data-sources/{id}/content": 3600,
+    "GET /v2/research-papers": 300,
+    "GET /v2/contexts": 60,
+}
+
+
+def route_template(path: str) -> str:
+    """Collapse identifier segments of an API path into ``{id}``.
+
+    Repository ids such as ``owner/repo`` span several segments and collapse
+    into a single placeholder.
+    """
+    parts = []
+    for segment in path.strip("/").split("/"):
+        if segment in ROUTE_SEGMENTS:
+            parts.append(segment)
+        elif not parts or parts[-1] != "{id}":
+            parts.append("{id}")
+    return "/" + "/".join(parts)
 
 
-async def oracle_research_stream(
-    query: str,
-    repositories: list[str] = None,
-    data_sources: list[str] = None,
-    model: str = "claude-opus-4-5-20251101",
-) -> None:
-    """Oracle research with real-time streaming (Pro only). Prints events as they arrive."""
-    import aiohttp
+def is_mutation(method: str, route: str) -> bool:
+    """Whether a request (``route`` as ``"METHOD /template"``) changes server state."""
+    return method != "GET" and route not in READ_ONLY_ROUTES
 
-    url = f"{NIA_API_URL}/v2/oracle/stream"
-    payload = {"query": query, "model": model}
 
-    if repositories:
-        payload["repositories"] = repositories
-    if data_sources:
-        payload["data_sources"] = data_sources
+class ResponseCache:
+    """SQLite-backed cache of successful responses from read-only endpoints.
 
-    async with aiohttp.ClientSession() as session:
-        timeout = aiohttp.ClientTimeout(total=300)
-        async with session.post(url, headers=get_headers(), json=payload, timeout=timeout) as resp:
-            if resp.status != 200:
-                print(f"Error: {resp.status} - {await resp.text()}")
-                return
+    Entries are keyed by a hash of method, URL, params and JSON body, expire
+    per ``CACHE_TTLS``, and are evicted least-recently-used once the stored
+    size exceeds ``max_bytes``. Hit/miss counters accumulate across runs.
+    """
 
-            async for line in resp.content:
-                line = line.decode("utf-8").strip()
-                if line.startswith("data:"):
-                    print(line[5:].strip())
+    def __init__(self, path: Path = None, max_bytes: int = None):
+        self.path = Path(path) if path else NIA_CACHE_DIR / "cache.sqlite"
+        self.max_bytes = max_bytes if max_bytes is not None else NIA_CACHE_MAX_MB * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+                CREATE INDEX IF NOT EXISTS entries_path ON entries(path);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER);
+                """)
+        return self._db
+
+    @property
+    def lock_dir(self) -> Path:
+        """Where lock files of work shared through this cache (research calls) live."""
+        return self.path.parent / "locks"
+
+    @staticmethod
+    def key(method: str, url: str, params: dict = None, payload: dict = None) -> str:
+        import hashlib
+
+        material = json.dumps([method, url, params, payload], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached result for ``key``, or None if missing or expired."""
+        import zlib
+
+        now = time.time()
+        row = self.db.execute("SELECT body, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < now:
+            if row is not None:
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return loads_json(zlib.decompress(row[0]))
+
+    def put(self, key: str, path: str, result, ttl: float) -> None:
+        """Store ``result`` for ``ttl`` seconds, evicting old entries if over budget."""
+        import zlib
+
+        body = zlib.compress(dumps_json(result).encode(), 1)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries (key, path, body, size, expires, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, path, body, len(body), now + ttl, now),
+        )
+        self.evict()
+
+    def contains(self, key: str) -> bool:
+        """Whether an unexpired entry exists for ``key`` (not counted as a hit or miss)."""
+        row = self.db.execute(
+            "SELECT 1 FROM entries WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def evict(self) -> None:
+        """Drop expired entries, then least-recently-used ones until under ``max_bytes``."""
+        self.db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def invalidate(self, prefix: str) -> None:
+        """Drop every entry whose API path starts with ``prefix``."""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self.db.execute("DELETE FROM entries WHERE path LIKE ? ESCAPE '\\'", (escaped + "%",))
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes and lifetime hit/miss counters."""
+        self.flush()
+        entries, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        counters = dict(self.db.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        self.db.execute("DELETE FROM entries")
+        self.db.execute("DELETE FROM counters")
+        self.hits = self.misses = 0
+
+    def flush(self) -> None:
+        """Add this session's hit/miss counts to the persistent counters."""
+        for name, value in (("hits", self.hits), ("misses", self.misses)):
+            if value:
+                self.db.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, value),
+                )
+        self.hits = self.misses = 0
 
+    def close(self) -> None:
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
 
-async def oracle_list_sessions(limit: int = 20, offset: int = 0) -> dict:
-    """List Oracle research sessions."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/oracle/sessions"
-    params = {"limit": limit, "offset": offset}
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a research query."""
+    return " ".join(query.lower().split()).rstrip("?.! ")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+def research_key(payload: dict) -> dict:
+    """The cache identity of a research payload: normalized query, sorted scopes."""
+    key = {**payload, "query": normalize_query(payload["query"])}
+    for field in ("repositories", "data_sources"):
+        if key.get(field):
+            key[field] = sorted(key[field])
+    return key
 
-async def oracle_get_session(session_id: str) -> dict:
-    """Get Oracle research session details."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/oracle/sessions/{session_id}"
+@contextlib.asynccontextmanager
+async def file_lock(path: Path, timeout: float):
+    """Hold an exclusive ``flock`` on ``path`` for the body of the ``async with``.
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    Waiting polls, so the event loop keeps running. After ``timeout``
+    seconds the body runs without the lock rather than failing. The holder
+    deletes the lock file on the way out; a waiter that then wins the lock
+    on the deleted file sees it is gone and locks a fresh one instead.
+    """
+    import fcntl
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        locked = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(0.25)
+        try:
+            current = locked and os.stat(path).st_ino == os.fstat(fd).st_ino
+        except FileNotFoundError:
+            current = False
+        if current or not locked:
+            break
+        os.close(fd)  # the previous holder removed this file
+    try:
+        yield
+    finally:
+        if locked:
+            path.unlink(missing_ok=True)
+        os.close(fd)  # releases the lock
 
 
-async def oracle_get_messages(session_id: str) -> dict:
-    """Get Oracle session chat messages."""
-    import aiohttp
+# =============================================================================
+# RATE LIMITING AND RETRIES
+# =============================================================================
 
-    url = f"{NIA_API_URL}/v2/oracle/sessions/{session_id}/messages"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+class RateLimiter:
+    """Adaptive token bucket shared by every request of a client.
 
+    Starts at ``rate`` requests/second. Each throttling response halves the
+    rate (down to ``min_rate``) and pauses the bucket for any ``Retry-After``.
+    Each success then recovers 5% of the ceiling, so pacing settles just under
+    whatever the server tolerates. A ``rate`` of 0 disables pacing.
+    """
 
-async def oracle_chat_followup(session_id: str, message: str) -> None:
-    """Stream a follow-up chat answer for an Oracle session (SSE)."""
-    import aiohttp
+    def __init__(self, rate: float = None, burst: int = None, min_rate: float = 0.5):
+        self.max_rate = rate if rate is not None else NIA_RATE_LIMIT
+        self.rate = self.max_rate
+        self.min_rate = min(min_rate, self.max_rate) if self.max_rate > 0 else 0
+        self.capacity = burst or max(1, int(self.max_rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.max_rate <= 0:
+                    return
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttled(self, retry_after: float = None) -> None:
+        """Record a 429/503: cut the rate and honor the server's pause."""
+        if self.max_rate > 0:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def succeeded(self) -> None:
+        """Record a successful response: creep back toward the configured rate."""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that honors ``Retry-After``.
+
+    Idempotent requests (GET/PUT/DELETE and read-only POSTs) are retried on
+    throttling, gateway errors and dropped connections. Mutating POSTs such as
+    ``repos_index`` are only retried on 429, where the server has rejected the
+    request unprocessed; replaying them after a 5xx or lost connection could
+    start the same work twice.
+    """
 
-    url = f"{NIA_API_URL}/v2/oracle/sessions/{session_id}/chat"
-    payload = {"message": message}
+    RETRY_STATUSES = frozenset({429, 502, 503, 504})
+    THROTTLE_STATUSES = frozenset({429, 503})
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                print(f"Error: {resp.status} - {await resp.text()}")
-                return
+    def __init__(self, attempts: int = 4, base: float = 0.5, cap: float = 30.0):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.cap = cap
 
-            async for line in resp.content:
-                line = line.decode("utf-8").strip()
-                if line.startswith("data:"):
-                    print(line[5:].strip())
+    def should_retry(self, attempt: int, status: int, idempotent: bool) -> bool:
+        """Whether attempt number ``attempt`` (0-based) ending in ``status`` is retried.
 
+        ``status`` is None when the connection failed without a response.
+        """
+        if attempt + 1 >= self.attempts:
+            return False
+        if status is None:
+            return idempotent
+        if status == 429:
+            return True
+        return idempotent and status in self.RETRY_STATUSES
 
-async def oracle_list_jobs() -> dict:
-    """List Oracle research jobs."""
-    import aiohttp
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Seconds to wait before retrying after attempt ``attempt``."""
+        import random
 
-    url = f"{NIA_API_URL}/v2/oracle/jobs"
+        if retry_after is not None:
+            return min(self.cap, retry_after)
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+def parse_retry_after(value: str):
+    """Parse a ``Retry-After`` header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
 
-async def oracle_create_job(
-    query: str,
-    repositories: list[str] = None,
-    data_sources: list[str] = None,
-    model: str = "claude-opus-4-5-20251101",
-) -> dict:
-    """Create Oracle research job (Pro only). Returns immediately, runs async."""
-    import aiohttp
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
-    url = f"{NIA_API_URL}/v2/oracle/jobs"
-    payload = {"query": query, "model": model}
 
-    if repositories:
-        payload["repositories"] = repositories
-    if data_sources:
-        payload["data_sources"] = data_sources
+# =============================================================================
+# SERVER-SENT EVENTS
+# =============================================================================
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+class SSEEvent(NamedTuple):
+    """One dispatched server-sent event."""
 
-async def oracle_get_job(job_id: str) -> dict:
-    """Get Oracle job status and result."""
-    import aiohttp
+    event: str
+    data: str
+    id: Optional[str]
+    retry: Optional[int]
 
-    url = f"{NIA_API_URL}/v2/oracle/jobs/{job_id}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+class SSEDecoder:
+    """Incremental ``text/event-stream`` decoder.
 
+    Feed raw body chunks as they arrive; complete events are returned as soon
+    as their terminating blank line is seen. Handles multi-line ``data:``
+    fields, ``event:``/``id:``/``retry:`` fields, comments, and CR/LF/CRLF
+    line endings split across chunk boundaries.
+    """
 
-async def oracle_cancel_job(job_id: str) -> dict:
-    """Cancel Oracle research job."""
-    import aiohttp
+    def __init__(self, last_event_id: str = None, retry: int = None):
+        import codecs
+
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._data: list[str] = []
+        self._event = ""
+        self.last_event_id = last_event_id
+        # Reconnection delay in ms most recently requested by the server
+        self.retry = retry
+
+    def feed(self, chunk: bytes) -> list[SSEEvent]:
+        """Decode ``chunk`` and return the events it completes."""
+        text = self._pending + self._utf8.decode(chunk)
+        events = []
+        start = 0
+        while True:
+            cr = text.find("\r", start)
+            lf = text.find("\n", start)
+            if cr == -1 and lf == -1:
+                break
+            end = lf if cr == -1 or (lf != -1 and lf < cr) else cr
+            if text[end] == "\r":
+                if end + 1 == len(text):
+                    break  # a following "\n" may arrive in the next chunk
+                step = 2 if text[end + 1] == "\n" else 1
+            else:
+                step = 1
+            event = self._line(text[start:end])
+            if event is not None:
+                events.append(event)
+            start = end + step
+        self._pending = text[start:]
+        return events
+
+    def _line(self, line: str):
+        if not line:
+            return self._dispatch()
+        if line.startswith(":"):
+            return None
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id" and "\0" not in value:
+            self.last_event_id = value
+        elif field == "retry" and value.isdigit():
+            self.retry = int(value)
+        return None
+
+    def _dispatch(self):
+        if not self._data:
+            self._event = ""
+            return None
+        event = SSEEvent(
+            self._event or "message", "\n".join(self._data), self.last_event_id, self.retry
+        )
+        self._data = []
+        self._event = ""
+        return event
 
-    url = f"{NIA_API_URL}/v2/oracle/jobs/{job_id}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.delete(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return {"status": "cancelled", "job_id": job_id}
+def percentile(values: list, q: float):
+    """Nearest-rank percentile (``q`` in 0-100) of ``values``; None when empty."""
+    import math
 
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered) / 100) - 1))
+    return ordered[rank]
 
-async def oracle_stream_job_events(job_id: str) -> None:
-    """Stream Oracle job events (SSE)."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/oracle/jobs/{job_id}/events"
+class StreamStats:
+    """Timing of an event stream: time to first event and inter-event gaps."""
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                print(f"Error: {resp.status} - {await resp.text()}")
-                return
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_event = None
+        self.last_event = None
+        self.gaps: list[float] = []
+        self.events = 0
+        self.reconnects = 0
+
+    def record(self) -> None:
+        now = time.monotonic()
+        if self.first_event is None:
+            self.first_event = now
+        else:
+            self.gaps.append(now - self.last_event)
+        self.last_event = now
+        self.events += 1
 
-            async for line in resp.content:
-                line = line.decode("utf-8").strip()
-                if line.startswith("data:"):
-                    print(line[5:].strip())
+    def summary(self) -> dict:
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "events": self.events,
+            "reconnects": self.reconnects,
+            "first_event_ms": ms(self.first_event and self.first_event - self.started),
+            "gap_p50_ms": ms(percentile(self.gaps, 50)),
+            "gap_p95_ms": ms(percentile(self.gaps, 95)),
+            "gap_max_ms": ms(max(self.gaps) if self.gaps else None),
+            "total_ms": ms(time.monotonic() - self.started),
+        }
 
 
 # =============================================================================
-# SEARCH API
+# HEDGED REQUESTS
 # =============================================================================
 
 
-async def search_query(
-    messages: list[dict],
-    repositories: list[str] = None,
-    data_sources: List[str] = None,
-    search_mode: str = "repositories",
-    include_sources: bool = True,
-) -> dict:
-    """Query indexed repositories and documentation."""
-    import aiohttp
+class LatencyHistory:
+    """Recent request latencies per route, persisted across runs.
 
-    url = f"{NIA_API_URL}/v2/search/query"
-    payload = {"messages": messages, "search_mode": search_mode, "include_sources": include_sources}
+    Keeps the last ``window`` samples of every route in a JSON file so hedge
+    thresholds start from real data instead of re-learning each process.
+    """
 
-    if repositories:
-        payload["repositories"] = repositories
-    if data_sources:
-        payload["data_sources"] = data_sources
+    def __init__(self, path: Path = None, window: int = 200):
+        self.path = Path(path) if path else NIA_CACHE_DIR / "latency.json"
+        self.window = window
+        self.samples: dict[str, list[float]] = {}
+        self.new: dict[str, list[float]] = {}
+        if self.path.exists():
+            try:
+                self.samples = json.loads(self.path.read_text())
+            except ValueError:
+                self.samples = {}
+
+    def record(self, route: str, seconds: float) -> None:
+        for store in (self.samples, self.new):
+            store.setdefault(route, []).append(round(seconds, 4))
+        del self.samples[route][: -self.window]
+
+    def p95(self, route: str, min_samples: int = 20):
+        samples = self.samples.get(route, [])
+        return percentile(samples, 95) if len(samples) >= min_samples else None
+
+    def save(self) -> None:
+        """Merge this run's samples into the file (other processes may have written too)."""
+        if not self.new:
+            return
+        current = {}
+        if self.path.exists():
+            try:
+                current = json.loads(self.path.read_text())
+            except ValueError:
+                pass
+        for route, samples in self.new.items():
+            current[route] = (current.get(route, []) + samples)[-self.window :]
+        write_atomic(self.path, json.dumps(current))
+        self.new = {}
+
+
+class HedgePolicy:
+    """When to send a duplicate of a slow read-only request.
+
+    A request that has not answered within its route's recorded p95 latency
+    is duplicated; the first successful response wins and the other is
+    cancelled. At most ``max_extra`` (a fraction of eligible requests) may be
+    hedged, which bounds the added load to roughly that share.
+    """
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    def __init__(
+        self,
+        history: LatencyHistory = None,
+        max_extra: float = 0.1,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+    ):
+        self.history = history or LatencyHistory()
+        self.max_extra = max_extra
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.requests = 0
+        self.hedged = 0
+
+    def delay(self, route: str):
+        """Seconds to wait before hedging a request on ``route``; None to never hedge."""
+        self.requests += 1
+        threshold = self.history.p95(route, self.min_samples)
+        return None if threshold is None else max(self.min_delay, threshold)
+
+    def allow(self) -> bool:
+        """Take one hedge from the budget if it is not exhausted."""
+        if self.hedged + 1 > self.max_extra * self.requests:
+            return False
+        self.hedged += 1
+        return True
+
+
+async def first_success(attempt, delay: float, allow) -> tuple:
+    """Run ``attempt()``; if it is still pending after ``delay`` seconds and
+    ``allow()`` agrees, race a second ``attempt()`` against it.
+
+    Returns the first ``(status, ...)`` result with status 200, otherwise the
+    last result to finish. The losing attempt is cancelled. If every attempt
+    raises, the last exception propagates.
+    """
+    primary = asyncio.ensure_future(attempt())
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not allow():
+            return await primary
+    except BaseException:
+        primary.cancel()
+        raise
+
+    tasks = {primary, asyncio.ensure_future(attempt())}
+    outcome = None
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result()[0] == 200:
+                    return task.result()
+                outcome = task
+        return outcome.result()
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
-async def search_web(query: str, category: str = None, time_range: str = None) -> dict:
-    """Web search."""
-    import aiohttp
+# =============================================================================
+# TRACING
+# =============================================================================
 
-    url = f"{NIA_API_URL}/v2/search/web"
-    payload = {"query": query}
+# Trace hook -> mark name; the ``marks`` of a request span are perf_counter() readings
+TRACE_SIGNALS = (
+    ("on_request_start", "sent"),
+    ("on_connection_queued_start", "queued_start"),
+    ("on_connection_queued_end", "queued_end"),
+    ("on_connection_create_start", "connect_start"),
+    ("on_dns_resolvehost_start", "dns_start"),
+    ("on_dns_resolvehost_end", "dns_end"),
+    ("on_connection_create_end", "connect_end"),
+    ("on_request_end", "headers"),
+)
+
+# Phase name -> (from mark, to mark); a phase is reported only if both marks were hit
+TRACE_PHASES = {
+    "wait": ("start", "sent"),
+    "queued": ("queued_start", "queued_end"),
+    "dns": ("dns_start", "dns_end"),
+    "connect": ("connect_start", "connect_end"),
+    "download": ("headers", "body"),
+    "decode": ("body", "decoded"),
+}
+
+# Tracer in effect for the current context; read by ``traced`` and by new clients
+ACTIVE_TRACER = contextvars.ContextVar("nia_tracer", default=None)
+
+
+class Tracer:
+    """Structured timing spans for API requests and local work.
+
+    A ``request`` span records route, status, response bytes and the phases
+    of the exchange in milliseconds: ``wait`` (rate limiter), ``queued``
+    (connection pool), ``dns``, ``connect`` (TCP/TLS including DNS; absent on
+    a reused connection), ``ttfb`` (request sent to response headers),
+    ``download`` and ``decode``. Cache hits are request spans with
+    ``"cache": "hit"``. Local work such as loading the API key, importing
+    aiohttp and rendering output is recorded as ``phase`` spans. When
+    ``path`` is given every span is appended to it as a JSON line.
+    """
 
-    if category:
-        payload["category"] = category
-    if time_range:
-        payload["time_range"] = time_range
+    def __init__(self, path: str = None):
+        self.spans: list[dict] = []
+        self.file = open(path, "a") if path else None
+        self.phase("key_load", KEY_LOAD_SECONDS)
+
+    def _emit(self, span: dict) -> None:
+        self.spans.append(span)
+        if self.file is not None:
+            self.file.write(json.dumps(span) + "\n")
+
+    def phase(self, name: str, seconds: float, **fields) -> None:
+        self._emit({"type": "phase", "name": name, "ms": round(seconds * 1000, 3), **fields})
+
+    def start(self, method: str, route: str) -> dict:
+        """Open a request span; pass it to aiohttp as ``trace_request_ctx``."""
+        return {
+            "type": "request",
+            "method": method,
+            "route": route,
+            "ts": round(time.time(), 3),
+            "marks": {"start": time.perf_counter()},
+        }
+
+    @staticmethod
+    def mark(span: Optional[dict], name: str) -> None:
+        if span is not None:
+            span["marks"][name] = time.perf_counter()
+
+    def finish(self, span: dict, status=None, size: int = None, **fields) -> None:
+        """Close a request span, turning its marks into phase durations."""
+        marks = span.pop("marks")
+        now = time.perf_counter()
+        phases = {}
+        for name, (begin, end) in TRACE_PHASES.items():
+            if begin in marks and end in marks:
+                phases[name] = round((marks[end] - marks[begin]) * 1000, 3)
+        if "headers" in marks and "sent" in marks:
+            sent = max(marks["sent"], marks.get("connect_end", 0), marks.get("queued_end", 0))
+            phases["ttfb"] = round((marks["headers"] - sent) * 1000, 3)
+        span.update(status=status, bytes=size, phases=phases, **fields)
+        span["ms"] = round((now - marks["start"]) * 1000, 3)
+        self._emit(span)
+
+    def cached(self, method: str, route: str, seconds: float) -> None:
+        self._emit(
+            {
+                "type": "request",
+                "method": method,
+                "route": route,
+                "cache": "hit",
+                "ts": round(time.time(), 3),
+                "status": 200,
+                "ms": round(seconds * 1000, 3),
+            }
+        )
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    def trace_config(self):
+        """An ``aiohttp.TraceConfig`` that marks connection and header events on request spans."""
+        import aiohttp
+
+        def hook(name):
+            async def on_signal(session, context, params):
+                Tracer.mark(context.trace_request_ctx, name)
+
+            return on_signal
+
+        config = aiohttp.TraceConfig()
+        for signal, name in TRACE_SIGNALS:
+            getattr(config, signal).append(hook(name))
+        return config
+
+    def summary(self) -> str:
+        """Per-endpoint and per-phase table of count, p50, p95 and max milliseconds."""
+        groups: dict[str, list[dict]] = {}
+        for span in self.spans:
+            label = span["route"] if span["type"] == "request" else f"[{span['name']}]"
+            groups.setdefault(label, []).append(span)
+
+        lines = [
+            f"{'endpoint':<44} {'n':>4} {'err':>4} {'hit':>4} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'max ms':>9} {'ttfb50':>8} {'bytes':>10}"
+        ]
+        for label, spans in sorted(groups.items()):
+            ms = [span["ms"] for span in spans]
+            ttfb = [span["phases"]["ttfb"] for span in spans if "ttfb" in span.get("phases", {})]
+            errors = sum(
+                1
+                for span in spans
+                if span["type"] == "request" and (span["status"] != 200 or span.get("error"))
+            )
+            hits = sum(1 for span in spans if span.get("cache") == "hit")
+            size = sum(span.get("bytes") or 0 for span in spans)
+            lines.append(
+                f"{label[:44]:<44} {len(spans):>4} {errors:>4} {hits:>4} "
+                f"{percentile(ms, 50):>9.1f} {percentile(ms, 95):>9.1f} {max(ms):>9.1f} "
+                f"{percentile(ttfb, 50) if ttfb else 0:>8.1f} {size:>10}"
+            )
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def traced(func):
+    """Record calls of ``func`` as ``phase`` spans while a tracer is active."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tracer = ACTIVE_TRACER.get()
+        if tracer is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            tracer.phase(func.__name__, time.perf_counter() - started)
+
+    return wrapper
 
 
-async def search_deep(query: str) -> dict:
-    """Deep research agent (Pro only)."""
-    import aiohttp
+# =============================================================================
+# RECORD AND REPLAY
+# =============================================================================
 
-    url = f"{NIA_API_URL}/v2/search/deep"
-    payload = {"query": query}
 
-    async with aiohttp.ClientSession() as session:
-        timeout = aiohttp.ClientTimeout(total=300)
-        async with session.post(url, headers=get_headers(), json=payload, timeout=timeout) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+class CassetteResponse:
+    """A fully buffered response with the parts of ``aiohttp.ClientResponse`` the client uses."""
 
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.content = self
+        self.offset = 0
 
-async def search_universal(query: str, limit: int = 10) -> dict:
-    """Universal search across all public indexed sources."""
-    import aiohttp
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self.body) if n < 0 else self.offset + n
+        data = self.body[self.offset : end]
+        self.offset += len(data)
+        return data
 
-    url = f"{NIA_API_URL}/v2/search/universal"
-    payload = {"query": query, "search_mode": "unified", "limit": limit}
+    async def text(self) -> str:
+        return self.body.decode("utf-8", "replace")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    async def iter_any(self):
+        yield await self.read()
 
+    async def iter_chunked(self, n: int):
+        while chunk := await self.read(n):
+            yield chunk
 
-async def search_package_hybrid(
-    package: str, query: str, registry: str = "py_pi", limit: int = 10
-) -> dict:
-    """Semantic search within a package."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/package-search/hybrid"
-    payload = {
-        "registry": registry,
-        "package_name": package,
-        "semantic_queries": [query],
-        "limit": limit,
-    }
+class Cassette:
+    """HTTP exchanges recorded to a JSON lines file for offline replay.
+
+    In ``record`` mode every response the client receives is appended to
+    ``path``. In ``replay`` mode nothing touches the network: requests are
+    answered from the file by method, path, query and JSON body. Repeated
+    identical requests (status polls, pages of a stream) are answered in
+    recorded order, the last answer repeating once they run out; a request
+    that was never recorded gets a 599 response.
+    """
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    # Response headers worth keeping; the client only reads these
+    HEADERS = ("Content-Type", "Retry-After")
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.exchanges: dict[str, list[dict]] = {}
+        self.played: dict[str, int] = {}
+        self.file = None
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, "a")
+        else:
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        key = self.key(
+                            entry["method"], entry["path"], entry["params"], entry["payload"]
+                        )
+                        self.exchanges.setdefault(key, []).append(entry)
+
+    @staticmethod
+    def key(method: str, path: str, params: dict, payload) -> str:
+        params = {k: str(v) for k, v in (params or {}).items()}
+        return json.dumps([method, path, params, payload], sort_keys=True)
+
+    def record(self, method: str, path: str, params: dict, payload, resp, body: bytes) -> None:
+        headers = {k: resp.headers[k] for k in self.HEADERS if k in resp.headers}
+        entry = {
+            "method": method,
+            "path": path,
+            "params": params,
+            "payload": payload,
+            "status": resp.status,
+            "headers": headers,
+            "body": body.decode("utf-8", "replace"),
+        }
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def play(self, method: str, path: str, params: dict, payload) -> CassetteResponse:
+        key = self.key(method, path, params, payload)
+        entries = self.exchanges.get(key)
+        if not entries:
+            return CassetteResponse(599, {}, f"no recorded response for {method} {path}".encode())
+        index = self.played.get(key, 0)
+        self.played[key] = index + 1
+        entry = entries[min(index, len(entries) - 1)]
+        return CassetteResponse(entry["status"], entry["headers"], entry["body"].encode())
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CassetteSession:
+    """Transport in place of ``aiohttp.ClientSession`` that records to or replays from a cassette.
+
+    Recording buffers each response body before handing it back, so streams
+    are recorded whole rather than delivered incrementally.
+    """
 
+    def __init__(self, cassette: Cassette, session):
+        self.cassette = cassette
+        self.session = session
 
-async def search_package_grep(
-    package: str, pattern: str, registry: str = "py_pi", limit: int = 10
-) -> dict:
-    """Regex search within a package."""
-    import aiohttp
+    @contextlib.asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs):
+        from urllib.parse import urlsplit
 
-    url = f"{NIA_API_URL}/v2/package-search/grep"
-    payload = {"registry": registry, "package_name": package, "pattern": pattern, "limit": limit}
+        path = urlsplit(url).path
+        params, payload = kwargs.get("params"), kwargs.get("json")
+        if self.cassette.mode == "replay":
+            yield self.cassette.play(method, path, params, payload)
+            return
+        async with self.session.request(method, url, **kwargs) as resp:
+            body = await resp.read()
+            self.cassette.record(method, path, params, payload, resp, body)
+            yield CassetteResponse(resp.status, resp.headers, body)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    async def close(self) -> None:
+        await self.session.close()
+        self.cassette.close()
 
 
 # =============================================================================
-# REPOSITORIES API
+# HTTP CLIENT
 # =============================================================================
 
+# Keys under which list endpoints return their items
+LIST_KEYS = ("repositories", "data_sources", "papers", "contexts", "sessions", "jobs")
 
-async def repos_list(q: str = None, status: str = None, limit: int = 100, offset: int = 0) -> dict:
-    """List all indexed repositories."""
-    import aiohttp
+# Fields holding an item's id, per list key; the first non-empty one wins
+LIST_ID_KEYS = {
+    "repositories": ("repository_id", "id"),
+    "data_sources": ("source_id", "data_source_id", "id"),
+    "papers": ("paper_id", "id"),
+    "contexts": ("id", "context_id"),
+    "sessions": ("session_id", "id"),
+    "jobs": ("job_id", "id"),
+}
 
-    url = f"{NIA_API_URL}/v2/repositories"
-    params = {"limit": limit, "offset": offset}
-    if q:
-        params["q"] = q
-    if status:
-        params["status"] = status
+# Fields naming a listed item, in order of preference
+LIST_NAME_KEYS = ("display_name", "title", "repository_id", "id")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+# Binary stream that successful response bodies are copied to, undecoded (``--format raw``)
+RAW_OUTPUT = contextvars.ContextVar("nia_raw_output", default=None)
 
+# Set while requests must neither read nor fill the response cache (mirror downloads)
+SKIP_CACHE = contextvars.ContextVar("nia_skip_cache", default=False)
 
-async def repos_index(repo: str, github_token: str = None) -> dict:
-    """Index a new GitHub repository."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/repositories"
-    payload = {"repository": repo}
-    if github_token:
-        payload["github_token"] = github_token
+def list_key(result: dict) -> str:
+    """The key under which a list endpoint response holds its items (None if empty)."""
+    for key in LIST_KEYS:
+        if result.get(key):
+            return key
+    return None
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+def list_items(result: dict) -> list:
+    """Extract the item list from a list endpoint response."""
+    key = list_key(result)
+    return result[key] if key else []
 
-async def repos_status(repository_id: str) -> dict:
-    """Get repository indexing status."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/repositories/{repository_id}"
+def list_item_name(raw: dict):
+    """Display name of a listed item: its first non-empty ``LIST_NAME_KEYS`` field."""
+    for key in LIST_NAME_KEYS:
+        value = raw.get(key)
+        if value:
+            return value
+    return None
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+class ListItem:
+    """One repository, source, paper, context, session or job of a list response.
 
-async def repos_delete(repository_id: str) -> dict:
-    """Delete a repository."""
-    import aiohttp
+    A view over the decoded item ``raw``, which is never copied. ``id``,
+    ``name`` and ``status`` resolve the field variants of the item's ``kind``
+    (its ``LIST_KEYS`` key) on first access. Mapping access such as
+    ``item["url"]`` or ``item.get("tags")`` reads ``raw``.
+    """
 
-    url = f"{NIA_API_URL}/v2/repositories/{repository_id}"
+    __slots__ = ("raw", "kind", "_id", "_name")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.delete(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return {"status": "deleted", "repository_id": repository_id}
+    def __init__(self, raw: dict, kind: str = None):
+        self.raw = raw
+        self.kind = kind
+        self._id = self._name = None
 
+    @property
+    def id(self):
+        if self._id is None:
+            self._id = record_id(self.raw, *LIST_ID_KEYS.get(self.kind, ("id",)))
+        return self._id
 
-async def repos_rename(repository_id: str, display_name: str) -> dict:
-    """Rename a repository."""
-    import aiohttp
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = list_item_name(self.raw)
+        return self._name
 
-    url = f"{NIA_API_URL}/v2/repositories/{repository_id}/rename"
-    payload = {"display_name": display_name}
+    @property
+    def status(self) -> str:
+        return str(self.raw.get("status") or "")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.patch(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    def get(self, key: str, default=None):
+        return self.raw.get(key, default)
 
+    def __getitem__(self, key: str):
+        return self.raw[key]
 
-async def repos_tree(repository_id: str) -> dict:
-    """Get repository tree structure."""
-    import aiohttp
+    def __contains__(self, key: str) -> bool:
+        return key in self.raw
 
-    url = f"{NIA_API_URL}/v2/repositories/{repository_id}/tree"
+    def __repr__(self) -> str:
+        return f"ListItem({self.kind or 'item'} {self.id!r})"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+class ListResult:
+    """A list endpoint response, whichever of ``LIST_KEYS`` holds its items.
 
-async def repos_content(repository_id: str, path: str) -> dict:
-    """Get repository file content."""
-    import aiohttp
+    Iterating (or indexing) wraps items in ``ListItem`` one at a time, so
+    showing the first page of a long list touches only those items. ``raw``
+    is the response as decoded.
+    """
 
-    url = f"{NIA_API_URL}/v2/repositories/{repository_id}/content"
-    payload = {"path": path}
+    __slots__ = ("raw", "kind")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self.kind = list_key(raw)
 
+    @property
+    def error(self):
+        return self.raw.get("error")
 
-async def repos_grep(
-    repository_id: str, pattern: str, context_lines: int = 3, exhaustive: bool = False
-) -> dict:
-    """Search repository code with regex."""
-    import aiohttp
+    @property
+    def total(self) -> int:
+        return self.raw.get("total", len(self))
 
-    url = f"{NIA_API_URL}/v2/repositories/{repository_id}/grep"
-    payload = {"pattern": pattern, "context_lines": context_lines, "exhaustive": exhaustive}
+    def __len__(self) -> int:
+        return len(self.raw[self.kind]) if self.kind else 0
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    def __iter__(self):
+        kind = self.kind
+        for raw in self.raw[kind] if kind else ():
+            yield ListItem(raw, kind)
 
+    def __getitem__(self, i: int) -> ListItem:
+        if not self.kind:
+            raise IndexError(i)
+        return ListItem(self.raw[self.kind][i], self.kind)
 
-# =============================================================================
-# DATA SOURCES API
-# =============================================================================
 
+async def copy_body(resp, sink, progress: list = None) -> int:
+    """Copy a response body to a binary stream as it arrives; returns the byte count.
 
-async def sources_list(
-    q: str = None, status: str = None, source_type: str = None, limit: int = 100, offset: int = 0
-) -> dict:
-    """List all data sources."""
-    import aiohttp
+    ``progress[0]`` (when given) is kept at the bytes written so far, so a
+    caller can tell whether a failed copy already reached the sink.
+    """
+    size = 0
+    async for chunk in resp.content.iter_any():
+        sink.write(chunk)
+        size += len(chunk)
+        if progress is not None:
+            progress[0] = size
+    sink.flush()
+    return size
+
+
+class NiaClient:
+    """Pooled Nia API client.
+
+    One ``aiohttp.ClientSession`` backed by a keep-alive connector is shared by
+    every endpoint call, so back-to-back requests reuse TCP/TLS connections and
+    cached DNS lookups instead of paying a fresh handshake each time.
+
+    Usage:
+        async with NiaClient() as client:
+            tree = await client.repos_tree("owner/repo")
+            page = await client.sources_read(source_id, "guide/intro.md")
+    """
 
-    url = f"{NIA_API_URL}/v2/data-sources"
-    params = {"limit": limit, "offset": offset}
-    if q:
-        params["q"] = q
-    if status:
-        params["status"] = status
-    if source_type:
-        params["source_type"] = source_type
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        limit: int = None,
+        limit_per_host: int = None,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 60.0,
+        cache: ResponseCache = None,
+        refresh: bool = False,
+        limiter: RateLimiter = None,
+        retry: RetryPolicy = None,
+        hedge: HedgePolicy = None,
+        tracer: Tracer = None,
+        cassette: Cassette = None,
+        latency: LatencyHistory = None,
+    ):
+        self.api_key = api_key or NIA_API_KEY
+        self.base_url = (base_url or NIA_API_URL).rstrip("/")
+        self.limit = limit or NIA_POOL_LIMIT
+        self.limit_per_host = limit_per_host or NIA_POOL_PER_HOST
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        # Owned by the client and closed with it; ``refresh`` bypasses reads but still stores
+        self.cache = cache
+        self.refresh = refresh
+        self.limiter = limiter or RateLimiter()
+        self.retry = retry or RetryPolicy()
+        # Opt-in: None disables hedging
+        self.hedge = hedge
+        # Read-only latencies are recorded with or without hedging, so a first
+        # --hedge run already has thresholds; loaded on the first request
+        self.latency = hedge.history if hedge is not None else latency
+        self.tracer = tracer or ACTIVE_TRACER.get()
+        # Optional record/replay transport wrapped around the session
+        self.cassette = cassette
+        self.session = None
+        # Open path indexes by (kind, id), kept for the client's lifetime
+        self._path_indexes = {}
+        # Research calls in flight by cache key, shared by identical concurrent requests
+        self._inflight = {}
+
+    async def __aenter__(self) -> "NiaClient":
+        first_import = "aiohttp" not in sys.modules
+        started = time.perf_counter()
+        import aiohttp
+
+        if self.tracer is not None and first_import:
+            self.tracer.phase("import_aiohttp", time.perf_counter() - started)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        trace_configs = [self.tracer.trace_config()] if self.tracer is not None else None
+        self.session = aiohttp.ClientSession(
+            connector=connector, headers=headers, trace_configs=trace_configs
+        )
+        if self.cassette is not None:
+            self.session = CassetteSession(self.cassette, self.session)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the pooled session and its connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        if self.cache is not None:
+            self.cache.close()
+        if self.latency is not None:
+            self.latency.save()
+        for index in self._path_indexes.values():
+            index.close()
+        self._path_indexes.clear()
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _request_kwargs(self, params: dict, payload: dict, timeout: float) -> dict:
+        import aiohttp
+
+        kwargs = {}
+        if params is not None:
+            kwargs["params"] = params
+        if payload is not None:
+            kwargs["json"] = payload
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        return kwargs
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict = None,
+        payload: dict = None,
+        timeout: float = None,
+        decode: bool = True,
+        fresh: bool = False,
+    ) -> dict:
+        """Send one request on the pooled session.
+
+        Returns the decoded JSON body (``{}`` when ``decode`` is False), or
+        ``{"error": ...}`` for any non-200 response. Read-only routes listed in
+        ``CACHE_TTLS`` are served from the response cache when one is attached
+        (``fresh`` skips the lookup but still stores the new response); a
+        successful mutation invalidates cached entries of its collection.
+        While ``RAW_OUTPUT`` is set, a successful body is copied there as it
+        arrives instead of being decoded (``{}`` is returned, nothing cached).
+        While ``SKIP_CACHE`` is set, the cache is neither read nor written.
+        """
+        route = f"{method} {route_template(path)}"
+        cacheable = self.cache is not None and RAW_OUTPUT.get() is None and not SKIP_CACHE.get()
+        ttl = CACHE_TTLS.get(route) if cacheable else None
+        if ttl:
+            key = self.cache.key(method, self._url(path), params, payload)
+            if not (self.refresh or fresh):
+                started = time.perf_counter()
+                cached = self.cache.get(key)
+                if cached is not None:
+                    if self.tracer is not None:
+                        self.tracer.cached(method, route, time.perf_counter() - started)
+                    return cached
+
+        result = await self._send(method, path, route, params, payload, timeout, decode)
+
+        if self.cache is not None and "error" not in result:
+            if ttl:
+                self.cache.put(key, path, result, ttl)
+            elif is_mutation(method, route):
+                self.cache.invalidate("/".join(path.split("/")[:3]))
+        return result
+
+    async def _research(
+        self, path: str, payload: dict, fresh: bool = False, ttl: float = None
+    ) -> dict:
+        """POST a long-running research request at most once per normalized query.
+
+        Results are cached for ``ttl`` seconds (``NIA_RESEARCH_TTL`` by default)
+        under the normalized query, scopes and model; ``fresh`` skips the
+        lookup and shares only other ``fresh`` calls in flight. Identical
+        concurrent calls on this client share one request, and other
+        processes asking the same question wait on a lock file for the first
+        one's cached answer instead of paying for their own.
+        """
+        if RAW_OUTPUT.get() is not None:
+            return await self._request("POST", path, payload=payload, timeout=300)
+        key = ResponseCache.key("POST", self._url(path), None, research_key(payload))
+        # A fresh call must not be answered by a lookup that may hit the cache
+        flight_key = (key, bool(fresh))
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._research_once(key, path, payload, fresh, ttl))
+            self._inflight[flight_key] = flight
+            flight.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        # A cancelled waiter must not cancel the call other waiters share
+        return await asyncio.shield(flight)
+
+    async def _research_once(
+        self, key: str, path: str, payload: dict, fresh: bool, ttl: float
+    ) -> dict:
+        route = f"POST {route_template(path)}"
+        lookup = self.cache is not None and not (fresh or self.refresh)
+
+        def cached():
+            started = time.perf_counter()
+            result = self.cache.get(key) if lookup else None
+            if result is not None and self.tracer is not None:
+                self.tracer.cached("POST", route, time.perf_counter() - started)
+            return result
+
+        if (result := cached()) is not None:
+            return result
+        if self.cache is None:
+            return await self._request("POST", path, payload=payload, timeout=300)
+        async with file_lock(self.cache.lock_dir / f"{key}.lock", timeout=300):
+            # Another process may have answered the same question while we waited
+            if (result := cached()) is not None:
+                return result
+            result = await self._request("POST", path, payload=payload, timeout=300)
+            if "error" not in result:
+                # Outside the API path namespace, so mutations never invalidate it
+                self.cache.put(key, f"research:{path}", result, ttl or NIA_RESEARCH_TTL)
+        return result
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        route: str,
+        params: dict,
+        payload: dict,
+        timeout: float,
+        decode: bool,
+    ) -> dict:
+        """Perform the HTTP exchange for ``_request`` under the rate limiter and retry policy.
+
+        With a hedge policy attached, read-only requests that outlast their
+        route's p95 latency are raced against a duplicate.
+        """
+        import aiohttp
+
+        kwargs = self._request_kwargs(params, payload, timeout)
+        read_only = not is_mutation(method, route)
+        idempotent = read_only or method in ("PUT", "DELETE")
+        sink = RAW_OUTPUT.get()
+        # Two racing attempts would interleave their bytes in a raw sink
+        hedge = self.hedge if read_only and sink is None else None
+        history = None
+        if read_only and self.cassette is None:
+            # Replayed answers have no real latency to learn from
+            if self.latency is None:
+                self.latency = LatencyHistory()
+            history = self.latency
+        tracer = self.tracer
+        # Bytes already written to the raw sink; once any are out, a retry would duplicate them
+        streamed = [0]
+
+        async def attempt() -> tuple:
+            span = tracer.start(method, route) if tracer is not None else None
+            try:
+                await self.limiter.acquire()
+                started = time.monotonic()
+                async with self.session.request(
+                    method, self._url(path), trace_request_ctx=span, **kwargs
+                ) as resp:
+                    if resp.status == 200 and sink is not None:
+                        size = await copy_body(resp, sink, streamed)
+                        Tracer.mark(span, "body")
+                        outcome = 200, None, {}
+                    elif resp.status == 200:
+                        body = await resp.read()
+                        size = len(body)
+                        Tracer.mark(span, "body")
+                        result = loads_json(body) if decode and body.strip() else {}
+                        Tracer.mark(span, "decoded")
+                        if history is not None:
+                            history.record(route, time.monotonic() - started)
+                        outcome = 200, None, result
+                    else:
+                        body = await resp.read()
+                        size = len(body)
+                        Tracer.mark(span, "body")
+                        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                        text = body.decode("utf-8", "replace")
+                        outcome = (
+                            resp.status,
+                            retry_after,
+                            {"error": f"API error {resp.status}: {text}"},
+                        )
+            except BaseException as e:
+                if span is not None:
+                    tracer.finish(span, error=type(e).__name__)
+                raise
+            if span is not None:
+                tracer.finish(span, outcome[0], size)
+            return outcome
+
+        attempt_no = 0
+        while True:
+            try:
+                delay = hedge.delay(route) if hedge is not None else None
+                if delay is None:
+                    status, retry_after, result = await attempt()
+                else:
+                    status, retry_after, result = await first_success(attempt, delay, hedge.allow)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if streamed[0] or not self.retry.should_retry(attempt_no, None, idempotent):
+                    raise
+                status, retry_after = None, None
+            else:
+                if status == 200:
+                    self.limiter.succeeded()
+                    return result
+                if status in self.retry.THROTTLE_STATUSES:
+                    self.limiter.throttled(retry_after)
+                if not self.retry.should_retry(attempt_no, status, idempotent):
+                    return result
+
+            await asyncio.sleep(self.retry.delay(attempt_no, retry_after))
+            attempt_no += 1
+
+    async def stream_events(
+        self,
+        method: str,
+        path: str,
+        payload: dict = None,
+        timeout: float = None,
+        last_event_id: str = None,
+        max_reconnects: int = 5,
+        stats: StreamStats = None,
+    ):
+        """Yield ``SSEEvent``s from an event-stream endpoint as they arrive.
+
+        If the connection drops mid-stream, reconnects with ``Last-Event-ID``
+        so the server can resume after the last event received. GET streams
+        are always resumable; POST streams only once the server has sent an
+        event id, since re-posting without one would start the work over.
+        Raises RuntimeError on a non-200 response.
+        """
+        import aiohttp
+
+        kwargs = self._request_kwargs(None, payload, timeout)
+        decoder = SSEDecoder(last_event_id)
+        reconnects = 0
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if decoder.last_event_id is not None:
+                headers["Last-Event-ID"] = decoder.last_event_id
+            route = f"{method} {route_template(path)}"
+            span = self.tracer.start(method, route) if self.tracer is not None else None
+            received = 0
+            status = error = None
+            await self.limiter.acquire()
+            try:
+                async with self.session.request(
+                    method, self._url(path), headers=headers, trace_request_ctx=span, **kwargs
+                ) as resp:
+                    status = resp.status
+                    if resp.status != 200:
+                        raise RuntimeError(f"API error {resp.status}: {await resp.text()}")
+                    async for chunk in resp.content.iter_any():
+                        received += len(chunk)
+                        for event in decoder.feed(chunk):
+                            if stats is not None:
+                                stats.record()
+                            yield event
+                    Tracer.mark(span, "body")
+                    return
+            except (
+                aiohttp.ClientPayloadError,
+                aiohttp.ClientConnectionError,
+                asyncio.TimeoutError,
+            ) as e:
+                error = type(e).__name__
+                resumable = method == "GET" or decoder.last_event_id is not None
+                if not resumable or reconnects >= max_reconnects:
+                    raise
+            finally:
+                if span is not None:
+                    self.tracer.finish(span, status, received, stream=True, error=error)
+            reconnects += 1
+            if stats is not None:
+                stats.reconnects += 1
+            # Start a fresh decoder so a half-received event is not glued to the replay
+            decoder = SSEDecoder(decoder.last_event_id, decoder.retry)
+            await asyncio.sleep(self.retry.delay(reconnects - 1, (decoder.retry or 1000) / 1000))
+
+    async def _print_events(
+        self,
+        method: str,
+        path: str,
+        payload: dict = None,
+        timeout: float = None,
+        last_event_id: str = None,
+        stats: StreamStats = None,
+    ) -> None:
+        """Print the data of each SSE event as it arrives."""
+        try:
+            async for event in self.stream_events(
+                method, path, payload, timeout, last_event_id, stats=stats
+            ):
+                print(event.data, flush=True)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+
+    @contextlib.asynccontextmanager
+    async def _open(self, method: str, path: str, params: dict = None, payload: dict = None):
+        """Open a response for incremental reading.
+
+        Paced and retried like ``_request`` until a 200 response's headers
+        arrive; once the body is being read there are no more retries.
+        Raises RuntimeError on a final non-200 response.
+        """
+        import aiohttp
+
+        kwargs = self._request_kwargs(params, payload, None)
+        route = f"{method} {route_template(path)}"
+        attempt_no = 0
+        while True:
+            span = self.tracer.start(method, route) if self.tracer is not None else None
+            status = retry_after = None
+            opened = False
+            await self.limiter.acquire()
+            try:
+                async with self.session.request(
+                    method, self._url(path), trace_request_ctx=span, **kwargs
+                ) as resp:
+                    status = resp.status
+                    if status == 200:
+                        self.limiter.succeeded()
+                        opened = True
+                        yield resp
+                        Tracer.mark(span, "body")
+                        return
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    error = f"API error {status}: {await resp.text()}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if opened or not self.retry.should_retry(attempt_no, None, True):
+                    raise
+            else:
+                if status in self.retry.THROTTLE_STATUSES:
+                    self.limiter.throttled(retry_after)
+                if not self.retry.should_retry(attempt_no, status, True):
+                    raise RuntimeError(error)
+            finally:
+                if span is not None:
+                    size = getattr(resp.content, "total_bytes", None) if status else None
+                    self.tracer.finish(span, status, size)
+            await asyncio.sleep(self.retry.delay(attempt_no, retry_after))
+            attempt_no += 1
+
+    async def iter_tree(
+        self, kind: str, item_id: str, prefix: str = None, glob: str = None, fresh: bool = False
+    ):
+        """Yield ``(path, entry)`` for every file of a repository (``kind="repos"``) or
+        data source (``kind="sources"``) tree while the response is still arriving.
+
+        The body is parsed incrementally (with ijson when installed, else
+        ``JSONEvents``) and ``prefix``/``glob`` are applied during parsing, so
+        the whole tree is never held in memory. A tree already in the response
+        cache is walked from there; streamed trees are not cached. Raises
+        RuntimeError on an API error.
+        """
+        collection = "repositories" if kind == "repos" else "data-sources"
+        path = f"/v2/{collection}/{item_id}/tree"
+        keep = tree_filter(prefix, glob)
+        if self.cache is not None and not (self.refresh or fresh):
+            cached = self.cache.get(self.cache.key("GET", self._url(path), None, None))
+            if cached is not None:
+                for file_path, entry in iter_tree_files(cached):
+                    if keep is None or keep(file_path):
+                        yield file_path, entry
+                return
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+
+        stream = TreeStream(keep)
+        async with self._open("GET", path) as resp:
+            if ijson is not None:
+                async for event in ijson.basic_parse_async(resp.content, use_float=True):
+                    for item in stream.feed((event,)):
+                        yield item
+                return
+            parser = JSONEvents()
+            # Bounded chunks keep the first paths coming and the buffer small
+            async for chunk in resp.content.iter_chunked(TREE_CHUNK_BYTES):
+                for item in stream.feed(parser.feed(chunk)):
+                    yield item
+            for item in stream.feed(parser.feed(b"", final=True)):
+                yield item
+
+    async def stream_content(
+        self, kind: str, item_id: str, path: str, write, lines: tuple = None
+    ) -> dict:
+        """Pass a repository (``kind="repos"``) or data source file's content to
+        ``write`` piece by piece while the response is still arriving.
+
+        Only the ``content`` string is decoded (see ``JSONStringField``), so
+        the file is never held in memory whole. ``lines`` is an inclusive,
+        1-based ``(first, last)`` window; ``last`` may be None. Reading stops
+        as soon as the window is complete. Content already in the response
+        cache is written from there; streamed content is not cached. Returns
+        the characters and lines written. Raises RuntimeError on an API error
+        or a response without content.
+        """
+        collection = "repositories" if kind == "repos" else "data-sources"
+        route = f"/v2/{collection}/{item_id}/content"
+        payload = {"path": path}
+        window = LineWindow(*lines) if lines else LineWindow()
+        if self.cache is not None and not self.refresh:
+            cached = self.cache.get(self.cache.key("POST", self._url(route), None, payload))
+            if cached is not None and isinstance(cached.get("content"), str):
+                write(window.feed(cached["content"]))
+                return window.stats()
+
+        field = JSONStringField("content")
+        async with self._open("POST", route, payload=payload) as resp:
+            async for chunk in resp.content.iter_chunked(CONTENT_CHUNK_BYTES):
+                text = window.feed(field.feed(chunk))
+                if text:
+                    write(text)
+                if field.done or window.complete:
+                    break
+            else:
+                write(window.feed(field.feed(b"", final=True)))
+        if not field.found:
+            raise RuntimeError(f"no content in the response for {path!r}")
+        if not (field.done or window.complete):
+            raise RuntimeError(f"content of {path!r} was cut off")
+        return window.stats()
+
+    async def path_index(self, kind: str, item_id: str, fresh: bool = False) -> "PathIndex":
+        """The local path index of a repository or source tree, built when needed.
+
+        An index is reused as is while younger than the tree's cache TTL.
+        After that the item's revision (from its status) is compared, and the
+        tree is fetched again only when it changed or has no revision. A
+        missing index is built from the cached tree if there is one.
+        ``fresh``, ``--refresh`` and ``--no-cache`` always rebuild it. Raises
+        RuntimeError if the tree cannot be fetched.
+        """
+        collection = "repositories" if kind == "repos" else "data-sources"
+        key = (kind, item_id)
+        index = self._path_indexes.pop(key, None) or PathIndex.open(kind, item_id)
+        rebuild = fresh or self.refresh or self.cache is None or index is None
+        stale = not rebuild and index.age() > CACHE_TTLS[f"GET /v2/{collection}/{{id}}/tree"]
+        if rebuild or stale:
+            status = await (self.repos_status if kind == "repos" else self.sources_get)(
+                item_id, fresh=stale
+            )
+            revision = tree_revision(status)
+            if stale and revision is not None and revision == index.header["revision"]:
+                index.touch()
+                rebuild = False
+            else:
+                rebuild = True
+        if rebuild:
+            # A missing index may come from the cached tree; a replaced one may not
+            refetch = index is not None or fresh or self.refresh
+            if index is not None:
+                index.close()
+            files = self.iter_tree(kind, item_id, fresh=refetch)
+            index = PathIndex.build(kind, item_id, [path async for path, _ in files], revision)
+        self._path_indexes[key] = index
+        return index
+
+    async def paginate(self, fetch, page_size: int = 100, **filters):
+        """Yield every item of a ``limit``/``offset`` list endpoint.
+
+        ``fetch`` is a list method such as ``self.repos_list``. The request for
+        page N+1 is in flight while the items of page N are being consumed.
+        Raises RuntimeError if a page request fails.
+        """
+        offset = 0
+        pending = asyncio.ensure_future(fetch(limit=page_size, offset=offset, **filters))
+        try:
+            while pending is not None:
+                result = await pending
+                pending = None
+                if "error" in result:
+                    raise RuntimeError(result["error"])
+
+                items = list_items(result)
+                offset += len(items)
+                total = result.get("total")
+                more = result.get("has_more", len(items) >= page_size)
+                if items and more and (total is None or offset < total):
+                    pending = asyncio.ensure_future(
+                        fetch(limit=page_size, offset=offset, **filters)
+                    )
+                for item in items:
+                    yield item
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def iter_oracle_sessions(self, page_size: int = 100):
+        """Iterate over all Oracle research sessions."""
+        return self.paginate(self.oracle_list_sessions, page_size)
+
+    def iter_repos(self, q: str = None, status: str = None, page_size: int = 100):
+        """Iterate over all indexed repositories."""
+        return self.paginate(self.repos_list, page_size, q=q, status=status)
+
+    def iter_sources(
+        self, q: str = None, status: str = None, source_type: str = None, page_size: int = 100
+    ):
+        """Iterate over all data sources."""
+        return self.paginate(
+            self.sources_list, page_size, q=q, status=status, source_type=source_type
+        )
 
+    def iter_papers(self, status: str = None, page_size: int = 100):
+        """Iterate over all indexed research papers."""
+        return self.paginate(self.papers_list, page_size, status=status)
+
+    def iter_contexts(self, tags: str = None, agent_source: str = None, page_size: int = 100):
+        """Iterate over all conversation contexts."""
+        return self.paginate(self.context_list, page_size, tags=tags, agent_source=agent_source)
+
+    # -------------------------------------------------------------------------
+    # Oracle Research
+    # -------------------------------------------------------------------------
+
+    async def oracle_research(
+        self,
+        query: str,
+        repositories: list[str] = None,
+        data_sources: list[str] = None,
+        output_format: str = None,
+        model: str = "claude-opus-4-5-20251101",
+        fresh: bool = False,
+        ttl: float = None,
+    ) -> dict:
+        """Oracle autonomous research agent (Pro only).
+
+        Answers are cached per normalized query, scopes and model (see
+        ``_research``); ``fresh`` forces a new run.
+        """
+        payload = {"query": query, "model": model}
+        if repositories:
+            payload["repositories"] = repositories
+        if data_sources:
+            payload["data_sources"] = data_sources
+        if output_format:
+            payload["output_format"] = output_format
+
+        # 5 min for deep research
+        return await self._research("/v2/oracle", payload, fresh, ttl)
+
+    async def oracle_research_stream(
+        self,
+        query: str,
+        repositories: list[str] = None,
+        data_sources: list[str] = None,
+        model: str = "claude-opus-4-5-20251101",
+        stats: StreamStats = None,
+    ) -> None:
+        """Oracle research with real-time streaming (Pro only). Prints events as they arrive."""
+        payload = {"query": query, "model": model}
+        if repositories:
+            payload["repositories"] = repositories
+        if data_sources:
+            payload["data_sources"] = data_sources
+
+        await self._print_events(
+            "POST", "/v2/oracle/stream", payload=payload, timeout=300, stats=stats
+        )
 
-async def sources_index(url_to_index: str, display_name: str = None) -> dict:
-    """Index a new data source (documentation website)."""
-    import aiohttp
+    async def oracle_list_sessions(self, limit: int = 20, offset: int = 0) -> dict:
+        """List Oracle research sessions."""
+        params = {"limit": limit, "offset": offset}
+        return await self._request("GET", "/v2/oracle/sessions", params=params)
+
+    async def oracle_get_session(self, session_id: str) -> dict:
+        """Get Oracle research session details."""
+        return await self._request("GET", f"/v2/oracle/sessions/{session_id}")
+
+    async def oracle_get_messages(self, session_id: str) -> dict:
+        """Get Oracle session chat messages."""
+        return await self._request("GET", f"/v2/oracle/sessions/{session_id}/messages")
+
+    async def oracle_chat_followup(
+        self, session_id: str, message: str, stats: StreamStats = None
+    ) -> None:
+        """Stream a follow-up chat answer for an Oracle session (SSE)."""
+        payload = {"message": message}
+        await self._print_events(
+            "POST", f"/v2/oracle/sessions/{session_id}/chat", payload=payload, stats=stats
+        )
 
-    url = f"{NIA_API_URL}/v2/data-sources"
-    payload = {"url": url_to_index}
-    if display_name:
-        payload["display_name"] = display_name
+    async def oracle_list_jobs(self) -> dict:
+        """List Oracle research jobs."""
+        return await self._request("GET", "/v2/oracle/jobs")
+
+    async def oracle_create_job(
+        self,
+        query: str,
+        repositories: list[str] = None,
+        data_sources: list[str] = None,
+        model: str = "claude-opus-4-5-20251101",
+    ) -> dict:
+        """Create Oracle research job (Pro only). Returns immediately, runs async."""
+        payload = {"query": query, "model": model}
+        if repositories:
+            payload["repositories"] = repositories
+        if data_sources:
+            payload["data_sources"] = data_sources
+
+        return await self._request("POST", "/v2/oracle/jobs", payload=payload)
+
+    async def oracle_get_job(self, job_id: str) -> dict:
+        """Get Oracle job status and result."""
+        return await self._request("GET", f"/v2/oracle/jobs/{job_id}")
+
+    async def oracle_cancel_job(self, job_id: str) -> dict:
+        """Cancel Oracle research job."""
+        result = await self._request("DELETE", f"/v2/oracle/jobs/{job_id}", decode=False)
+        if "error" in result:
+            return result
+        return {"status": "cancelled", "job_id": job_id}
+
+    async def oracle_stream_job_events(
+        self, job_id: str, last_event_id: str = None, stats: StreamStats = None
+    ) -> None:
+        """Stream Oracle job events (SSE), resuming after ``last_event_id`` if given."""
+        await self._print_events(
+            "GET", f"/v2/oracle/jobs/{job_id}/events", last_event_id=last_event_id, stats=stats
+        )
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    # -------------------------------------------------------------------------
+    # Search
+    # -------------------------------------------------------------------------
+
+    async def search_query(
+        self,
+        messages: list[dict],
+        repositories: list[str] = None,
+        data_sources: List[str] = None,
+        search_mode: str = "repositories",
+        include_sources: bool = True,
+    ) -> dict:
+        """Query indexed repositories and documentation."""
+        payload = {
+            "messages": messages,
+            "search_mode": search_mode,
+            "include_sources": include_sources,
+        }
+        if repositories:
+            payload["repositories"] = repositories
+        if data_sources:
+            payload["data_sources"] = data_sources
+
+        return await self._request("POST", "/v2/search/query", payload=payload)
+
+    async def search_web(self, query: str, category: str = None, time_range: str = None) -> dict:
+        """Web search."""
+        payload = {"query": query}
+        if category:
+            payload["category"] = category
+        if time_range:
+            payload["time_range"] = time_range
+
+        return await self._request("POST", "/v2/search/web", payload=payload)
+
+    async def search_deep(self, query: str, fresh: bool = False, ttl: float = None) -> dict:
+        """Deep research agent (Pro only); cached like ``oracle_research``."""
+        payload = {"query": query}
+        return await self._research("/v2/search/deep", payload, fresh, ttl)
+
+    async def search_universal(self, query: str, limit: int = 10) -> dict:
+        """Universal search across all public indexed sources."""
+        payload = {"query": query, "search_mode": "unified", "limit": limit}
+        return await self._request("POST", "/v2/search/universal", payload=payload)
+
+    async def search_package_hybrid(
+        self, package: str, query: str, registry: str = "py_pi", limit: int = 10
+    ) -> dict:
+        """Semantic search within a package."""
+        payload = {
+            "registry": registry,
+            "package_name": package,
+            "semantic_queries": [query],
+            "limit": limit,
+        }
+        return await self._request("POST", "/v2/package-search/hybrid", payload=payload)
+
+    async def search_package_grep(
+        self, package: str, pattern: str, registry: str = "py_pi", limit: int = 10
+    ) -> dict:
+        """Regex search within a package."""
+        payload = {
+            "registry": registry,
+            "package_name": package,
+            "pattern": pattern,
+            "limit": limit,
+        }
+        return await self._request("POST", "/v2/package-search/grep", payload=payload)
+
+    # -------------------------------------------------------------------------
+    # Repositories
+    # -------------------------------------------------------------------------
+
+    async def repos_list(
+        self, q: str = None, status: str = None, limit: int = 100, offset: int = 0
+    ) -> dict:
+        """List all indexed repositories."""
+        params = {"limit": limit, "offset": offset}
+        if q:
+            params["q"] = q
+        if status:
+            params["status"] = status
+
+        return await self._request("GET", "/v2/repositories", params=params)
+
+    async def repos_index(self, repo: str, github_token: str = None) -> dict:
+        """Index a new GitHub repository."""
+        payload = {"repository": repo}
+        if github_token:
+            payload["github_token"] = github_token
+
+        return await self._request("POST", "/v2/repositories", payload=payload)
+
+    async def repos_status(self, repository_id: str, fresh: bool = False) -> dict:
+        """Get repository indexing status (``fresh`` bypasses the response cache)."""
+        return await self._request("GET", f"/v2/repositories/{repository_id}", fresh=fresh)
+
+    async def repos_delete(self, repository_id: str) -> dict:
+        """Delete a repository."""
+        result = await self._request("DELETE", f"/v2/repositories/{repository_id}", decode=False)
+        if "error" in result:
+            return result
+        return {"status": "deleted", "repository_id": repository_id}
+
+    async def repos_rename(self, repository_id: str, display_name: str) -> dict:
+        """Rename a repository."""
+        payload = {"display_name": display_name}
+        return await self._request(
+            "PATCH", f"/v2/repositories/{repository_id}/rename", payload=payload
+        )
 
+    async def repos_tree(self, repository_id: str, fresh: bool = False) -> dict:
+        """Get repository tree structure."""
+        return await self._request("GET", f"/v2/repositories/{repository_id}/tree", fresh=fresh)
 
-async def sources_get(source_id: str) -> dict:
-    """Get data source details."""
-    import aiohttp
+    async def repos_content(self, repository_id: str, path: str, fresh: bool = False) -> dict:
+        """Get repository file content."""
+        payload = {"path": path}
+        return await self._request(
+            "POST", f"/v2/repositories/{repository_id}/content", payload=payload, fresh=fresh
+        )
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}"
+    async def repos_grep(
+        self, repository_id: str, pattern: str, context_lines: int = 3, exhaustive: bool = False
+    ) -> dict:
+        """Search repository code with regex."""
+        payload = {"pattern": pattern, "context_lines": context_lines, "exhaustive": exhaustive}
+        return await self._request(
+            "POST", f"/v2/repositories/{repository_id}/grep", payload=payload
+        )
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    # -------------------------------------------------------------------------
+    # Data Sources
+    # -------------------------------------------------------------------------
+
+    async def sources_list(
+        self,
+        q: str = None,
+        status: str = None,
+        source_type: str = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> dict:
+        """List all data sources."""
+        params = {"limit": limit, "offset": offset}
+        if q:
+            params["q"] = q
+        if status:
+            params["status"] = status
+        if source_type:
+            params["source_type"] = source_type
+
+        return await self._request("GET", "/v2/data-sources", params=params)
+
+    async def sources_index(self, url_to_index: str, display_name: str = None) -> dict:
+        """Index a new data source (documentation website)."""
+        payload = {"url": url_to_index}
+        if display_name:
+            payload["display_name"] = display_name
+
+        return await self._request("POST", "/v2/data-sources", payload=payload)
+
+    async def sources_get(self, source_id: str, fresh: bool = False) -> dict:
+        """Get data source details (``fresh`` bypasses the response cache)."""
+        return await self._request("GET", f"/v2/data-sources/{source_id}", fresh=fresh)
+
+    async def sources_delete(self, source_id: str) -> dict:
+        """Delete a data source."""
+        result = await self._request("DELETE", f"/v2/data-sources/{source_id}", decode=False)
+        if "error" in result:
+            return result
+        return {"status": "deleted", "source_id": source_id}
+
+    async def sources_content(self, source_id: str, path: str) -> dict:
+        """Get data source page content."""
+        payload = {"path": path}
+        return await self._request("POST", f"/v2/data-sources/{source_id}/content", payload=payload)
+
+    async def sources_tree(self, source_id: str, fresh: bool = False) -> dict:
+        """Get documentation tree structure."""
+        return await self._request("GET", f"/v2/data-sources/{source_id}/tree", fresh=fresh)
+
+    async def sources_ls(self, source_id: str, path: str = "/") -> dict:
+        """List documentation directory contents."""
+        params = {"path": path}
+        return await self._request("GET", f"/v2/data-sources/{source_id}/ls", params=params)
+
+    async def sources_read(self, source_id: str, path: str, fresh: bool = False) -> dict:
+        """Read documentation page content."""
+        params = {"path": path}
+        return await self._request(
+            "GET", f"/v2/data-sources/{source_id}/read", params=params, fresh=fresh
+        )
 
+    async def sources_grep(self, source_id: str, pattern: str, context_lines: int = 3) -> dict:
+        """Search documentation with regex."""
+        payload = {"pattern": pattern, "context_lines": context_lines}
+        return await self._request("POST", f"/v2/data-sources/{source_id}/grep", payload=payload)
+
+    async def sources_rename(self, source_id: str, display_name: str) -> dict:
+        """Rename a data source."""
+        payload = {"source_id": source_id, "display_name": display_name}
+        return await self._request("PATCH", "/v2/data-sources/rename", payload=payload)
+
+    # -------------------------------------------------------------------------
+    # Research Papers
+    # -------------------------------------------------------------------------
+
+    async def papers_list(self, limit: int = 50, offset: int = 0, status: str = None) -> dict:
+        """List indexed research papers."""
+        params = {"limit": limit, "offset": offset}
+        if status:
+            params["status"] = status
+
+        return await self._request("GET", "/v2/research-papers", params=params)
+
+    async def papers_index(self, arxiv_id: str) -> dict:
+        """Index an arXiv research paper."""
+        payload = {"arxiv_id": arxiv_id}
+        return await self._request("POST", "/v2/research-papers", payload=payload)
+
+    # -------------------------------------------------------------------------
+    # Context Sharing
+    # -------------------------------------------------------------------------
+
+    async def context_list(
+        self,
+        limit: int = 20,
+        offset: int = 0,
+        tags: str = None,
+        agent_source: str = None,
+        fresh: bool = False,
+    ) -> dict:
+        """List conversation contexts (``fresh`` bypasses the response cache)."""
+        params = {"limit": limit, "offset": offset}
+        if tags:
+            params["tags"] = tags
+        if agent_source:
+            params["agent_source"] = agent_source
+
+        return await self._request("GET", "/v2/contexts", params=params, fresh=fresh)
+
+    async def context_save(
+        self,
+        title: str,
+        content: str,
+        summary: str = None,
+        tags: list[str] = None,
+        metadata: dict = None,
+    ) -> dict:
+        """Save conversation context."""
+        payload = {"title": title, "content": content}
+        if summary:
+            payload["summary"] = summary
+        if tags:
+            payload["tags"] = tags
+        if metadata:
+            payload["metadata"] = metadata
+
+        return await self._request("POST", "/v2/contexts", payload=payload)
+
+    async def context_search_text(self, query: str) -> dict:
+        """Text search contexts."""
+        params = {"query": query}
+        return await self._request("GET", "/v2/contexts/search", params=params)
+
+    async def context_search_semantic(self, query: str) -> dict:
+        """Semantic search contexts using embeddings."""
+        params = {"query": query}
+        return await self._request("GET", "/v2/contexts/semantic-search", params=params)
+
+    async def context_get(self, context_id: str) -> dict:
+        """Get conversation context details."""
+        return await self._request("GET", f"/v2/contexts/{context_id}")
+
+    async def context_update(self, context_id: str, updates: dict) -> dict:
+        """Update conversation context."""
+        return await self._request("PUT", f"/v2/contexts/{context_id}", payload=updates)
+
+    async def context_delete(self, context_id: str) -> dict:
+        """Delete conversation context."""
+        result = await self._request("DELETE", f"/v2/contexts/{context_id}", decode=False)
+        if "error" in result:
+            return result
+        return {"status": "deleted", "context_id": context_id}
 
-async def sources_delete(source_id: str) -> dict:
-    """Delete a data source."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}"
+# =============================================================================
+# ORACLE RESEARCH API
+# =============================================================================
+#
+# Module-level functions are one-shot wrappers kept for library callers. Each
+# opens its own NiaClient; code issuing several calls should share one client.
 
-    async with aiohttp.ClientSession() as session:
-        async with session.delete(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return {"status": "deleted", "source_id": source_id}
 
+async def oracle_research(
+    query: str,
+    repositories: list[str] = None,
+    data_sources: list[str] = None,
+    output_format: str = None,
+    model: str = "claude-opus-4-5-20251101",
+) -> dict:
+    """Oracle autonomous research agent (Pro only).
 
-async def sources_content(source_id: str, path: str) -> dict:
-    """Get data source page content."""
-    import aiohttp
+    Args:
+        query: Research question to investigate
+        repositories: Optional list of repository identifiers
+        data_sources: Optional list of documentation source IDs
+        output_format: Optional format specification
+        model: Model to use (claude-opus-4-5-20251101, claude-sonnet-4-5-20250929, claude-sonnet-4-5-1m)
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}/content"
-    payload = {"path": path}
+    Returns:
+        Research report with citations, tool calls, iterations, duration
+    """
+    async with NiaClient() as client:
+        return await client.oracle_research(query, repositories, data_sources, output_format, model)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+async def oracle_research_stream(
+    query: str,
+    repositories: list[str] = None,
+    data_sources: list[str] = None,
+    model: str = "claude-opus-4-5-20251101",
+) -> None:
+    """Oracle research with real-time streaming (Pro only). Prints events as they arrive."""
+    async with NiaClient() as client:
+        await client.oracle_research_stream(query, repositories, data_sources, model)
 
-async def sources_tree(source_id: str) -> dict:
-    """Get documentation tree structure."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}/tree"
+async def oracle_list_sessions(limit: int = 20, offset: int = 0) -> dict:
+    """List Oracle research sessions."""
+    async with NiaClient() as client:
+        return await client.oracle_list_sessions(limit, offset)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+async def oracle_get_session(session_id: str) -> dict:
+    """Get Oracle research session details."""
+    async with NiaClient() as client:
+        return await client.oracle_get_session(session_id)
 
-async def sources_ls(source_id: str, path: str = "/") -> dict:
-    """List documentation directory contents."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}/ls"
-    params = {"path": path}
+async def oracle_get_messages(session_id: str) -> dict:
+    """Get Oracle session chat messages."""
+    async with NiaClient() as client:
+        return await client.oracle_get_messages(session_id)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+async def oracle_chat_followup(session_id: str, message: str) -> None:
+    """Stream a follow-up chat answer for an Oracle session (SSE)."""
+    async with NiaClient() as client:
+        await client.oracle_chat_followup(session_id, message)
 
-async def sources_read(source_id: str, path: str) -> dict:
-    """Read documentation page content."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}/read"
-    params = {"path": path}
+async def oracle_list_jobs() -> dict:
+    """List Oracle research jobs."""
+    async with NiaClient() as client:
+        return await client.oracle_list_jobs()
+
+
+async def oracle_create_job(
+    query: str,
+    repositories: list[str] = None,
+    data_sources: list[str] = None,
+    model: str = "claude-opus-4-5-20251101",
+) -> dict:
+    """Create Oracle research job (Pro only). Returns immediately, runs async."""
+    async with NiaClient() as client:
+        return await client.oracle_create_job(query, repositories, data_sources, model)
+
+
+async def oracle_get_job(job_id: str) -> dict:
+    """Get Oracle job status and result."""
+    async with NiaClient() as client:
+        return await client.oracle_get_job(job_id)
+
+
+async def oracle_cancel_job(job_id: str) -> dict:
+    """Cancel Oracle research job."""
+    async with NiaClient() as client:
+        return await client.oracle_cancel_job(job_id)
+
+
+async def oracle_stream_job_events(job_id: str, last_event_id: str = None) -> None:
+    """Stream Oracle job events (SSE)."""
+    async with NiaClient() as client:
+        await client.oracle_stream_job_events(job_id, last_event_id)
+
+
+# =============================================================================
+# SEARCH API
+# =============================================================================
+
+
+async def search_query(
+    messages: list[dict],
+    repositories: list[str] = None,
+    data_sources: List[str] = None,
+    search_mode: str = "repositories",
+    include_sources: bool = True,
+) -> dict:
+    """Query indexed repositories and documentation."""
+    async with NiaClient() as client:
+        return await client.search_query(
+            messages, repositories, data_sources, search_mode, include_sources
+        )
+
+
+async def search_web(query: str, category: str = None, time_range: str = None) -> dict:
+    """Web search."""
+    async with NiaClient() as client:
+        return await client.search_web(query, category, time_range)
+
+
+async def search_deep(query: str) -> dict:
+    """Deep research agent (Pro only)."""
+    async with NiaClient() as client:
+        return await client.search_deep(query)
+
+
+async def search_universal(query: str, limit: int = 10) -> dict:
+    """Universal search across all public indexed sources."""
+    async with NiaClient() as client:
+        return await client.search_universal(query, limit)
+
+
+async def search_package_hybrid(
+    package: str, query: str, registry: str = "py_pi", limit: int = 10
+) -> dict:
+    """Semantic search within a package."""
+    async with NiaClient() as client:
+        return await client.search_package_hybrid(package, query, registry, limit)
+
+
+async def search_package_grep(
+    package: str, pattern: str, registry: str = "py_pi", limit: int = 10
+) -> dict:
+    """Regex search within a package."""
+    async with NiaClient() as client:
+        return await client.search_package_grep(package, pattern, registry, limit)
+
+
+# =============================================================================
+# REPOSITORIES API
+# =============================================================================
+
+
+async def repos_list(q: str = None, status: str = None, limit: int = 100, offset: int = 0) -> dict:
+    """List all indexed repositories."""
+    async with NiaClient() as client:
+        return await client.repos_list(q, status, limit, offset)
+
+
+async def repos_index(repo: str, github_token: str = None) -> dict:
+    """Index a new GitHub repository."""
+    async with NiaClient() as client:
+        return await client.repos_index(repo, github_token)
+
+
+async def repos_status(repository_id: str) -> dict:
+    """Get repository indexing status."""
+    async with NiaClient() as client:
+        return await client.repos_status(repository_id)
+
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+async def repos_delete(repository_id: str) -> dict:
+    """Delete a repository."""
+    async with NiaClient() as client:
+        return await client.repos_delete(repository_id)
+
+
+async def repos_rename(repository_id: str, display_name: str) -> dict:
+    """Rename a repository."""
+    async with NiaClient() as client:
+        return await client.repos_rename(repository_id, display_name)
+
+
+async def repos_tree(repository_id: str) -> dict:
+    """Get repository tree structure."""
+    async with NiaClient() as client:
+        return await client.repos_tree(repository_id)
+
+
+async def repos_content(repository_id: str, path: str) -> dict:
+    """Get repository file content."""
+    async with NiaClient() as client:
+        return await client.repos_content(repository_id, path)
+
+
+async def repos_grep(
+    repository_id: str, pattern: str, context_lines: int = 3, exhaustive: bool = False
+) -> dict:
+    """Search repository code with regex."""
+    async with NiaClient() as client:
+        return await client.repos_grep(repository_id, pattern, context_lines, exhaustive)
+
+
+# =============================================================================
+# DATA SOURCES API
+# =============================================================================
+
+
+async def sources_list(
+    q: str = None, status: str = None, source_type: str = None, limit: int = 100, offset: int = 0
+) -> dict:
+    """List all data sources."""
+    async with NiaClient() as client:
+        return await client.sources_list(q, status, source_type, limit, offset)
+
+
+async def sources_index(url_to_index: str, display_name: str = None) -> dict:
+    """Index a new data source (documentation website)."""
+    async with NiaClient() as client:
+        return await client.sources_index(url_to_index, display_name)
+
+
+async def sources_get(source_id: str) -> dict:
+    """Get data source details."""
+    async with NiaClient() as client:
+        return await client.sources_get(source_id)
+
+
+async def sources_delete(source_id: str) -> dict:
+    """Delete a data source."""
+    async with NiaClient() as client:
+        return await client.sources_delete(source_id)
+
+
+async def sources_content(source_id: str, path: str) -> dict:
+    """Get data source page content."""
+    async with NiaClient() as client:
+        return await client.sources_content(source_id, path)
+
+
+async def sources_tree(source_id: str) -> dict:
+    """Get documentation tree structure."""
+    async with NiaClient() as client:
+        return await client.sources_tree(source_id)
+
+
+async def sources_ls(source_id: str, path: str = "/") -> dict:
+    """List documentation directory contents."""
+    async with NiaClient() as client:
+        return await client.sources_ls(source_id, path)
+
+
+async def sources_read(source_id: str, path: str) -> dict:
+    """Read documentation page content."""
+    async with NiaClient() as client:
+        return await client.sources_read(source_id, path)
 
 
 async def sources_grep(source_id: str, pattern: str, context_lines: int = 3) -> dict:
     """Search documentation with regex."""
+    async with NiaClient() as client:
+        return await client.sources_grep(source_id, pattern, context_lines)
+
+
+async def sources_rename(source_id: str, display_name: str) -> dict:
+    """Rename a data source."""
+    async with NiaClient() as client:
+        return await client.sources_rename(source_id, display_name)
+
+
+# =============================================================================
+# RESEARCH PAPERS API
+# =============================================================================
+
+
+async def papers_list(limit: int = 50, offset: int = 0, status: str = None) -> dict:
+    """List indexed research papers."""
+    async with NiaClient() as client:
+        return await client.papers_list(limit, offset, status)
+
+
+async def papers_index(arxiv_id: str) -> dict:
+    """Index an arXiv research paper."""
+    async with NiaClient() as client:
+        return await client.papers_index(arxiv_id)
+
+
+# =============================================================================
+# CONTEXT SHARING API
+# =============================================================================
+
+
+async def context_list(
+    limit: int = 20, offset: int = 0, tags: str = None, agent_source: str = None
+) -> dict:
+    """List conversation contexts."""
+    async with NiaClient() as client:
+        return await client.context_list(limit, offset, tags, agent_source)
+
+
+async def context_save(
+    title: str, content: str, summary: str = None, tags: list[str] = None, metadata: dict = None
+) -> dict:
+    """Save conversation context."""
+    async with NiaClient() as client:
+        return await client.context_save(title, content, summary, tags, metadata)
+
+
+async def context_search_text(query: str) -> dict:
+    """Text search contexts."""
+    async with NiaClient() as client:
+        return await client.context_search_text(query)
+
+
+async def context_search_semantic(query: str) -> dict:
+    """Semantic search contexts using embeddings."""
+    async with NiaClient() as client:
+        return await client.context_search_semantic(query)
+
+
+async def context_get(context_id: str) -> dict:
+    """Get conversation context details."""
+    async with NiaClient() as client:
+        return await client.context_get(context_id)
+
+
+async def context_update(context_id: str, updates: dict) -> dict:
+    """Update conversation context."""
+    async with NiaClient() as client:
+        return await client.context_update(context_id, updates)
+
+
+async def context_delete(context_id: str) -> dict:
+    """Delete conversation context."""
+    async with NiaClient() as client:
+        return await client.context_delete(context_id)
+
+
+# =============================================================================
+# BATCH EXECUTION
+# =============================================================================
+
+# Client methods a batch job line may name in its "op" field. Streaming
+# endpoints print instead of returning a result, so they are not batchable.
+BATCH_OPS = frozenset(
+    {
+        "oracle_research",
+        "oracle_list_sessions",
+        "oracle_get_session",
+        "oracle_get_messages",
+        "oracle_list_jobs",
+        "oracle_create_job",
+        "oracle_get_job",
+        "oracle_cancel_job",
+        "search_query",
+        "search_web",
+        "search_deep",
+        "search_universal",
+        "search_package_hybrid",
+        "search_package_grep",
+        "repos_list",
+        "repos_index",
+        "repos_status",
+        "repos_delete",
+        "repos_rename",
+        "repos_tree",
+        "repos_content",
+        "repos_grep",
+        "sources_list",
+        "sources_index",
+        "sources_get",
+        "sources_delete",
+        "sources_content",
+        "sources_tree",
+        "sources_ls",
+        "sources_read",
+        "sources_grep",
+        "sources_rename",
+        "papers_list",
+        "papers_index",
+        "context_list",
+        "context_save",
+        "context_search_text",
+        "context_search_semantic",
+        "context_get",
+        "context_update",
+        "context_delete",
+    }
+)
+
+
+async def run_batch_job(client: NiaClient, job_id, job: dict) -> dict:
+    """Run one batch job and wrap its outcome in an NDJSON record."""
+    if not isinstance(job, dict):
+        return {"id": job_id, "ok": False, "error": "job must be a JSON object"}
+
+    op = job.get("op")
+    record = {"id": job_id, "op": op}
+    if op not in BATCH_OPS:
+        record.update(ok=False, error=f"unknown op: {op}")
+        return record
+
+    method = getattr(client, op)
+    kwargs = {k: v for k, v in job.items() if k not in ("id", "op")}
+    try:
+        inspect.signature(method).bind(**kwargs)
+    except TypeError as e:
+        record.update(ok=False, error=f"bad arguments: {e}")
+        return record
+
+    try:
+        result = await method(**kwargs)
+    except Exception as e:
+        record.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return record
+
+    if isinstance(result, dict) and "error" in result:
+        record.update(ok=False, error=result["error"])
+    else:
+        record.update(ok=True, result=result)
+    return record
+
+
+async def run_batch(client: NiaClient, stream, concurrency: int = 8, out=None) -> dict:
+    """Run JSONL jobs from ``stream`` concurrently, writing NDJSON records to ``out``.
+
+    Each input line is a JSON object with an ``op`` naming a client method
+    (see ``BATCH_OPS``), the method's keyword arguments, and an optional
+    ``id`` (defaults to the 1-based line number). At most ``concurrency`` jobs
+    run at once on the shared client; records are written in completion order.
+
+    Returns counts of ``ok`` and ``failed`` jobs.
+    """
+    out = out or sys.stdout
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"ok": 0, "failed": 0}
+
+    def emit(record: dict) -> None:
+        counts["ok" if record.get("ok") else "failed"] += 1
+        out.write(json.dumps(record, default=str) + "\n")
+        out.flush()
+
+    async def produce() -> None:
+        lineno = 0
+        while True:
+            # Read in a worker thread so a slow stdin never stalls running jobs
+            line = await loop.run_in_executor(None, stream.readline)
+            if not line:
+                break
+            lineno += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                emit({"id": lineno, "ok": False, "error": f"invalid JSON: {e}"})
+                continue
+            job_id = job.get("id", lineno) if isinstance(job, dict) else lineno
+            await queue.put((job_id, job))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            emit(await run_batch_job(client, *item))
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    return counts
+
+
+# =============================================================================
+# ORACLE FLEET
+# =============================================================================
+
+ORACLE_DONE_STATUSES = frozenset({"completed", "complete", "succeeded", "success", "done"})
+ORACLE_FAILED_STATUSES = frozenset({"failed", "error", "cancelled", "canceled"})
+
+
+def write_atomic(path: Path, data) -> None:
+    """Write ``data`` (str or bytes) to ``path`` via a temp file and rename."""
+    import tempfile
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+        # mkstemp creates 0600 files; give the result normal umask-based permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_oracle_queries(path: str, defaults: dict) -> list[dict]:
+    """Read research queries: one per line, as plain text or a JSON object.
+
+    JSON lines may set ``query``, ``repositories``, ``data_sources`` and
+    ``model``; anything missing comes from ``defaults``. Blank lines and lines
+    starting with ``#`` are skipped.
+    """
+    queries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            spec = json.loads(line) if line.startswith("{") else {"query": line}
+            queries.append({**defaults, **spec})
+    return queries
+
+
+def oracle_job_key(spec: dict) -> str:
+    """Stable identity of a research query, used for state and report names."""
+    import hashlib
+
+    material = json.dumps(
+        [spec["query"], spec.get("repositories"), spec.get("data_sources"), spec.get("model")],
+        sort_keys=True,
+    )
+    return hashlib.sha1(material.encode()).hexdigest()[:12]
+
+
+def oracle_report_path(out_dir: Path, spec: dict, key: str) -> Path:
+    import re
+
+    words = re.findall(r"[a-z0-9]+", spec["query"].lower())[:8]
+    return Path(out_dir) / f"{'-'.join(words) or 'query'}-{key}.md"
+
+
+async def follow_oracle_job(client: NiaClient, job_id: str, poll_interval: float = 10.0) -> dict:
+    """Wait for an Oracle job to finish and return its final job record.
+
+    Follows the job's event stream until it ends or reports a terminal status,
+    then polls the job until the server agrees it is finished. A stream that
+    cannot be opened or drops midway also falls back to polling.
+    """
     import aiohttp
 
-    url = f"{NIA_API_URL}/v2/data-sources/{source_id}/grep"
-    payload = {"pattern": pattern, "context_lines": context_lines}
+    try:
+        async for event in client.stream_events("GET", f"/v2/oracle/jobs/{job_id}/events"):
+            try:
+                data = json.loads(event.data)
+            except ValueError:
+                continue
+            status = str(data.get("status", "")).lower() if isinstance(data, dict) else ""
+            if status in ORACLE_DONE_STATUSES or status in ORACLE_FAILED_STATUSES:
+                break
+    except (RuntimeError, aiohttp.ClientError, asyncio.TimeoutError):
+        pass  # no usable event stream; fall back to polling
+
+    while True:
+        job = await client.oracle_get_job(job_id)
+        status = str(job.get("status", "")).lower()
+        if "error" in job or status in ORACLE_DONE_STATUSES or status in ORACLE_FAILED_STATUSES:
+            return job
+        await asyncio.sleep(poll_interval)
+
+
+async def run_oracle_fleet(
+    client: NiaClient,
+    queries: list[dict],
+    out_dir: Path,
+    state_path: Path,
+    concurrency: int = 5,
+    max_jobs: int = None,
+    retry_failed: bool = False,
+) -> dict:
+    """Submit, follow and collect many Oracle research jobs.
+
+    At most ``concurrency`` jobs are in flight at once and at most
+    ``max_jobs`` new jobs are submitted this run. Each finished report is
+    written to ``out_dir`` as soon as it completes. Progress is recorded in
+    ``state_path`` so an interrupted run resumes: completed queries are
+    skipped and submitted jobs are followed again rather than resubmitted.
+
+    Returns counts of completed, failed and skipped queries.
+    """
+    out_dir = Path(out_dir)
+    state_path = Path(state_path)
+    state = json.loads(state_path.read_text()) if state_path.exists() else {"jobs": {}}
+    jobs = state["jobs"]
+    semaphore = asyncio.Semaphore(concurrency)
+    budget = {"submits": max_jobs}
+    counts = {"completed": 0, "failed": 0, "skipped": 0}
+
+    def save() -> None:
+        write_atomic(state_path, json.dumps(state, indent=2))
+
+    async def run_one(spec: dict) -> None:
+        try:
+            await follow_one(spec)
+        except Exception as e:  # a dropped connection fails this job, not the fleet
+            entry = jobs[oracle_job_key(spec)]
+            entry.update(status="failed", error=str(e) or type(e).__name__)
+            save()
+            counts["failed"] += 1
+            print(f"failed  {spec['query'][:60]}: {entry['error']}", file=sys.stderr)
+
+    async def follow_one(spec: dict) -> None:
+        key = oracle_job_key(spec)
+        entry = jobs.setdefault(key, {"query": spec["query"]})
+        report_path = oracle_report_path(out_dir, spec, key)
+        if entry.get("status") == "completed" and report_path.exists():
+            counts["skipped"] += 1
+            return
+        if entry.get("status") == "failed":
+            if not retry_failed:
+                counts["skipped"] += 1
+                return
+            entry.pop("job_id", None)
+
+        async with semaphore:
+            if not entry.get("job_id"):
+                if budget["submits"] is not None:
+                    if budget["submits"] <= 0:
+                        counts["skipped"] += 1
+                        return
+                    budget["submits"] -= 1
+                created = await client.oracle_create_job(
+                    spec["query"],
+                    spec.get("repositories"),
+                    spec.get("data_sources"),
+                    spec.get("model") or "claude-opus-4-5-20251101",
+                )
+                job_id = created.get("job_id") or created.get("id")
+                if "error" in created or not job_id:
+                    entry.update(status="failed", error=created.get("error", "no job id returned"))
+                    save()
+                    counts["failed"] += 1
+                    print(f"failed  {spec['query'][:60]}: {entry['error']}", file=sys.stderr)
+                    return
+                entry.update(job_id=job_id, status="submitted")
+                save()
+                print(f"submitted {job_id}  {spec['query'][:60]}", file=sys.stderr)
+
+            job = await follow_oracle_job(client, entry["job_id"])
+
+        status = str(job.get("status", "")).lower()
+        if "error" in job or status not in ORACLE_DONE_STATUSES:
+            entry.update(status="failed", error=job.get("error") or job.get("status"))
+            save()
+            counts["failed"] += 1
+            print(f"failed  {entry['job_id']}: {entry['error']}", file=sys.stderr)
+            return
+
+        report = job.get("result") if isinstance(job.get("result"), dict) else job
+        write_atomic(report_path, f"<!-- {spec['query']} -->\n{format_oracle_result(report)}\n")
+        entry.update(status="completed", report=str(report_path))
+        entry.pop("error", None)
+        save()
+        counts["completed"] += 1
+        print(f"done    {entry['job_id']} -> {report_path}", file=sys.stderr)
+
+    await asyncio.gather(*(run_one(spec) for spec in queries))
+    return counts
+
+
+# =============================================================================
+# BULK INDEXING
+# =============================================================================
+
+INDEX_DONE_STATUSES = frozenset(
+    {"indexed", "completed", "complete", "ready", "success", "succeeded", "done"}
+)
+INDEX_FAILED_STATUSES = frozenset({"failed", "error", "cancelled", "canceled"})
+
+
+def read_lines(path: str) -> list[str]:
+    """Non-blank, non-comment lines of ``path`` (empty list when ``path`` is None)."""
+    if not path:
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def record_id(record: dict, *keys: str):
+    """First non-empty id among ``keys``, also looking one level into nested records."""
+    for key in keys:
+        if record.get(key):
+            return record[key]
+    for value in record.values():
+        if isinstance(value, dict):
+            found = record_id(value, *keys)
+            if found:
+                return found
+    return None
+
+
+def index_progress(record: dict):
+    """Indexing progress as a 0-1 fraction, or None if the record has none."""
+    for key in ("progress", "progress_percent", "percent", "percentage"):
+        value = record.get(key)
+        if isinstance(value, dict):
+            value = value.get("percent", value.get("progress"))
+        if isinstance(value, (int, float)):
+            return max(0.0, min(1.0, value / 100 if value > 1 else value))
+    return None
+
+
+async def submit_many(submit, items: list, concurrency: int = 8) -> list[dict]:
+    """Call ``submit(item)`` for every item concurrently; results keep input order."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            return await submit(item)
+
+    return await asyncio.gather(*(one(item) for item in items))
+
+
+async def watch_indexing(
+    fetch_status,
+    pending: dict,
+    min_interval: float = 2.0,
+    max_interval: float = 60.0,
+    timeout: float = None,
+) -> dict:
+    """Poll many indexing jobs from one loop until all finish.
+
+    ``pending`` maps item id to a display label; ``fetch_status(id)`` returns
+    the item's status record. Each item has its own polling interval. Once
+    two polls show progress, the next poll lands halfway to the projected
+    finish, so items far from done are polled rarely and nearly-done ones
+    often. Until then the interval doubles after each poll. An aggregate
+    progress line goes to stderr.
+
+    Returns a mapping of id to final record; items still unfinished at
+    ``timeout`` seconds keep their last record.
+    """
+    import heapq
+
+    start = time.monotonic()
+    final = {}
+    last = {}
+    intervals = {item_id: min_interval for item_id in pending}
+    seen_progress = {}
+    due = [(start, item_id) for item_id in pending]
+    heapq.heapify(due)
+    tty = sys.stderr.isatty()
+
+    def report() -> None:
+        failed = sum(
+            1
+            for record in final.values()
+            if str(record.get("status", "")).lower() not in INDEX_DONE_STATUSES
+        )
+        fractions = [index_progress(r) for r in last.values() if r.get("status")]
+        known = [f for f in fractions if f is not None]
+        avg = f", avg {sum(known) / len(known):.0%}" if known else ""
+        line = (
+            f"indexing: {len(final) - failed}/{len(pending)} done, {failed} failed, "
+            f"{len(pending) - len(final)} pending{avg}"
+        )
+        print(f"\r{line}" if tty else line, end="" if tty else "\n", file=sys.stderr, flush=True)
+
+    async def poll(item_id):
+        record = await fetch_status(item_id)
+        now = time.monotonic()
+        last[item_id] = record
+        status = str(record.get("status", "")).lower()
+        if "error" in record or status in INDEX_DONE_STATUSES | INDEX_FAILED_STATUSES:
+            final[item_id] = record
+            return
+        progress = index_progress(record)
+        previous = seen_progress.get(item_id)
+        if progress is not None and previous is not None and progress > previous[0]:
+            # Poll again around halfway to the projected finish
+            rate = (progress - previous[0]) / (now - previous[1])
+            interval = (1 - progress) / rate / 2
+        else:
+            interval = intervals[item_id] * 2
+        if progress is not None:
+            seen_progress[item_id] = (progress, now)
+        intervals[item_id] = max(min_interval, min(max_interval, interval))
+        heapq.heappush(due, (now + intervals[item_id], item_id))
+
+    while due:
+        now = time.monotonic()
+        if timeout is not None and now - start >= timeout:
+            break
+        wait = due[0][0] - now
+        if wait > 0:
+            if timeout is not None:
+                wait = min(wait, start + timeout - now)
+            await asyncio.sleep(wait)
+            continue
+        batch = []
+        while due and due[0][0] <= now:
+            batch.append(heapq.heappop(due)[1])
+        await asyncio.gather(*(poll(item_id) for item_id in batch))
+        report()
+
+    if tty:
+        print(file=sys.stderr)
+    for item_id in pending:
+        final.setdefault(item_id, last.get(item_id, {"status": "unknown"}))
+    return final
+
+
+async def index_many(
+    client: NiaClient,
+    kind: str,
+    items: list[str],
+    concurrency: int = 8,
+    wait: bool = True,
+    timeout: float = None,
+    github_token: str = None,
+) -> dict:
+    """Submit many repositories (``kind="repos"``) or doc sites (``kind="sources"``) for
+    indexing, then wait for all of them with one shared status watcher.
+
+    Returns ``{"submitted": {item: id}, "failed": {item: error}, "status": {id: status}}``.
+    """
+    if kind == "repos":
+        results = await submit_many(
+            lambda repo: client.repos_index(repo, github_token), items, concurrency
+        )
+        id_keys = ("repository_id", "id")
+        fetch_status = functools.partial(client.repos_status, fresh=True)
+    else:
+        results = await submit_many(client.sources_index, items, concurrency)
+        id_keys = ("source_id", "data_source_id", "id")
+        fetch_status = functools.partial(client.sources_get, fresh=True)
+
+    summary = {"submitted": {}, "failed": {}, "status": {}}
+    for item, result in zip(items, results):
+        if "error" in result:
+            summary["failed"][item] = result["error"]
+            continue
+        # Repositories are addressable by owner/repo when no id is returned
+        item_id = record_id(result, *id_keys) or (item if kind == "repos" else None)
+        if item_id is None:
+            summary["failed"][item] = "no id in response"
+            continue
+        summary["submitted"][item] = item_id
+
+    if wait and summary["submitted"]:
+        pending = {item_id: item for item, item_id in summary["submitted"].items()}
+        final = await watch_indexing(fetch_status, pending, timeout=timeout)
+        summary["status"] = {
+            item_id: record.get("status", record.get("error")) for item_id, record in final.items()
+        }
+    return summary
+
+
+# =============================================================================
+# CONTEXT IMPORT
+# =============================================================================
+
+# Files picked up when a directory is imported
+CONTEXT_IMPORT_SUFFIXES = (".md", ".markdown", ".txt", ".json", ".jsonl")
+# Largest chunk uploaded as one context, in characters
+CONTEXT_CHUNK_CHARS = 50_000
+# The manifest is rewritten after this many uploads, so an interrupted run loses little
+CONTEXT_MANIFEST_EVERY = 50
+
+
+def context_manifest_path() -> Path:
+    return NIA_CACHE_DIR / "context-import.json"
+
+
+def expand_inputs(patterns: list[str]) -> list[Path]:
+    """Files named by ``patterns``: files, directories (searched recursively for
+    ``CONTEXT_IMPORT_SUFFIXES``) and globs (``**`` recurses). Sorted, no duplicates.
+    """
+    import glob
+
+    files = set()
+    for pattern in patterns:
+        path = Path(pattern).expanduser()
+        if path.is_dir():
+            matches = (p for p in path.rglob("*") if p.suffix.lower() in CONTEXT_IMPORT_SUFFIXES)
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = map(Path, glob.glob(str(path), recursive=True))
+        files.update(p for p in matches if p.is_file())
+    return sorted(files)
+
+
+def chunk_text(text: str, limit: int = CONTEXT_CHUNK_CHARS) -> list[str]:
+    """Split ``text`` into chunks of at most ``limit`` characters.
+
+    Cuts fall on paragraph breaks where possible, then on line breaks, and
+    only split a line when it alone exceeds ``limit``.
+    """
+    if len(text) <= limit:
+        return [text]
+    chunks = []
+    current = ""
+    for piece in text.split("\n\n"):
+        lines = piece.split("\n") if len(piece) > limit else [piece]
+        for i, line in enumerate(lines):
+            sep = "\n" if i else "\n\n"
+            if current and len(current) + len(sep) + len(line) > limit:
+                chunks.append(current)
+                current = ""
+            while len(line) > limit:
+                chunks.append(line[:limit])
+                line = line[limit:]
+            current = f"{current}{sep}{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def context_title(path: Path, text: str) -> str:
+    """The first markdown heading of ``text``, else the file name."""
+    for line in text.splitlines()[:20]:
+        if line.startswith("# "):
+            return line[2:].strip()
+    return path.stem
+
+
+async def import_contexts(
+    client: NiaClient,
+    patterns: list[str],
+    tags: list[str] = None,
+    concurrency: int = 8,
+    chunk_chars: int = CONTEXT_CHUNK_CHARS,
+    manifest: Path = None,
+    dry_run: bool = False,
+) -> dict:
+    """Save every file matched by ``patterns`` as one or more contexts.
+
+    Files are split with ``chunk_text`` and each chunk is keyed by the
+    SHA-256 of its content. Chunks already listed in the manifest (default
+    ``~/.cache/nia-docs/context-import.json``) are skipped, so re-runs upload
+    only new or changed content, and identical chunks are uploaded once. The
+    rest are saved concurrently through the client's rate limiter.
+
+    Returns counts of files, chunks, uploaded and skipped chunks, plus
+    ``failed`` (``"path#chunk"`` -> error).
+    """
+    import hashlib
+
+    manifest = Path(manifest) if manifest else context_manifest_path()
+    state = json.loads(manifest.read_text()) if manifest.exists() else {}
+    known = state.setdefault("chunks", {})
+
+    files = expand_inputs(patterns)
+    pending = {}
+    stats = {"files": len(files), "chunks": 0, "uploaded": 0, "skipped": 0, "failed": {}}
+    for path in files:
+        try:
+            text = path.read_text(errors="replace")
+        except OSError as e:
+            stats["failed"][str(path)] = str(e)
+            continue
+        title = context_title(path, text)
+        chunks = chunk_text(text, chunk_chars)
+        for i, chunk in enumerate(chunks):
+            if not chunk.strip():
+                continue
+            stats["chunks"] += 1
+            digest = hashlib.sha256(chunk.encode()).hexdigest()
+            if digest in known or digest in pending:
+                stats["skipped"] += 1
+                continue
+            part = f"{title} ({i + 1}/{len(chunks)})" if len(chunks) > 1 else title
+            metadata = {"source_path": str(path), "chunk": i, "chunks": len(chunks)}
+            metadata["sha256"] = digest
+            pending[digest] = (f"{path}#{i}", part, chunk, metadata)
+    if dry_run:
+        stats["would_upload"] = len(pending)
+        return stats
+
+    done = 0
+
+    async def upload(digest: str) -> None:
+        nonlocal done
+        label, title, chunk, metadata = pending[digest]
+        result = await client.context_save(title, chunk, tags=tags, metadata=metadata)
+        if "error" in result:
+            stats["failed"][label] = result["error"]
+            return
+        known[digest] = {
+            "id": record_id(result, "context_id", "id"),
+            "path": metadata["source_path"],
+            "chunk": metadata["chunk"],
+            "uploaded_at": time.time(),
+        }
+        stats["uploaded"] += 1
+        done += 1
+        if done % CONTEXT_MANIFEST_EVERY == 0:
+            write_atomic(manifest, json.dumps(state))
+
+    try:
+        await submit_many(upload, list(pending), concurrency)
+    finally:
+        write_atomic(manifest, json.dumps(state))
+    return stats
+
+
+# =============================================================================
+# CONTEXT REPLICA
+# =============================================================================
+
+# Width of the hashed term vectors used for offline similarity
+CONTEXT_VECTOR_DIMS = 512
+
+
+def hashed_vector(text: str):
+    """L2-normalized feature-hashed vector of the terms and term pairs of ``text``.
+
+    A dependency-free stand-in for an embedding: similar wording gives
+    similar vectors, and no model or vocabulary has to be stored.
+    """
+    import math
+    import zlib
+    from array import array
+    from collections import Counter
+
+    terms = tokenize(text)
+    features = Counter(terms)
+    features.update(f"{a} {b}" for a, b in zip(terms, terms[1:]))
+    vector = array("f", bytes(4 * CONTEXT_VECTOR_DIMS))
+    for feature, tf in features.items():
+        h = zlib.crc32(feature.encode())
+        weight = 1 + math.log(tf)
+        vector[h % CONTEXT_VECTOR_DIMS] += weight if h & 0x80000000 else -weight
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+def context_marker(record: dict):
+    """Change marker of a context in a list response: its update (or creation) time."""
+    marker = record.get("updated_at") or record.get("created_at")
+    return str(marker) if marker is not None else None
+
+
+class ContextStore:
+    """Local SQLite replica of the saved contexts, searchable offline.
+
+    Each context is stored with its change marker and hashed vector, and
+    mirrored into an FTS5 table (when the SQLite build has FTS5) for BM25
+    keyword search. ``search`` fuses the keyword and vector rankings.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else NIA_CACHE_DIR / "contexts.sqlite"
+        self.fts = True
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS contexts (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    tags TEXT NOT NULL,
+                    marker TEXT,
+                    record TEXT NOT NULL,
+                    vector BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+                """)
+            try:
+                self._db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS contexts_fts USING fts5("
+                    "id UNINDEXED, title, summary, content, tags)"
+                )
+            except sqlite3.OperationalError:
+                self.fts = False
+        return self._db
+
+    def markers(self) -> dict:
+        """Context id -> change marker of every stored context."""
+        return dict(self.db.execute("SELECT id, marker FROM contexts"))
+
+    def put_many(self, records: list) -> None:
+        """Insert or replace ``(id, record, marker)`` triples in one transaction."""
+        db = self.db
+        db.execute("BEGIN")
+        try:
+            for context_id, record, marker in records:
+                title = str(record.get("title") or "")
+                summary = str(record.get("summary") or "")
+                content = str(record.get("content") or "")
+                tags = record.get("tags") or []
+                tags = " ".join(tags) if isinstance(tags, list) else str(tags)
+                vector = hashed_vector(f"{title}\n{summary}\n{tags}\n{content}")
+                db.execute(
+                    "INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        context_id,
+                        title,
+                        summary,
+                        content,
+                        tags,
+                        marker,
+                        dumps_json(record),
+                        vector.tobytes(),
+                    ),
+                )
+                if self.fts:
+                    db.execute("DELETE FROM contexts_fts WHERE id = ?", (context_id,))
+                    db.execute(
+                        "INSERT INTO contexts_fts VALUES (?, ?, ?, ?, ?)",
+                        (context_id, title, summary, content, tags),
+                    )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def remove(self, context_ids) -> int:
+        for context_id in context_ids:
+            self.db.execute("DELETE FROM contexts WHERE id = ?", (context_id,))
+            if self.fts:
+                self.db.execute("DELETE FROM contexts_fts WHERE id = ?", (context_id,))
+        return len(context_ids)
+
+    def get_meta(self, name: str):
+        row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_meta(self, name: str, value) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, json.dumps(value)))
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM contexts").fetchone()[0]
+
+    def _keyword(self, query: str, limit: int) -> list[dict]:
+        terms = tokenize(query)
+        if not self.fts or not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        rows = self.db.execute(
+            "SELECT id, title, snippet(contexts_fts, 3, '', '', '...', 40) FROM contexts_fts "
+            "WHERE contexts_fts MATCH ? ORDER BY bm25(contexts_fts) LIMIT ?",
+            (match, limit),
+        )
+        return [{"id": i, "title": t, "snippet": " ".join(s.split())} for i, t, s in rows]
+
+    def _similar(self, query: str, limit: int) -> list[dict]:
+        from array import array
+
+        weights = [(i, w) for i, w in enumerate(hashed_vector(query)) if w]
+        if not weights:
+            return []
+        scored = []
+        for context_id, title, content, blob in self.db.execute(
+            "SELECT id, title, content, vector FROM contexts"
+        ):
+            vector = array("f", blob)
+            score = sum(vector[i] * w for i, w in weights)
+            if score > 0:
+                scored.append((score, context_id, title, content))
+        scored.sort(key=lambda row: -row[0])
+        return [
+            {"id": i, "title": t, "snippet": best_snippet(c, query)}
+            for _, i, t, c in scored[:limit]
+        ]
+
+    def search(self, query: str, limit: int = 10) -> dict:
+        """Keyword (FTS5 BM25) and hashed-vector results fused with RRF.
+
+        Returns ``{"results": [...]}`` like the remote search endpoints.
+        """
+        ranked = {
+            "keyword": self._keyword(query, limit * 2),
+            "vector": self._similar(query, limit * 2),
+        }
+        for hits in ranked.values():
+            for hit in hits:
+                hit["url"] = f"context:{hit['id']}"
+        return {"results": reciprocal_rank_fusion(ranked)[:limit]}
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+async def sync_contexts(
+    client: NiaClient, store: ContextStore, concurrency: int = 8, full: bool = False
+) -> dict:
+    """Bring the local replica up to date with the saved contexts.
+
+    The context list endpoint has no updated-since filter, so every sync
+    lists all contexts (fresh, not from the response cache) and diffs them
+    on the client: only contexts that are new or whose ``updated_at``
+    changed are fetched in full; ``full`` re-fetches all. Contexts deleted
+    remotely are removed. The time of the sync is kept as the ``synced_at``
+    meta value. Raises RuntimeError if listing fails.
+    """
+    known = store.markers()
+    seen = set()
+    stale = []
+    listing = functools.partial(client.context_list, fresh=True)
+    async for item in client.paginate(listing):
+        context_id = record_id(item, "id", "context_id")
+        if not context_id:
+            continue
+        seen.add(context_id)
+        marker = context_marker(item)
+        if full or context_id not in known or (marker is not None and known[context_id] != marker):
+            stale.append((context_id, item, marker))
+
+    async def fetch(entry: tuple):
+        context_id, item, marker = entry
+        if item.get("content") is not None:
+            return context_id, item, marker
+        result = await client.context_get(context_id)
+        if "error" in result:
+            return context_id, result, None
+        record = result.get("context") if isinstance(result.get("context"), dict) else result
+        return context_id, {**item, **record}, marker
+
+    fetched = await submit_many(fetch, stale, concurrency)
+    failed = {context_id: r["error"] for context_id, r, _ in fetched if "error" in r}
+    store.put_many([entry for entry in fetched if "error" not in entry[1]])
+    removed = store.remove([context_id for context_id in known if context_id not in seen])
+    store.set_meta("synced_at", time.time())
+    return {
+        "listed": len(seen),
+        "fetched": len(fetched) - len(failed),
+        "unchanged": len(seen) - len(stale),
+        "removed": removed,
+        "failed": failed,
+        "stored": store.count(),
+    }
+
+
+# =============================================================================
+# LOCAL MIRRORS
+# =============================================================================
+
+# Keys under which tree responses nest their entries
+TREE_CONTAINER_KEYS = ("tree", "files", "entries", "children", "items", "nodes", "pages")
+TREE_DIR_TYPES = frozenset({"dir", "directory", "tree", "folder"})
+# Entry fields that change whenever a file's content does
+FINGERPRINT_KEYS = (
+    "sha",
+    "hash",
+    "etag",
+    "checksum",
+    "content_hash",
+    "last_modified",
+    "updated_at",
+)
+
+MIRROR_MANIFEST = ".nia-mirror.json"
+
+
+def iter_tree_files(node, prefix: str = ""):
+    """Yield ``(path, entry)`` for every file in a repository or source tree.
+
+    Accepts the shapes tree endpoints return: entry lists with ``path``/``name``
+    and ``type`` fields (optionally nested through ``children``), wrapper
+    objects holding such lists, and plain nested name -> subtree mappings.
+    """
+    if isinstance(node, list):
+        for entry in node:
+            yield from iter_tree_files(entry, prefix)
+        return
+    if not isinstance(node, dict):
+        return
+
+    container = next((node[k] for k in TREE_CONTAINER_KEYS if k in node), None)
+    name = node.get("path", node.get("name"))
+    if isinstance(name, str):
+        path = name if "path" in node else f"{prefix}/{name}" if prefix else name
+        if container is not None or str(node.get("type", "")).lower() in TREE_DIR_TYPES:
+            yield from iter_tree_files(container or [], path)
+        else:
+            yield path, node
+    elif container is not None:
+        yield from iter_tree_files(container, prefix)
+    else:
+        for name, child in node.items():
+            path = f"{prefix}/{name}" if prefix else name
+            if isinstance(child, (dict, list)) and child:
+                yield from iter_tree_files(child, path)
+            else:
+                yield path, {"value": child}
+
+
+def tree_fingerprint(entry: dict):
+    """Change marker of a tree entry (hash, etag, mtime, ...), or None if it has none."""
+    marks = {k: entry[k] for k in FINGERPRINT_KEYS if entry.get(k) is not None}
+    if not marks and entry.get("size") is None:
+        return None
+    marks["size"] = entry.get("size")
+    return json.dumps(marks, sort_keys=True, default=str)
+
+
+def page_text(result: dict) -> str:
+    """Text of a page/file content response."""
+    for key in ("content", "text", "markdown", "data"):
+        value = result.get(key)
+        if isinstance(value, str):
+            return value
+    return json.dumps(result, indent=2, default=str)
+
+
+def mirror_file_path(dest: Path, path: str) -> Path:
+    """Local path for a remote ``path`` under ``dest``; rejects escapes like ``..``."""
+    parts = [p for p in path.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError(f"unsafe path: {path!r}")
+    return dest.joinpath(*parts)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+async def mirror_tree(
+    client: NiaClient, kind: str, item_id: str, dest: Path, concurrency: int = 16
+) -> dict:
+    """Sync a repository (``kind="repos"``) or data source (``kind="sources"``) into ``dest``.
+
+    Walks the remote tree and fetches files concurrently, writing each one
+    atomically. ``dest/.nia-mirror.json`` records every file's remote
+    fingerprint and content hash. Re-runs skip files whose fingerprint is
+    unchanged, only rewrite files whose content actually changed, and delete
+    files that no longer exist remotely. File bodies bypass the response
+    cache: they already live on disk, and a large mirror would evict
+    everything else from it.
+    """
+    import hashlib
+
+    dest = Path(dest)
+    manifest_path = dest / MIRROR_MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    if manifest.get("kind", kind) != kind or manifest.get("id", item_id) != item_id:
+        raise ValueError(f"{dest} mirrors {manifest.get('kind')} {manifest.get('id')}")
+    known = manifest.get("files", {})
+
+    if kind == "repos":
+        fetch = functools.partial(client.repos_content, item_id)
+    else:
+        fetch = functools.partial(client.sources_read, item_id)
+
+    files = {}
+    async for path, entry in client.iter_tree(kind, item_id, fresh=True):
+        files.setdefault(path, tree_fingerprint(entry))
+
+    stats = {"files": len(files), "fetched": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+    failed = {}
+    updated = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def sync(path: str, fingerprint) -> None:
+        previous = known.get(path)
+        local = mirror_file_path(dest, path)
+        if previous and fingerprint and previous.get("fingerprint") == fingerprint:
+            if local.exists():
+                updated[path] = previous
+                stats["skipped"] += 1
+                return
+        async with semaphore:
+            result = await fetch(path)
+        if "error" in result:
+            failed[path] = result["error"]
+            if previous:
+                updated[path] = previous
+            return
+        data = page_text(result).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        if previous and previous.get("sha256") == digest and local.exists():
+            stats["unchanged"] += 1
+        else:
+            write_atomic(local, data)
+            stats["fetched"] += 1
+        updated[path] = {"fingerprint": fingerprint, "sha256": digest, "size": len(data)}
+
+    async def guarded(path: str, fingerprint) -> None:
+        try:
+            await sync(path, fingerprint)
+        except (OSError, ValueError) as e:
+            failed[path] = str(e)
+
+    token = SKIP_CACHE.set(True)
+    try:
+        await asyncio.gather(*(guarded(path, fp) for path, fp in files.items()))
+    finally:
+        SKIP_CACHE.reset(token)
+
+    for path in set(known) - set(files):
+        try:
+            mirror_file_path(dest, path).unlink()
+        except (FileNotFoundError, ValueError):
+            continue
+        stats["removed"] += 1
+
+    manifest = {"kind": kind, "id": item_id, "synced_at": time.time(), "files": updated}
+    write_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True))
+    register_mirror(dest, kind, item_id)
+    stats["failed"] = failed
+    return stats
+
+
+# =============================================================================
+# STREAMING TREES
+# =============================================================================
+
+# One JSON token, after optional whitespace: string, punctuation, number or literal
+JSON_TOKEN = (
+    r'[ \t\r\n]*(?:("[^"\\]*(?:\\.[^"\\]*)*")|([{}\[\]:,])'
+    r"|(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)|(true|false|null))"
+)
+
+
+TREE_CHUNK_BYTES = 64 * 1024
+
+# The longest prefix of an object holding no nested object or array
+FLAT_OBJECT = r'\{(?:[^{}\[\]"]+|"[^"\\]*(?:\\.[^"\\]*)*")*'
+
+
+class JSONEvents:
+    """Incremental JSON tokenizer producing ijson-style ``(event, value)`` pairs.
+
+    The pure-Python fallback for ``ijson.basic_parse_async``: bytes are fed
+    as they arrive and every complete token is turned into an event
+    (``start_map``, ``map_key``, ``string``, ``number``, ...). A token split
+    across chunks is held back until the rest arrives. As a shortcut, an
+    object without nested objects or arrays (a typical file entry) is
+    decoded in one piece and reported as a single ``("value", dict)`` event.
+    """
+
+    def __init__(self):
+        import codecs
+        import re
+
+        self.token = re.compile(JSON_TOKEN)
+        self.flat = re.compile(FLAT_OBJECT)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.stack: list[str] = []
+        self.expect_key = False
+
+    def feed(self, data: bytes, final: bool = False) -> list:
+        buffer = self.buffer + self.decoder.decode(data, final)
+        events = []
+        pos, end = 0, len(buffer)
+        stack, token = self.stack, self.token
+        while True:
+            match = token.match(buffer, pos)
+            if match is None:
+                break
+            string, punct, number, literal = match.groups()
+            if number and not final and (match.end() == end or buffer[match.end()] in ".eE"):
+                break  # the number may continue in the next chunk
+            pos = match.end()
+            if string is not None:
+                value = string[1:-1] if "\\" not in string else json.loads(string)
+                if self.expect_key:
+                    events.append(("map_key", value))
+                    self.expect_key = False
+                else:
+                    events.append(("string", value))
+            elif punct == "{":
+                flat = self.flat.match(buffer, match.end() - 1)
+                if flat.end() == end and not final or buffer[flat.end() : flat.end() + 1] == '"':
+                    pos = match.start()
+                    break  # the object (or a string in it) continues in the next chunk
+                if buffer[flat.end() : flat.end() + 1] == "}":
+                    events.append(("value", loads_json(buffer[flat.start() : flat.end() + 1])))
+                    pos = flat.end() + 1
+                    continue
+                events.append(("start_map", None))
+                stack.append("m")
+                self.expect_key = True
+            elif punct == "}":
+                events.append(("end_map", None))
+                stack.pop()
+            elif punct == "[":
+                events.append(("start_array", None))
+                stack.append("a")
+            elif punct == "]":
+                events.append(("end_array", None))
+                stack.pop()
+            elif punct == ",":
+                self.expect_key = stack[-1] == "m"
+            elif number is not None:
+                is_float = "." in number or "e" in number or "E" in number
+                events.append(("number", float(number) if is_float else int(number)))
+            elif literal == "null":
+                events.append(("null", None))
+            elif literal is not None:
+                events.append(("boolean", literal == "true"))
+        self.buffer = buffer[pos:]
+        if final and (self.buffer.strip() or stack):
+            raise ValueError("Truncated or invalid JSON in tree response")
+        return events
+
+
+class TreeNode:
+    """A tree object being parsed; its child tree containers are streamed, not stored."""
+
+    __slots__ = ("parent", "fields", "key", "own", "absolute", "streamed")
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.fields = {}
+        self.key = None
+        self.own = None  # its "path" (absolute) or "name" (relative), once seen
+        self.absolute = False
+        self.streamed = False  # a child tree list has started; ``own`` is final
+
+
+class TreeArray:
+    """A tree list being parsed; its elements are tree nodes."""
+
+    __slots__ = ("parent",)
+
+    def __init__(self, parent):
+        self.parent = parent
+
+
+class TreeValue:
+    """A nested value inside a file entry, built in full."""
+
+    __slots__ = ("parent", "value", "key")
+
+    def __init__(self, parent, value):
+        self.parent = parent
+        self.value = value
+        self.key = None
+
+
+class TreeStream:
+    """``iter_tree_files`` over a stream of JSON parse events.
+
+    Lists under ``TREE_CONTAINER_KEYS`` are never materialized: each file
+    entry is yielded (and forgotten) as soon as its object closes, so memory
+    stays proportional to tree depth rather than tree size. A node's name must
+    precede its child list: a node whose children start before any
+    ``name``/``path`` (such as the ``{"tree": [...]}`` wrapper) is transparent
+    and adds nothing to the paths below it. Objects of other shapes (name ->
+    subtree mappings) are built and walked on close. ``keep`` filters the
+    full paths that are yielded.
+    """
+
+    def __init__(self, keep=None):
+        self.keep = keep
+        self.top = None
+        self.ready: list[tuple] = []
+
+    def feed(self, events) -> list:
+        """Consume parse events; returns the ``(path, entry)`` pairs they completed."""
+        for event, value in events:
+            top = self.top
+            if event == "start_map" or event == "start_array":
+                container = {} if event == "start_map" else []
+                if isinstance(top, TreeValue) or (
+                    isinstance(top, TreeNode) and top.key not in TREE_CONTAINER_KEYS
+                ):
+                    self.top = TreeValue(top, container)
+                else:
+                    if isinstance(top, TreeNode):
+                        top.streamed = True
+                    self.top = TreeNode(top) if event == "start_map" else TreeArray(top)
+            elif event == "map_key":
+                top.key = value
+            elif event == "end_map" or event == "end_array":
+                self.top = top.parent
+                if isinstance(top, TreeValue):
+                    self._store(top.parent, top.value)
+                elif isinstance(top, TreeNode):
+                    self._close(top)
+            elif event == "value" and not (
+                isinstance(top, TreeValue)
+                or (isinstance(top, TreeNode) and top.key not in TREE_CONTAINER_KEYS)
+            ):
+                # A whole flat object from JSONEvents: close it as a node at once
+                if isinstance(top, TreeNode):
+                    top.streamed = True
+                node = TreeNode(top)
+                node.fields = value
+                self._close(node)
+            else:
+                self._store(top, value)
+        ready, self.ready = self.ready, []
+        return ready
+
+    def _store(self, frame, value) -> None:
+        if isinstance(frame, TreeValue):
+            if isinstance(frame.value, list):
+                frame.value.append(value)
+            else:
+                frame.value[frame.key] = value
+        elif isinstance(frame, TreeNode):
+            frame.fields[frame.key] = value
+            # "path" (absolute) wins over "name" (relative), as in iter_tree_files;
+            # once children have been passed up the node's prefix cannot change
+            if (
+                frame.key in ("path", "name")
+                and isinstance(value, str)
+                and not frame.absolute
+                and not frame.streamed
+            ):
+                frame.own = value
+                frame.absolute = frame.key == "path"
+
+    def _close(self, node: TreeNode) -> None:
+        if node.streamed:
+            return  # a directory or wrapper: its files were already passed up
+        # A file entry or a mapping; "\0" marks paths relative to the parent
+        for path, entry in iter_tree_files(node.fields, "\0"):
+            if path.startswith("\0/"):
+                self._up(node.parent, path[2:], entry, False)
+            else:
+                self._up(node.parent, path, entry, True)
+
+    def _up(self, frame, path: str, entry, absolute: bool) -> None:
+        """Pass a result up through the enclosing nodes, prefixing their names."""
+        while frame is not None:
+            if isinstance(frame, TreeNode) and not absolute and frame.own is not None:
+                path = f"{frame.own}/{path}"
+                absolute = frame.absolute
+            frame = frame.parent
+        if self.keep is None or self.keep(path):
+            self.ready.append((path, entry))
+
+
+def tree_filter(prefix: str = None, glob: str = None):
+    """Path predicate for ``--prefix``/``--glob``, or None when neither is set.
+
+    Globs are shell-style and ``*`` also matches across ``/``.
+    """
+    if not prefix and not glob:
+        return None
+    import fnmatch
+
+    prefix = prefix.strip("/") if prefix else None
+
+    def keep(path: str) -> bool:
+        if prefix and not (path == prefix or path.startswith(prefix + "/")):
+            return False
+        return not glob or fnmatch.fnmatchcase(path, glob)
+
+    return keep
+
+
+# =============================================================================
+# STREAMING CONTENT
+# =============================================================================
+
+CONTENT_CHUNK_BYTES = 64 * 1024
+
+# The characters that end a run of plain text inside a JSON string
+JSON_STRING_STOP = r'["\\]'
+# Any JSON structural character, outside strings
+JSON_STRUCTURE = r'["{}\[\]:,]'
+# One escape sequence; a surrogate pair is taken whole
+JSON_ESCAPE = r"\\(?:u[dD][89abAB][0-9a-fA-F]{2}\\u[0-9a-fA-F]{4}|u[0-9a-fA-F]{4}|.)"
+JSON_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JSONStringField:
+    """Incremental decoder for one string field of a JSON object response.
+
+    ``feed`` takes body bytes as they arrive and returns the decoded text of
+    the top-level field ``name`` found in them. Other values are skipped
+    without being decoded, and an escape or UTF-8 sequence split across
+    chunks is held back until the rest arrives, so memory stays at one chunk
+    however long the string is. ``found`` and ``done`` report whether the
+    field has started and ended.
+    """
+
+    def __init__(self, name: str):
+        import codecs
+        import re
+
+        self.name = name
+        self.stop = re.compile(JSON_STRING_STOP)
+        self.structure = re.compile(JSON_STRUCTURE)
+        self.escape = re.compile(JSON_ESCAPE)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.pending = ""  # an escape sequence split across chunks
+        self.depth = 0
+        self.in_string = False  # inside a string other than the field's value
+        self.in_value = False
+        self.string = []  # the top-level key being read
+        self.key = None  # the key whose value comes next
+        self.after_colon = False
+        self.found = False
+        self.done = False
+
+    def feed(self, data: bytes, final: bool = False) -> str:
+        text = self.pending + self.decoder.decode(data, final)
+        self.pending = ""
+        out = []
+        pos, end = 0, len(text)
+        while pos < end and not self.done:
+            if self.in_value or self.in_string:
+                match = self.stop.search(text, pos)
+                stop = end if match is None else match.start()
+                if self.in_value:
+                    out.append(text[pos:stop])
+                elif self.depth == 1 and not self.after_colon:
+                    self.string.append(text[pos:stop])
+                if match is None:
+                    break
+                if text[stop] == '"':
+                    pos = stop + 1
+                    if self.in_value:
+                        self.done = True
+                    elif self.depth == 1 and not self.after_colon:
+                        raw = "".join(self.string)
+                        self.key = json.loads(f'"{raw}"') if "\\" in raw else raw
+                    self.in_string = self.in_value = False
+                    self.after_colon = False
+                    continue
+                if end - stop < 12 and not final:
+                    self.pending = text[stop:]  # the escape may continue in the next chunk
+                    break
+                match = self.escape.match(text, stop)
+                if match is None:
+                    raise ValueError("Invalid escape in JSON string")
+                escape = match.group()
+                if self.in_value:
+                    out.append(JSON_ESCAPES.get(escape[1:]) or json.loads(f'"{escape}"'))
+                elif self.depth == 1 and not self.after_colon:
+                    self.string.append(escape)
+                pos = match.end()
+                continue
+            match = self.structure.search(text, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                if self.depth == 1 and self.after_colon and self.key == self.name:
+                    self.in_value = self.found = True
+                else:
+                    self.in_string = True
+                    self.string = []
+                continue
+            if char == ":":
+                self.after_colon = True
+                continue
+            if char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+            self.after_colon = False
+        return "".join(out)
+
+
+class LineWindow:
+    """Keeps the text of lines ``first`` to ``last`` (1-based, inclusive) of a
+    stream fed in pieces; ``complete`` turns true once ``last`` has passed.
+    Without a window every piece passes through."""
+
+    def __init__(self, first: int = 1, last: int = None):
+        self.first = first
+        self.last = last
+        self.line = 1
+        self.chars = 0
+        self.lines = 0
+        self.open_line = False  # the text kept so far ends mid-line
+        self.complete = False
+
+    def feed(self, text: str) -> str:
+        if self.complete or not text:
+            return ""
+        if self.line >= self.first and self.last is None:
+            kept = text
+            self.line += text.count("\n")
+        else:
+            pieces = []
+            pos = 0
+            while pos < len(text):
+                newline = text.find("\n", pos)
+                stop = len(text) if newline < 0 else newline + 1
+                if self.line >= self.first:
+                    pieces.append(text[pos:stop])
+                if newline < 0:
+                    break
+                self.line += 1
+                pos = stop
+                if self.last is not None and self.line > self.last:
+                    self.complete = True
+                    break
+            kept = "".join(pieces)
+        if kept:
+            self.chars += len(kept)
+            self.lines += kept.count("\n")
+            self.open_line = not kept.endswith("\n")
+        return kept
+
+    def stats(self) -> dict:
+        return {"chars": self.chars, "lines": self.lines + self.open_line}
+
+
+def parse_line_range(value: str) -> tuple:
+    """argparse type for ``--range``: ``START:END``, ``START:`` or ``:END`` (1-based)."""
+    first, sep, last = value.partition(":")
+    if not first and not last:
+        raise argparse.ArgumentTypeError(f"invalid line range: {value!r}")
+    try:
+        first = int(first) if first else 1
+        last = int(last) if last else (None if sep else first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid line range: {value!r}")
+    if first < 1 or (last is not None and last < first):
+        raise argparse.ArgumentTypeError(f"invalid line range: {value!r}")
+    return first, last
+
+
+async def download_content(
+    client: NiaClient, kind: str, item_id: str, path: str, out: str, lines: tuple = None
+) -> dict:
+    """Stream a file's content into ``out`` (gzip-compressed when it ends in ``.gz``).
+
+    The text goes to ``out.part`` first and replaces ``out`` only once
+    complete, so an interrupted download never leaves a truncated file.
+    """
+    import gzip
+
+    out = Path(out)
+    part = out.with_name(out.name + ".part")
+    opener = gzip.open if out.suffix == ".gz" else open
+    out.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with opener(part, "wt", encoding="utf-8", errors="replace", newline="") as f:
+            stats = await client.stream_content(kind, item_id, path, f.write, lines)
+        os.replace(part, out)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return {"path": str(out), **stats, "bytes": out.stat().st_size}
+
+
+# =============================================================================
+# PATH INDEX
+# =============================================================================
+
+PATH_INDEX_DIR = NIA_CACHE_DIR / "paths"
+PATH_INDEX_MAGIC = b"NIAPATHS1\n"
+# Paths per block; the first path of a block is stored whole, the rest front-coded
+PATH_INDEX_BLOCK = 32
+# Status fields that identify the indexed revision of a repository or source
+REVISION_KEYS = ("commit_sha", "commit", "revision", "last_indexed", "indexed_at", "updated_at")
+
+
+def tree_revision(status: dict):
+    """The indexed revision named by a repository or source status, or None."""
+    for key in REVISION_KEYS:
+        if status.get(key) is not None:
+            return str(status[key])
+    return None
+
+
+class PathIndex:
+    """Sorted, front-coded file paths of one repository or source tree.
+
+    Layout of ``<cache>/paths/<kind>-<hash>.idx``:
+
+    - ``PATH_INDEX_MAGIC`` and a JSON header line (kind, id, revision, count)
+    - uint32 byte offsets of the blocks
+    - the blocks: every path as uint16 shared-prefix length, uint16 suffix
+      length and the UTF-8 suffix, sharing with the path before it
+
+    The file is memory-mapped; a lookup binary-searches the block heads and
+    decodes forward from there, so ``files`` and ``ls`` touch only the blocks
+    they return. The file's mtime records when it was last known current.
+    """
+
+    def __init__(self, path: Path):
+        import mmap
+
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(PATH_INDEX_MAGIC)] != PATH_INDEX_MAGIC:
+            self._map.close()
+            raise ValueError(f"not a path index: {self.path}")
+        newline = self._map.find(b"\n", len(PATH_INDEX_MAGIC))
+        self.header = json.loads(self._map[len(PATH_INDEX_MAGIC) : newline])
+        start = newline + 1
+        data = start + 4 * self.header["blocks"]
+        self._offsets = memoryview(self._map)[start:data].cast("I")
+        self._start = data
+
+    @staticmethod
+    def location(kind: str, item_id: str) -> Path:
+        import hashlib
+
+        digest = hashlib.sha256(item_id.encode()).hexdigest()[:16]
+        return PATH_INDEX_DIR / f"{kind}-{digest}.idx"
+
+    @classmethod
+    def open(cls, kind: str, item_id: str) -> Optional["PathIndex"]:
+        """The stored index of a tree, or None if there is none (or it is unreadable)."""
+        try:
+            return cls(cls.location(kind, item_id))
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def build(cls, kind: str, item_id: str, paths, revision: str = None) -> "PathIndex":
+        """Write the index of ``paths`` (any order, duplicates allowed) and open it."""
+        import struct
+        from array import array
+
+        offsets = array("I")
+        data = bytearray()
+        previous = b""
+        count = 0
+        for count, path in enumerate(sorted(set(paths)), 1):
+            raw = path.encode()
+            shared = 0
+            if (count - 1) % PATH_INDEX_BLOCK:
+                shared = min(len(os.path.commonprefix([previous, raw])), 0xFFFF)
+            else:
+                offsets.append(len(data))
+            data += struct.pack("<HH", shared, len(raw) - shared)
+            data += raw[shared:]
+            previous = raw
+        header = {
+            "kind": kind,
+            "id": item_id,
+            "revision": revision,
+            "count": count,
+            "blocks": len(offsets),
+            "built_at": time.time(),
+        }
+        location = cls.location(kind, item_id)
+        body = PATH_INDEX_MAGIC + json.dumps(header).encode() + b"\n"
+        write_atomic(location, body + offsets.tobytes() + bytes(data))
+        return cls(location)
+
+    @staticmethod
+    def clear_all() -> int:
+        """Delete every stored path index; returns how many there were."""
+        removed = 0
+        for path in PATH_INDEX_DIR.glob("*.idx"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def age(self) -> float:
+        """Seconds since the index was built or last confirmed current."""
+        return time.time() - self.path.stat().st_mtime
+
+    def touch(self) -> None:
+        """Mark the index as confirmed current."""
+        os.utime(self.path)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._offsets.release()
+            self._map.close()
+            self._map = None
+
+    def _head(self, block: int) -> bytes:
+        import struct
+
+        offset = self._start + self._offsets[block]
+        _, size = struct.unpack_from("<HH", self._map, offset)
+        return self._map[offset + 4 : offset + 4 + size]
+
+    def _scan(self, block: int):
+        """Yield the raw paths from the start of ``block`` to the end of the index."""
+        import struct
+
+        data = self._map
+        unpack = struct.Struct("<HH").unpack_from
+        offset = self._start + self._offsets[block]
+        end = len(data)
+        path = b""
+        while offset < end:
+            shared, size = unpack(data, offset)
+            offset += 4
+            path = path[:shared] + data[offset : offset + size]
+            offset += size
+            yield path
+
+    def seek(self, key: str = ""):
+        """Yield the paths sorting at or after ``key``, in order."""
+        raw = key.encode()
+        lo, hi = 0, len(self._offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._head(mid) <= raw:
+                lo = mid + 1
+            else:
+                hi = mid
+        if not len(self._offsets):
+            return
+        for path in self._scan(max(lo - 1, 0)):
+            if path >= raw:
+                yield path.decode()
+
+    def files(self, prefix: str = None, glob: str = None):
+        """Yield the paths under ``prefix`` and matching ``glob`` (as ``tree_filter``)."""
+        import re
+
+        keep = tree_filter(prefix, glob)
+        start = prefix.strip("/") if prefix else ""
+        literal = re.split(r"[*?\[]", glob, maxsplit=1)[0] if glob else ""
+        if literal.startswith(start):
+            start = literal
+        for path in self.seek(start):
+            if not path.startswith(start):
+                return
+            if keep is None or keep(path):
+                yield path
+
+    def ls(self, path: str = "") -> list[dict]:
+        """Immediate children of a directory, as ``{"name", "path", "type"}`` entries
+        sorted by name.
+
+        Each subdirectory costs one seek past its contents, not a scan of them.
+        """
+        base = path.strip("/")
+        base = f"{base}/" if base else ""
+        entries = []
+        paths = self.seek(base)
+        skipped = 0
+        subtree = None
+        while True:
+            child = next(paths, None)
+            if child is None or not child.startswith(base):
+                # Path order puts "a/..." after "a-b"; a listing is ordered by name
+                return sorted(entries, key=lambda entry: entry["name"])
+            if subtree is not None and child.startswith(subtree):
+                skipped += 1
+                if skipped == 8:
+                    # A large subdirectory: seek past it ("0" sorts right after "/")
+                    paths = self.seek(subtree[:-1] + "0")
+                continue
+            name, sep, _ = child[len(base) :].partition("/")
+            if sep:
+                entries.append({"name": name, "path": base + name, "type": "dir"})
+                subtree, skipped = f"{base}{name}/", 0
+            else:
+                entries.append({"name": name, "path": child, "type": "file"})
+
+
+async def indexed_tree_files(
+    client: NiaClient, kind: str, item_id: str, prefix: str = None, glob: str = None
+):
+    """Yield ``(path, entry)`` for the files of a tree, answered from its path index.
+
+    The index is built on first use (from the cached tree when there is
+    one); entries carry only the path. Without a response cache the tree is
+    streamed instead, as ``NiaClient.iter_tree`` does.
+    """
+    if client.cache is None:
+        async for item in client.iter_tree(kind, item_id, prefix, glob):
+            yield item
+        return
+    index = await client.path_index(kind, item_id)
+    for path in index.files(prefix, glob):
+        yield path, {}
+
+
+# =============================================================================
+# PREFETCH
+# =============================================================================
+
+# Budget of one prefetch run (--prefetch): pages, bytes and parallel requests
+NIA_PREFETCH_PAGES = int(os.environ.get("NIA_PREFETCH_PAGES", "8"))
+NIA_PREFETCH_BYTES = int(os.environ.get("NIA_PREFETCH_BYTES", str(2 * 1024 * 1024)))
+PREFETCH_CONCURRENCY = 4
+# Matches of a filtered tree considered for prefetching
+PREFETCH_CANDIDATES = 256
+
+# Cached read each prefetch op warms: (kind, op) -> (method, route template)
+PREFETCH_ROUTES = {
+    ("repos", "content"): ("POST", "/v2/repositories/{}/content"),
+    ("sources", "content"): ("POST", "/v2/data-sources/{}/content"),
+    ("sources", "read"): ("GET", "/v2/data-sources/{}/read"),
+}
+
+# Prefetch runs scheduled on the daemon's loop; held so they are not collected mid-run
+PREFETCH_TASKS: set = set()
+
+
+def access_log_path() -> Path:
+    return NIA_CACHE_DIR / "access.json"
+
+
+async def record_access(kind: str, item_id: str, path: str) -> None:
+    """Count a page read, for the access-frequency ranking of ``plan_prefetch``.
+
+    The read-modify-write runs under a lock file, so concurrent processes
+    do not drop each other's counts.
+    """
+    log_path = access_log_path()
+    async with file_lock(log_path.with_suffix(".lock"), timeout=5):
+        try:
+            log = json.loads(log_path.read_text()) if log_path.exists() else {}
+        except ValueError:
+            log = {}
+        counts = log.setdefault(f"{kind}:{item_id}", {})
+        counts[path] = counts.get(path, 0) + 1
+        log["_last"] = {"item": f"{kind}:{item_id}", "path": path}
+        write_atomic(log_path, json.dumps(log))
+
+
+def plan_prefetch(kind: str, item_id: str, paths: list[str], limit: int = None) -> list[str]:
+    """Order listed ``paths`` by how likely they are to be read next.
+
+    Pages read often before come first; the rest keep sibling order, starting
+    just after the sibling read most recently (agents tend to read on down a
+    listing) and wrapping around.
+    """
+    log_path = access_log_path()
+    try:
+        log = json.loads(log_path.read_text()) if log_path.exists() else {}
+    except ValueError:
+        log = {}
+    counts = log.get(f"{kind}:{item_id}", {})
+    last = log.get("_last") or {}
+    start = 0
+    if last.get("item") == f"{kind}:{item_id}" and last.get("path") in paths:
+        start = paths.index(last["path"]) + 1
+    order = {path: (i - start) % len(paths) for i, path in enumerate(paths)}
+    ranked = sorted(paths, key=lambda path: (-counts.get(path, 0), order[path]))
+    return ranked[: limit or NIA_PREFETCH_PAGES]
+
+
+async def prefetch_pages(
+    client: NiaClient,
+    kind: str,
+    item_id: str,
+    paths: list[str],
+    budget: int = None,
+    concurrency: int = PREFETCH_CONCURRENCY,
+    op: str = "content",
+) -> dict:
+    """Fetch pages into the response cache, in order, while they fit in ``budget`` bytes.
+
+    ``op`` picks the call whose cache entries are warmed: ``"content"``, or
+    ``"read"`` for callers of ``sources_read``. Pages already cached are
+    skipped without a request. Page sizes are unknown until fetched, so the
+    first page is fetched alone and every page in flight after it holds back
+    the size of the largest page so far; only a page bigger than that can
+    carry the total past ``budget``. Returns counts of fetched, cached and
+    failed pages and the bytes read.
+    """
+    if (kind, op) not in PREFETCH_ROUTES:
+        raise ValueError(f"cannot prefetch {kind} {op}")
+    if client.cache is None:
+        return {"fetched": 0, "cached": 0, "failed": 0, "bytes": 0}
+    budget = NIA_PREFETCH_BYTES if budget is None else budget
+    method, route = PREFETCH_ROUTES[kind, op]
+    url = client._url(route.format(item_id))
+    fetch = getattr(client, f"{kind}_{op}")
+    stats = {"fetched": 0, "cached": 0, "failed": 0, "bytes": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    largest = reserved = 0
+
+    async def one(path: str) -> bool:
+        nonlocal largest, reserved
+        if method == "GET":
+            key = client.cache.key(method, url, {"path": path}, None)
+        else:
+            key = client.cache.key(method, url, None, {"path": path})
+        if client.cache.contains(key):
+            stats["cached"] += 1
+            return False
+        async with semaphore:
+            if stats["bytes"] >= budget or stats["bytes"] + reserved + largest > budget:
+                return False
+            held = largest
+            reserved += held
+            try:
+                result = await fetch(item_id, path)
+            finally:
+                reserved -= held
+        if "error" in result:
+            stats["failed"] += 1
+            return False
+        size = len(page_text(result).encode())
+        stats["fetched"] += 1
+        stats["bytes"] += size
+        largest = max(largest, size)
+        return True
+
+    pending = iter(paths)
+    for path in pending:
+        if await one(path):
+            break
+    await asyncio.gather(*(one(path) for path in pending))
+    return stats
+
+
+def start_prefetch(
+    client: NiaClient, kind: str, item_id: str, listed: list[str], op: str = "content"
+) -> None:
+    """Warm the cache for the likeliest next reads among ``listed`` file paths
+    (see ``plan_prefetch``; ``op`` as in ``prefetch_pages``) without delaying
+    the current command.
+
+    Inside the daemon the run is a task on its loop. A one-shot run hands
+    the plan to a detached ``nia_docs.py prefetch`` process, so the caller
+    gets its output (and exit status) straight away.
+    """
+    if not listed or client.cache is None:
+        return
+    paths = plan_prefetch(kind, item_id, listed)
+    if DAEMON_STREAMS.get() is not None:
+        task = asyncio.ensure_future(prefetch_pages(client, kind, item_id, paths, op=op))
+        PREFETCH_TASKS.add(task)
+        task.add_done_callback(PREFETCH_TASKS.discard)
+        return
+    import subprocess
+
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "prefetch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    plan = {"kind": kind, "id": item_id, "paths": paths, "op": op}
+    proc.stdin.write(json.dumps(plan).encode())
+    proc.stdin.close()
 
-async def sources_rename(source_id: str, display_name: str) -> dict:
-    """Rename a data source."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/data-sources/rename"
-    payload = {"source_id": source_id, "display_name": display_name}
+async def prefetch_tree(
+    client: NiaClient, kind: str, item_id: str, prefix: str = None, glob: str = None
+) -> None:
+    """``--prefetch`` after a filtered tree: its first matches are the candidates."""
+    import itertools
 
-    async with aiohttp.ClientSession() as session:
-        async with session.patch(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    index = await client.path_index(kind, item_id)
+    listed = list(itertools.islice(index.files(prefix, glob), PREFETCH_CANDIDATES))
+    start_prefetch(client, kind, item_id, listed)
 
 
 # =============================================================================
-# RESEARCH PAPERS API
+# LOCAL SEARCH
 # =============================================================================
 
+LOCAL_INDEX_DIR = ".nia-index"
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to was with".split()
+)
 
-async def papers_list(limit: int = 50, offset: int = 0, status: str = None) -> dict:
-    """List indexed research papers."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/research-papers"
-    params = {"limit": limit, "offset": offset}
-    if status:
-        params["status"] = status
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric terms of ``text``, minus stopwords and 1-char tokens."""
+    import re
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
 
 
-async def papers_index(arxiv_id: str) -> dict:
-    """Index an arXiv research paper."""
-    import aiohttp
+def mirror_registry_path() -> Path:
+    return NIA_CACHE_DIR / "mirrors.json"
 
-    url = f"{NIA_API_URL}/v2/research-papers"
-    payload = {"arxiv_id": arxiv_id}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+def register_mirror(dest: Path, kind: str, item_id: str) -> None:
+    """Remember a mirror directory so ``search local`` finds it by default."""
+    path = mirror_registry_path()
+    registry = json.loads(path.read_text()) if path.exists() else {}
+    registry[str(Path(dest).resolve())] = {"kind": kind, "id": item_id}
+    write_atomic(path, json.dumps(registry, indent=2))
 
 
-# =============================================================================
-# CONTEXT SHARING API
-# =============================================================================
+def registered_mirrors() -> list[Path]:
+    path = mirror_registry_path()
+    registry = json.loads(path.read_text()) if path.exists() else {}
+    return [Path(d) for d in registry if Path(d).is_dir()]
 
 
-async def context_list(
-    limit: int = 20, offset: int = 0, tags: str = None, agent_source: str = None
-) -> dict:
-    """List conversation contexts."""
-    import aiohttp
+class LocalIndex:
+    """On-disk BM25 index over the text files of a directory (usually a mirror).
 
-    url = f"{NIA_API_URL}/v2/contexts"
-    params = {"limit": limit, "offset": offset}
-    if tags:
-        params["tags"] = tags
-    if agent_source:
-        params["agent_source"] = agent_source
+    Layout under ``<root>/.nia-index/``:
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    - ``postings.bin``: uint32 ``(doc, tf)`` pairs grouped by term, memory-mapped
+      at query time so only the postings of query terms are touched
+    - ``lexicon.json``: term -> ``[offset, df]`` into ``postings.bin``
+    - ``docs.json``: document paths and lengths
+    - ``forward.json``: per-file change key and term counts, used by
+      ``update()`` to re-tokenize only files that changed
 
+    Postings are not patched in place: any change rewrites all four files
+    from the term counts in ``forward.json``, so an update costs O(corpus)
+    I/O even when one file changed.
+    """
 
-async def context_save(
-    title: str, content: str, summary: str = None, tags: list[str] = None, metadata: dict = None
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.dir = self.root / LOCAL_INDEX_DIR
+        self._lexicon = None
+        self._docs = None
+        self._postings = None
+
+    def _files(self):
+        for path in self.root.rglob("*"):
+            rel = path.relative_to(self.root)
+            if rel.parts[0].startswith(".") or not path.is_file():
+                continue
+            yield rel.as_posix(), path
+
+    def _stamp(self):
+        """Cheap signature of the tree, checked before any file is stat'ed.
+
+        A mirror's manifest changes on every sync. Elsewhere the directory
+        mtimes stand in: they move when a file is added, removed or replaced
+        by rename (as most editors save), but not on a write in place, which
+        only ``update(force=True)`` picks up.
+        """
+        import hashlib
+
+        manifest = self.root / MIRROR_MANIFEST
+        if manifest.exists():
+            stat = manifest.stat()
+            return [stat.st_mtime_ns, stat.st_size]
+        digest = hashlib.blake2b(digest_size=16)
+        stack = [self.root]
+        while stack:
+            top = stack.pop()
+            digest.update(f"{top}\0{top.stat().st_mtime_ns}\0".encode())
+            with os.scandir(top) as entries:
+                for entry in sorted(entries, key=lambda entry: entry.name):
+                    if top == self.root and entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+        return digest.hexdigest()
+
+    def update(self, force: bool = False) -> dict:
+        """Bring the index up to date with the directory.
+
+        Returns at once when the tree's stamp (see ``_stamp``) is unchanged.
+        Otherwise every file is stat'ed, only new or modified files are read
+        and tokenized, and the index files are rewritten in full if anything
+        changed. ``force`` skips the stamp check. Returns counts of added,
+        changed and removed files (all zero when nothing changed).
+        """
+        from collections import Counter
+
+        meta_path = self.dir / "docs.json"
+        forward_path = self.dir / "forward.json"
+        stamp = self._stamp()
+        if not force and meta_path.exists():
+            if json.loads(meta_path.read_text()).get("stamp") == stamp:
+                return {"added": 0, "changed": 0, "removed": 0}
+
+        forward = json.loads(forward_path.read_text()) if forward_path.exists() else {}
+        seen = set()
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        for rel, path in self._files():
+            seen.add(rel)
+            stat = path.stat()
+            key = [stat.st_mtime_ns, stat.st_size]
+            entry = forward.get(rel)
+            if entry is not None and entry[0] == key:
+                continue
+            try:
+                text = path.read_text(errors="replace")
+            except OSError:
+                continue
+            terms = tokenize(text)
+            forward[rel] = [key, len(terms), dict(Counter(terms))]
+            counts["changed" if entry is not None else "added"] += 1
+        for rel in set(forward) - seen:
+            del forward[rel]
+            counts["removed"] += 1
+
+        if any(counts.values()) or not meta_path.exists() or force:
+            self._write(forward, stamp)
+        else:
+            meta = json.loads(meta_path.read_text())
+            meta["stamp"] = stamp
+            write_atomic(meta_path, json.dumps(meta))
+        return counts
+
+    def _write(self, forward: dict, stamp) -> None:
+        from array import array
+
+        paths = sorted(forward)
+        by_term: dict[str, list] = {}
+        for doc, rel in enumerate(paths):
+            for term, tf in forward[rel][2].items():
+                by_term.setdefault(term, []).append((doc, tf))
+
+        postings = array("I")
+        lexicon = {}
+        for term in sorted(by_term):
+            entries = by_term[term]
+            lexicon[term] = [len(postings) // 2, len(entries)]
+            for doc, tf in entries:
+                postings.append(doc)
+                postings.append(tf)
+
+        lengths = [forward[rel][1] for rel in paths]
+        meta = {
+            "paths": paths,
+            "lengths": lengths,
+            "avgdl": sum(lengths) / len(lengths) if lengths else 0.0,
+            "stamp": stamp,
+        }
+        self.close()
+        write_atomic(self.dir / "postings.bin", postings.tobytes())
+        write_atomic(self.dir / "lexicon.json", json.dumps(lexicon, separators=(",", ":")))
+        write_atomic(self.dir / "docs.json", json.dumps(meta))
+        write_atomic(self.dir / "forward.json", json.dumps(forward, separators=(",", ":")))
+
+    def _load(self) -> None:
+        import mmap
+
+        if self._lexicon is not None:
+            return
+        self._lexicon = json.loads((self.dir / "lexicon.json").read_text())
+        self._docs = json.loads((self.dir / "docs.json").read_text())
+        with open(self.dir / "postings.bin", "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._postings = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self._postings is not None:
+            self._postings.close()
+        self._lexicon = self._docs = self._postings = None
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Rank documents for ``query`` with BM25; returns ``{"path", "score"}`` dicts."""
+        import math
+
+        self._load()
+        lengths = self._docs["lengths"]
+        avgdl = self._docs["avgdl"] or 1.0
+        n = len(lengths)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            hit = self._lexicon.get(term)
+            if hit is None or self._postings is None:
+                continue
+            offset, df = hit
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            with memoryview(self._postings) as view:
+                with view[offset * 8 : (offset + df) * 8] as raw, raw.cast("I") as pairs:
+                    for i in range(0, len(pairs), 2):
+                        doc, tf = pairs[i], pairs[i + 1]
+                        norm = tf + self.K1 * (1 - self.B + self.B * lengths[doc] / avgdl)
+                        scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.K1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [{"path": self._docs["paths"][doc], "score": score} for doc, score in ranked]
+
+
+def best_snippet(text: str, query: str, width: int = 300) -> str:
+    """The window of three lines containing the most query terms."""
+    terms = set(tokenize(query))
+    lines = text.splitlines()
+    best, best_hits = 0, -1
+    for i, line in enumerate(lines):
+        hits = len(terms.intersection(tokenize(line)))
+        if hits > best_hits:
+            best, best_hits = i, hits
+    window = " ".join(line.strip() for line in lines[best : best + 3] if line.strip())
+    return window[:width]
+
+
+def search_local(
+    query: str, dirs: list[Path] = None, limit: int = 10, reindex: bool = False
 ) -> dict:
-    """Save conversation context."""
-    import aiohttp
-
-    url = f"{NIA_API_URL}/v2/contexts"
-    payload = {"title": title, "content": content}
-    if summary:
-        payload["summary"] = summary
-    if tags:
-        payload["tags"] = tags
-    if metadata:
-        payload["metadata"] = metadata
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=get_headers(), json=payload) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    """BM25 search over local mirrors, updating their indexes first if they changed.
 
+    Searches ``dirs`` or, by default, every mirror created with ``mirror``.
+    ``reindex`` re-checks every file even when the tree's stamp is unchanged.
+    Returns results in the ``{"results": [...]}`` shape of the remote search
+    endpoints, so ``format_search_result`` renders them unchanged.
+    """
+    dirs = [Path(d) for d in dirs] if dirs else registered_mirrors()
+    if not dirs:
+        return {"error": "no local mirrors; run 'sources mirror' or 'repos mirror' first"}
+
+    hits = []
+    for root in dirs:
+        index = LocalIndex(root)
+        index.update(force=reindex)
+        for hit in index.search(query, limit):
+            hits.append((hit["score"], root, hit["path"]))
+        index.close()
+    hits.sort(key=lambda hit: -hit[0])
+
+    results = []
+    for score, root, rel in hits[:limit]:
+        try:
+            text = (root / rel).read_text(errors="replace")
+        except OSError:
+            continue
+        results.append(
+            {
+                "title": rel,
+                "path": str(root / rel),
+                "snippet": best_snippet(text, query),
+                "score": round(score, 3),
+            }
+        )
+    return {"results": results}
 
-async def context_search_text(query: str) -> dict:
-    """Text search contexts."""
-    import aiohttp
 
-    url = f"{NIA_API_URL}/v2/contexts/search"
-    params = {"query": query}
+# =============================================================================
+# FEDERATED SEARCH
+# =============================================================================
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+# Keys under which search endpoints return their hits
+SEARCH_HIT_KEYS = ("results", "matches", "sources", "web_results", "documentation", "items")
+FEDERATED_BACKENDS = ("universal", "web", "package", "query", "local")
+
+
+def search_hits(result: dict) -> list[dict]:
+    """Normalize a search response into ``{"title", "url", "snippet"}`` hits."""
+    hits = []
+    for key in SEARCH_HIT_KEYS:
+        items = result.get(key)
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if not isinstance(item, dict):
+                hits.append({"title": str(item)[:200], "url": None, "snippet": ""})
+                continue
+            url = item.get("url") or item.get("source_url") or item.get("link")
+            path = item.get("path") or item.get("file") or item.get("file_path")
+            title = item.get("title") or path or item.get("name") or url or "untitled"
+            snippet = item.get("snippet") or item.get("content") or item.get("description") or ""
+            hits.append({"title": title, "url": url or path, "snippet": str(snippet)[:500]})
+    return hits
+
+
+def hit_identity(hit: dict) -> str:
+    """De-duplication key: the hit's URL/path without scheme, fragment or trailing slash."""
+    ref = hit.get("url") or hit.get("title") or ""
+    ref = ref.split("#", 1)[0].split("://", 1)[-1].rstrip("/")
+    return ref.lower()
+
+
+def reciprocal_rank_fusion(ranked: dict, k: int = 60) -> list[dict]:
+    """Fuse per-backend ranked hit lists with RRF (score = sum of 1 / (k + rank)).
+
+    ``ranked`` maps backend name to its hits, best first. Duplicates across
+    backends merge into one hit that lists every backend that returned it.
+    """
+    fused: dict[str, dict] = {}
+    for backend, hits in ranked.items():
+        for rank, hit in enumerate(hits, 1):
+            key = hit_identity(hit)
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**hit, "score": 0.0, "backends": []}
+            entry["score"] += 1 / (k + rank)
+            if backend not in entry["backends"]:
+                entry["backends"].append(backend)
+            if not entry.get("snippet") and hit.get("snippet"):
+                entry["snippet"] = hit["snippet"]
+    return sorted(fused.values(), key=lambda entry: -entry["score"])
+
+
+def run_detached(func, *args) -> asyncio.Future:
+    """Run ``func(*args)`` in a daemon thread and return a future for its result.
+
+    Unlike the default executor, nothing waits for the thread at shutdown, so
+    a call abandoned on timeout cannot hold up the process exit.
+    """
+    import threading
 
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
 
-async def context_search_semantic(query: str) -> dict:
-    """Semantic search contexts using embeddings."""
-    import aiohttp
+    def settle(result, error) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
 
-    url = f"{NIA_API_URL}/v2/contexts/semantic-search"
-    params = {"query": query}
+    def work() -> None:
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(settle, result, error)
+        except RuntimeError:
+            pass  # the loop closed while the call ran
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers(), params=params) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+    threading.Thread(target=work, daemon=True).start()
+    return future
 
 
-async def context_get(context_id: str) -> dict:
-    """Get conversation context details."""
-    import aiohttp
+async def federated_search(
+    client: NiaClient,
+    query: str,
+    backends: list[str] = ("universal", "web"),
+    budget: float = 10.0,
+    limit: int = 10,
+    package: str = None,
+    registry: str = "py_pi",
+    repositories: list[str] = None,
+    data_sources: list[str] = None,
+):
+    """Query several search backends concurrently and fuse their rankings.
+
+    Yields one ``{"backend", "hits" | "error", "ms"}`` record per backend as it
+    answers. Backends still running when ``budget`` seconds have passed are
+    cancelled and reported with ``"error": "timeout"``. The ``local`` backend
+    reads its mirror indexes from disk in a worker thread (``run_detached``),
+    which is abandoned rather than stopped when the budget runs out. The final record is
+    ``{"fused": [...]}`` with RRF-merged, de-duplicated hits.
+    """
+    calls = {
+        "universal": lambda: client.search_universal(query, limit),
+        "web": lambda: client.search_web(query),
+        "package": lambda: client.search_package_hybrid(package, query, registry, limit),
+        "query": lambda: client.search_query(
+            [{"role": "user", "content": query}], repositories, data_sources
+        ),
+        "local": lambda: run_detached(search_local, query, None, limit),
+    }
+    start = time.monotonic()
+    ranked = {}
+
+    tasks = {}
+    for backend in backends:
+        if backend not in calls:
+            yield {"backend": backend, "error": "unknown backend", "ms": 0}
+        elif backend == "package" and not package:
+            yield {"backend": backend, "error": "--package is required", "ms": 0}
+        else:
+            tasks[asyncio.ensure_future(calls[backend]())] = backend
 
-    url = f"{NIA_API_URL}/v2/contexts/{context_id}"
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = budget - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            ms = round((time.monotonic() - start) * 1000)
+            for task in done:
+                backend = tasks[task]
+                try:
+                    result = task.result()
+                except Exception as e:
+                    result = {"error": f"{type(e).__name__}: {e}"}
+                if "error" in result:
+                    yield {"backend": backend, "error": result["error"], "ms": ms}
+                    continue
+                ranked[backend] = search_hits(result)[:limit]
+                yield {"backend": backend, "hits": ranked[backend], "ms": ms}
+    finally:
+        for task in pending:
+            task.cancel()
+    for task in pending:
+        yield {"backend": tasks[task], "error": "timeout", "ms": round(budget * 1000)}
+
+    yield {"fused": reciprocal_rank_fusion(ranked)[:limit]}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
 
+# =============================================================================
+# FAN-OUT GREP
+# =============================================================================
 
-async def context_update(context_id: str, updates: dict) -> dict:
-    """Update conversation context."""
-    import aiohttp
+# Keys under which grep endpoints return their matches
+GREP_MATCH_KEYS = ("matches", "results")
 
-    url = f"{NIA_API_URL}/v2/contexts/{context_id}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.put(url, headers=get_headers(), json=updates) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return await resp.json()
+def grep_matches(result: dict) -> list[dict]:
+    """The match records of a grep response."""
+    for key in GREP_MATCH_KEYS:
+        items = result.get(key)
+        if isinstance(items, list):
+            return [m if isinstance(m, dict) else {"content": str(m)} for m in items]
+    return []
 
 
-async def context_delete(context_id: str) -> dict:
-    """Delete conversation context."""
-    import aiohttp
+async def indexed_ids(client: NiaClient, kind: str) -> list[str]:
+    """Ids of every repository (``kind="repos"``) or data source that finished indexing."""
+    if kind == "repos":
+        items, kind = client.iter_repos(), "repositories"
+    else:
+        items, kind = client.iter_sources(), "data_sources"
+    ids = []
+    async for raw in items:
+        item = ListItem(raw, kind)
+        status = item.status.lower()
+        if item.id and (not status or status in INDEX_DONE_STATUSES):
+            ids.append(item.id)
+    return ids
+
+
+async def grep_many(
+    client: NiaClient,
+    kind: str,
+    ids: list[str],
+    pattern: str,
+    concurrency: int = 8,
+    limit: int = None,
+    context_lines: int = 3,
+):
+    """Grep many repositories (``kind="repos"``) or data sources concurrently.
+
+    Yields each match as soon as its item's response arrives, tagged with
+    ``origin`` (the item id); a failed item yields ``{"origin", "error"}``.
+    After ``limit`` matches the outstanding requests are cancelled.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if kind == "repos":
+        grep = functools.partial(client.repos_grep, pattern=pattern, context_lines=context_lines)
+    else:
+        grep = functools.partial(client.sources_grep, pattern=pattern, context_lines=context_lines)
 
-    url = f"{NIA_API_URL}/v2/contexts/{context_id}"
+    async def one(item_id: str) -> tuple:
+        async with semaphore:
+            return item_id, await grep(item_id)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.delete(url, headers=get_headers()) as resp:
-            if resp.status != 200:
-                return {"error": f"API error {resp.status}: {await resp.text()}"}
-            return {"status": "deleted", "context_id": context_id}
+    tasks = [asyncio.ensure_future(one(item_id)) for item_id in ids]
+    found = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item_id, result = await next_done
+            if "error" in result:
+                yield {"origin": item_id, "error": result["error"]}
+                continue
+            for match in grep_matches(result):
+                yield {"origin": item_id, **match}
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 # =============================================================================
@@ -864,6 +5038,7 @@ async def context_delete(context_id: str) -> dict:
 # =============================================================================
 
 
+@traced
 def format_oracle_result(result: dict) -> str:
     """Format Oracle research result."""
     if "error" in result:
@@ -887,6 +5062,7 @@ def format_oracle_result(result: dict) -> str:
     return "\n".join(output)
 
 
+@traced
 def format_search_result(result: dict, search_type: str) -> str:
     """Format search results."""
     if "error" in result:
@@ -923,14 +5099,15 @@ def format_search_result(result: dict, search_type: str) -> str:
             line = match.get("line", match.get("content", ""))
             output.append(f"\n{i}. `{path}`")
             if line:
-                output.append(f"   {line[:200]}")
+                output.append(f"   {str(line)[:200]}")
 
     else:
-        output.append(json.dumps(result, indent=2, default=str)[:2000])
+        output.append(truncated_json(result, 2000))
 
     return "\n".join(output)
 
 
+@traced
 def format_list_result(result: dict, item_type: str) -> str:
     """Format list results."""
     if "error" in result:
@@ -938,40 +5115,184 @@ def format_list_result(result: dict, item_type: str) -> str:
 
     output = [f"# {item_type}\n"]
 
-    items = (
-        result.get("repositories")
-        or result.get("data_sources")
-        or result.get("papers")
-        or result.get("contexts")
-        or result.get("sessions")
-        or result.get("jobs")
-        or []
-    )
+    listing = ListResult(result)
 
-    if not items:
+    if not listing:
         output.append("No items found.")
     else:
-        for i, item in enumerate(items[:20], 1):
-            if isinstance(item, dict):
-                name = item.get(
-                    "display_name",
-                    item.get("title", item.get("repository_id", item.get("id", f"Item {i}"))),
-                )
-                status = item.get("status", "")
-                output.append(f"{i}. {name} {f'({status})' if status else ''}")
-            else:
-                output.append(f"{i}. {item}")
+        for i in range(min(len(listing), 20)):
+            output.append(format_list_item(i + 1, listing[i]))
 
-    total = result.get("total", len(items))
-    output.append(f"\n---\nTotal: {total}")
+    output.append(f"\n---\nTotal: {listing.total}")
 
     return "\n".join(output)
 
 
+def format_list_item(i: int, item) -> str:
+    """Format one numbered list entry (a ``ListItem`` or a raw item)."""
+    if isinstance(item, ListItem):
+        item = item.raw
+    if isinstance(item, dict):
+        status = item.get("status") or ""
+        return f"{i}. {list_item_name(item) or f'Item {i}'} {f'({status})' if status else ''}"
+    return f"{i}. {item}"
+
+
+async def print_all_items(items, item_type: str) -> None:
+    """Print every item of an async iterator as it arrives, then the count."""
+    if OUTPUT_FORMAT.get() == "ndjson":
+        async for item in items:
+            print(dumps_json(item), flush=True)
+        return
+    print(f"# {item_type}\n")
+    count = 0
+    async for item in items:
+        count += 1
+        print(format_list_item(count, item), flush=True)
+    if not count:
+        print("No items found.")
+    print(f"\n---\nTotal: {count}")
+
+
+async def write_content(
+    client: NiaClient, kind: str, item_id: str, path: str, out: str = None, lines: tuple = None
+) -> bool:
+    """``content --out/--range``: stream a file to ``out``, or to stdout as it
+    arrives. Returns whether it succeeded."""
+    try:
+        if out:
+            emit(await download_content(client, kind, item_id, path, out, lines))
+        else:
+            await client.stream_content(kind, item_id, path, sys.stdout.write, lines)
+    except (RuntimeError, ValueError, OSError) as e:
+        emit({"error": str(e)})
+        return False
+    return True
+
+
+async def print_tree_files(files) -> None:
+    """Print the ``(path, entry)`` pairs of ``NiaClient.iter_tree`` as they arrive."""
+    ndjson = OUTPUT_FORMAT.get() == "ndjson"
+    count = 0
+    try:
+        async for path, entry in files:
+            count += 1
+            print(dumps_json({**entry, "path": path}) if ndjson else path)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+    if not ndjson:
+        print(f"\n---\nTotal: {count} files")
+
+
+def format_ls_result(entries: list, path: str) -> str:
+    """Format a directory listing; subdirectories end with ``/``."""
+    if isinstance(entries, dict):
+        return f"Error: {entries['error']}"
+    if not entries:
+        return f"No entries under '{path or '/'}'."
+    lines = [e["name"] + "/" if e["type"] == "dir" else e["name"] for e in entries]
+    return "\n".join(lines) + f"\n\n---\nTotal: {len(entries)}"
+
+
+async def print_grep_matches(matches) -> None:
+    """Print the tagged matches of ``grep_many`` as they arrive, then a summary."""
+    ndjson = OUTPUT_FORMAT.get() == "ndjson"
+    count = 0
+    origins = set()
+    failed = 0
+    async with contextlib.aclosing(matches) as matches:
+        async for match in matches:
+            if "error" in match:
+                failed += 1
+                print(f"Error [{match['origin']}]: {match['error']}", file=sys.stderr)
+                continue
+            count += 1
+            origins.add(match["origin"])
+            if ndjson:
+                print(dumps_json(match), flush=True)
+                continue
+            path = match.get("path", match.get("file", "unknown"))
+            line = match.get("line_number", match.get("line", ""))
+            text = str(match.get("content", match.get("match", ""))).strip()[:200]
+            print(f"[{match['origin']}] {path}:{line}: {text}", flush=True)
+    summary = f"{count} matches in {len(origins)} items" + (f", {failed} failed" if failed else "")
+    note(f"\n---\n{summary}")
+
+
+def format_content(result: dict) -> str:
+    """File or page text, or the whole response when it has none."""
+    if "content" in result:
+        return result["content"]
+    return dumps_json(result, indent=True)
+
+
+# Output format of the current command: pretty, ndjson or raw
+OUTPUT_FORMAT = contextvars.ContextVar("nia_output_format", default="pretty")
+
+# Response keys holding the records that ndjson output emits one per line
+RECORD_KEYS = LIST_KEYS + ("results", "matches", "messages", "citations")
+
+
+def ndjson_records(result):
+    """Yield the records of a response for line-per-record output.
+
+    List, search and grep responses yield their items, trees yield one entry
+    per file (with its full ``path``), anything else is a single record. A
+    plain list (such as a local directory listing) yields its elements.
+    """
+    if isinstance(result, list):
+        yield from result
+        return
+    if isinstance(result, dict) and "error" not in result:
+        for key in RECORD_KEYS:
+            if isinstance(result.get(key), list):
+                yield from result[key]
+                return
+        if any(key in result for key in TREE_CONTAINER_KEYS):
+            for path, entry in iter_tree_files(result):
+                yield {**entry, "path": path}
+            return
+    yield result
+
+
+def note(message: str) -> None:
+    """Print a progress line; kept off stdout when it carries machine-readable output."""
+    if OUTPUT_FORMAT.get() == "pretty":
+        print(message)
+    else:
+        print(message, file=sys.stderr)
+
+
+def emit(result, render=None, *render_args) -> None:
+    """Print a command's result in the current output format.
+
+    ``pretty`` prints ``render(result, *render_args)``, or indented JSON when
+    there is no renderer; ``ndjson`` prints one compact JSON record per line;
+    ``raw`` prints nothing, as the client already copied the body to stdout
+    (errors go to stderr).
+    """
+    fmt = OUTPUT_FORMAT.get()
+    if fmt == "ndjson":
+        sys.stdout.writelines(dumps_json(record) + "\n" for record in ndjson_records(result))
+    elif fmt == "raw":
+        if isinstance(result, dict) and "error" in result:
+            print(f"Error: {result['error']}", file=sys.stderr)
+    elif render is not None:
+        print(render(result, *render_args))
+    else:
+        print(dumps_json(result, indent=True))
+
+
 # =============================================================================
 # CLI INTERFACE
 # =============================================================================
 
+# (command, action) pairs that never call the API
+LOCAL_COMMANDS = frozenset(
+    {("search", "local"), ("cache", "stats"), ("cache", "clear"), ("serve", None)}
+)
+
 
 def build_parser() -> argparse.ArgumentParser:
     """Build argument parser with subcommands."""
@@ -979,6 +5300,54 @@ def build_parser() -> argparse.ArgumentParser:
         description="Nia API Client - Complete API coverage",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=NIA_POOL_PER_HOST,
+        help="Max pooled connections to the API host",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=NIA_RATE_LIMIT,
+        help="Max requests/second before adaptive backoff (0 disables pacing)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=4, help="Max attempts per request on throttling/errors"
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="After ls or a filtered tree, warm the cache with the likeliest next reads",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Duplicate read-only requests slower than their p95 latency (first answer wins)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("pretty", "ndjson", "raw"),
+        default="pretty",
+        help="Output: readable text (default), one JSON record per line, or the response body "
+        "exactly as received",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Append per-request timing spans to FILE (JSON lines) and print a latency summary",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record", metavar="FILE", help="Append every API response to a cassette file"
+    )
+    cassette.add_argument(
+        "--replay", metavar="FILE", help="Answer requests from a cassette file, offline"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local response cache")
+    parser.add_argument(
+        "--refresh", action="store_true", help="Re-fetch cached responses and update the cache"
+    )
     subparsers = parser.add_subparsers(dest="command", help="Command category")
 
     # Oracle commands
@@ -995,9 +5364,19 @@ def build_parser() -> argparse.ArgumentParser:
         choices=["claude-opus-4-5-20251101", "claude-sonnet-4-5-20250929", "claude-sonnet-4-5-1m"],
     )
     oracle_research_p.add_argument("--stream", action="store_true", help="Stream results")
+    oracle_research_p.add_argument(
+        "--fresh", action="store_true", help="Ignore a cached answer to the same question"
+    )
+    oracle_research_p.add_argument(
+        "--cache-ttl", type=float, help="Keep this answer for N seconds (default 1 day)"
+    )
+    oracle_research_p.add_argument(
+        "--timings", action="store_true", help="Print stream timing stats to stderr"
+    )
 
     oracle_sessions_p = oracle_sub.add_parser("sessions", help="List research sessions")
     oracle_sessions_p.add_argument("--limit", type=int, default=20)
+    oracle_sessions_p.add_argument("--all", action="store_true", help="Stream every page")
 
     oracle_session_p = oracle_sub.add_parser("session", help="Get session details")
     oracle_session_p.add_argument("session_id", help="Session ID")
@@ -1006,6 +5385,9 @@ def build_parser() -> argparse.ArgumentParser:
     oracle_chat_p = oracle_sub.add_parser("chat", help="Follow-up chat in session")
     oracle_chat_p.add_argument("session_id", help="Session ID")
     oracle_chat_p.add_argument("message", help="Follow-up message")
+    oracle_chat_p.add_argument(
+        "--timings", action="store_true", help="Print stream timing stats to stderr"
+    )
 
     oracle_sub.add_parser("jobs", help="List research jobs")
 
@@ -1013,6 +5395,25 @@ def build_parser() -> argparse.ArgumentParser:
     oracle_job_p.add_argument("job_id", help="Job ID")
     oracle_job_p.add_argument("--cancel", action="store_true", help="Cancel job")
     oracle_job_p.add_argument("--stream", action="store_true", help="Stream events")
+    oracle_job_p.add_argument("--last-event-id", help="Resume the event stream after this id")
+    oracle_job_p.add_argument(
+        "--timings", action="store_true", help="Print stream timing stats to stderr"
+    )
+
+    oracle_run_many_p = oracle_sub.add_parser("run-many", help="Run many research jobs")
+    oracle_run_many_p.add_argument("file", help="Queries file (plain text or JSON per line)")
+    oracle_run_many_p.add_argument("--out", default="oracle-reports", help="Report directory")
+    oracle_run_many_p.add_argument(
+        "--state", help="Resume state file (default: <out>/.run-many-state.json)"
+    )
+    oracle_run_many_p.add_argument("--concurrency", type=int, default=5, help="Jobs in flight")
+    oracle_run_many_p.add_argument("--max-jobs", type=int, help="Max new jobs to submit this run")
+    oracle_run_many_p.add_argument(
+        "--retry-failed", action="store_true", help="Resubmit queries that failed before"
+    )
+    oracle_run_many_p.add_argument("--repos", nargs="*", help="Default repository IDs")
+    oracle_run_many_p.add_argument("--sources", nargs="*", help="Default data source IDs")
+    oracle_run_many_p.add_argument("--model", default="claude-opus-4-5-20251101")
 
     oracle_create_job_p = oracle_sub.add_parser("create-job", help="Create async job")
     oracle_create_job_p.add_argument("query", help="Research question")
@@ -1034,6 +5435,12 @@ def build_parser() -> argparse.ArgumentParser:
 
     search_deep_p = search_sub.add_parser("deep", help="Deep research (Pro)")
     search_deep_p.add_argument("query", help="Research query")
+    search_deep_p.add_argument(
+        "--fresh", action="store_true", help="Ignore a cached answer to the same question"
+    )
+    search_deep_p.add_argument(
+        "--cache-ttl", type=float, help="Keep this answer for N seconds (default 1 day)"
+    )
 
     search_package_p = search_sub.add_parser("package", help="Search in package")
     search_package_p.add_argument("package", help="Package name")
@@ -1044,6 +5451,38 @@ def build_parser() -> argparse.ArgumentParser:
     )
     search_package_p.add_argument("--limit", type=int, default=10)
 
+    search_local_p = search_sub.add_parser("local", help="BM25 search over local mirrors")
+    search_local_p.add_argument("query", help="Search query")
+    search_local_p.add_argument(
+        "--dir", action="append", help="Mirror directory (repeatable; default: all mirrors)"
+    )
+    search_local_p.add_argument("--limit", type=int, default=10)
+    search_local_p.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Re-check every file (picks up edits made in place in a --dir)",
+    )
+
+    search_federated_p = search_sub.add_parser(
+        "federated", help="Query several backends at once and fuse the rankings"
+    )
+    search_federated_p.add_argument("query", help="Search query")
+    search_federated_p.add_argument(
+        "--backends",
+        default="universal,web",
+        help=f"Comma-separated backends from: {', '.join(FEDERATED_BACKENDS)}",
+    )
+    search_federated_p.add_argument(
+        "--budget", type=float, default=10.0, help="Overall latency budget in seconds"
+    )
+    search_federated_p.add_argument("--limit", type=int, default=10)
+    search_federated_p.add_argument("--package", help="Package for the 'package' backend")
+    search_federated_p.add_argument(
+        "--registry", default="py_pi", choices=["npm", "py_pi", "crates", "go_modules"]
+    )
+    search_federated_p.add_argument("--repos", nargs="*", help="Repository IDs ('query')")
+    search_federated_p.add_argument("--sources", nargs="*", help="Data source IDs ('query')")
+
     search_query_p = search_sub.add_parser("query", help="Query repos/docs")
     search_query_p.add_argument("query", help="Query text")
     search_query_p.add_argument("--repos", nargs="*", help="Repository IDs")
@@ -1057,25 +5496,63 @@ def build_parser() -> argparse.ArgumentParser:
     repos_list_p.add_argument("--filter", help="Filter substring")
     repos_list_p.add_argument("--status", help="Status filter")
     repos_list_p.add_argument("--limit", type=int, default=100)
+    repos_list_p.add_argument("--all", action="store_true", help="Stream every page")
 
     repos_index_p = repos_sub.add_parser("index", help="Index repository")
     repos_index_p.add_argument("repo", help="owner/repo")
     repos_index_p.add_argument("--token", help="GitHub token for private repos")
 
+    repos_index_many_p = repos_sub.add_parser("index-many", help="Index many repositories")
+    repos_index_many_p.add_argument("repos", nargs="*", help="owner/repo ...")
+    repos_index_many_p.add_argument("--file", help="File with one owner/repo per line")
+    repos_index_many_p.add_argument("--token", help="GitHub token for private repos")
+    repos_index_many_p.add_argument("--concurrency", type=int, default=8)
+    repos_index_many_p.add_argument("--no-wait", action="store_true", help="Submit only")
+    repos_index_many_p.add_argument("--timeout", type=float, help="Stop watching after N seconds")
+
     repos_status_p = repos_sub.add_parser("status", help="Get status")
     repos_status_p.add_argument("repo_id", help="Repository ID")
 
     repos_tree_p = repos_sub.add_parser("tree", help="Get tree structure")
     repos_tree_p.add_argument("repo_id", help="Repository ID")
+    repos_tree_p.add_argument("--prefix", help="Only files under this path (streams the tree)")
+    repos_tree_p.add_argument("--glob", help="Only files matching this pattern, e.g. '*.py'")
+
+    repos_ls_p = repos_sub.add_parser("ls", help="List a directory (from the local path index)")
+    repos_ls_p.add_argument("repo_id", help="Repository ID")
+    repos_ls_p.add_argument("path", nargs="?", default="", help="Directory (default: root)")
+
+    repos_mirror_p = repos_sub.add_parser("mirror", help="Sync repository files to disk")
+    repos_mirror_p.add_argument("repo_id", help="Repository ID")
+    repos_mirror_p.add_argument("dir", help="Local mirror directory")
+    repos_mirror_p.add_argument("--concurrency", type=int, default=16)
 
     repos_content_p = repos_sub.add_parser("content", help="Get file content")
     repos_content_p.add_argument("repo_id", help="Repository ID")
     repos_content_p.add_argument("path", help="File path")
+    repos_content_p.add_argument(
+        "--out",
+        metavar="FILE",
+        help=(
+            "Stream the file to FILE as it downloads (gzip-encoded responses are"
+            " decompressed; FILE is gzip-compressed if it ends in .gz)"
+        ),
+    )
+    repos_content_p.add_argument(
+        "--range",
+        dest="line_range",
+        type=parse_line_range,
+        metavar="START:END",
+        help="Only lines START to END (1-based; either may be omitted)",
+    )
 
     repos_grep_p = repos_sub.add_parser("grep", help="Search with regex")
-    repos_grep_p.add_argument("repo_id", help="Repository ID")
+    repos_grep_p.add_argument("ids", nargs="*", metavar="repo_id", help="Repository ID(s)")
     repos_grep_p.add_argument("pattern", help="Regex pattern")
     repos_grep_p.add_argument("--context", type=int, default=3)
+    repos_grep_p.add_argument("--all", action="store_true", help="Every indexed repository")
+    repos_grep_p.add_argument("--max-matches", type=int, help="Stop after N matches")
+    repos_grep_p.add_argument("--concurrency", type=int, default=8)
 
     repos_delete_p = repos_sub.add_parser("delete", help="Delete repository")
     repos_delete_p.add_argument("repo_id", help="Repository ID")
@@ -1088,24 +5565,62 @@ def build_parser() -> argparse.ArgumentParser:
     sources_list_p.add_argument("--filter", help="Filter substring")
     sources_list_p.add_argument("--status", help="Status filter")
     sources_list_p.add_argument("--limit", type=int, default=100)
+    sources_list_p.add_argument("--all", action="store_true", help="Stream every page")
 
     sources_index_p = sources_sub.add_parser("index", help="Index documentation")
     sources_index_p.add_argument("url", help="Documentation URL")
     sources_index_p.add_argument("--name", help="Display name")
 
+    sources_index_many_p = sources_sub.add_parser("index-many", help="Index many doc sites")
+    sources_index_many_p.add_argument("urls", nargs="*", help="Documentation URLs")
+    sources_index_many_p.add_argument("--file", help="File with one URL per line")
+    sources_index_many_p.add_argument("--concurrency", type=int, default=8)
+    sources_index_many_p.add_argument("--no-wait", action="store_true", help="Submit only")
+    sources_index_many_p.add_argument("--timeout", type=float, help="Stop watching after N seconds")
+
     sources_get_p = sources_sub.add_parser("get", help="Get source details")
     sources_get_p.add_argument("source_id", help="Source ID")
 
     sources_tree_p = sources_sub.add_parser("tree", help="Get tree structure")
     sources_tree_p.add_argument("source_id", help="Source ID")
+    sources_tree_p.add_argument("--prefix", help="Only pages under this path (streams the tree)")
+    sources_tree_p.add_argument("--glob", help="Only pages matching this pattern, e.g. 'api/*'")
+
+    sources_ls_p = sources_sub.add_parser("ls", help="List a directory (from the local path index)")
+    sources_ls_p.add_argument("source_id", help="Source ID")
+    sources_ls_p.add_argument("path", nargs="?", default="", help="Directory (default: root)")
+
+    sources_mirror_p = sources_sub.add_parser("mirror", help="Sync documentation pages to disk")
+    sources_mirror_p.add_argument("source_id", help="Source ID")
+    sources_mirror_p.add_argument("dir", help="Local mirror directory")
+    sources_mirror_p.add_argument("--concurrency", type=int, default=16)
 
     sources_content_p = sources_sub.add_parser("content", help="Get page content")
     sources_content_p.add_argument("source_id", help="Source ID")
     sources_content_p.add_argument("path", help="Page path")
+    sources_content_p.add_argument(
+        "--out",
+        metavar="FILE",
+        help=(
+            "Stream the page to FILE as it downloads (gzip-encoded responses are"
+            " decompressed; FILE is gzip-compressed if it ends in .gz)"
+        ),
+    )
+    sources_content_p.add_argument(
+        "--range",
+        dest="line_range",
+        type=parse_line_range,
+        metavar="START:END",
+        help="Only lines START to END (1-based; either may be omitted)",
+    )
 
     sources_grep_p = sources_sub.add_parser("grep", help="Search with regex")
-    sources_grep_p.add_argument("source_id", help="Source ID")
+    sources_grep_p.add_argument("ids", nargs="*", metavar="source_id", help="Source ID(s)")
     sources_grep_p.add_argument("pattern", help="Regex pattern")
+    sources_grep_p.add_argument("--context", type=int, default=3)
+    sources_grep_p.add_argument("--all", action="store_true", help="Every indexed source")
+    sources_grep_p.add_argument("--max-matches", type=int, help="Stop after N matches")
+    sources_grep_p.add_argument("--concurrency", type=int, default=8)
 
     sources_delete_p = sources_sub.add_parser("delete", help="Delete source")
     sources_delete_p.add_argument("source_id", help="Source ID")
@@ -1117,6 +5632,7 @@ def build_parser() -> argparse.ArgumentParser:
     papers_list_p = papers_sub.add_parser("list", help="List papers")
     papers_list_p.add_argument("--status", help="Status filter")
     papers_list_p.add_argument("--limit", type=int, default=50)
+    papers_list_p.add_argument("--all", action="store_true", help="Stream every page")
 
     papers_index_p = papers_sub.add_parser("index", help="Index arXiv paper")
     papers_index_p.add_argument("arxiv_id", help="arXiv ID (e.g., 2310.06825)")
@@ -1128,6 +5644,7 @@ def build_parser() -> argparse.ArgumentParser:
     context_list_p = context_sub.add_parser("list", help="List contexts")
     context_list_p.add_argument("--tags", help="Filter by tags")
     context_list_p.add_argument("--limit", type=int, default=20)
+    context_list_p.add_argument("--all", action="store_true", help="Stream every page")
 
     context_save_p = context_sub.add_parser("save", help="Save context")
     context_save_p.add_argument("--title", required=True, help="Context title")
@@ -1135,9 +5652,33 @@ def build_parser() -> argparse.ArgumentParser:
     context_save_p.add_argument("--summary", help="Optional summary")
     context_save_p.add_argument("--tags", nargs="*", help="Tags")
 
+    context_import_p = context_sub.add_parser(
+        "import", help="Save files as contexts, skipping unchanged content"
+    )
+    context_import_p.add_argument("paths", nargs="+", help="Files, directories or globs")
+    context_import_p.add_argument("--tags", nargs="*", help="Tags for every context")
+    context_import_p.add_argument("--concurrency", type=int, default=8)
+    context_import_p.add_argument(
+        "--chunk-size", type=int, default=CONTEXT_CHUNK_CHARS, help="Max characters per context"
+    )
+    context_import_p.add_argument(
+        "--manifest", help="Record of uploaded chunks (default: in the cache directory)"
+    )
+    context_import_p.add_argument(
+        "--dry-run", action="store_true", help="Count new chunks without uploading"
+    )
+
     context_search_p = context_sub.add_parser("search", help="Search contexts")
     context_search_p.add_argument("query", help="Search query")
     context_search_p.add_argument("--semantic", action="store_true", help="Use semantic search")
+    context_search_p.add_argument(
+        "--local", action="store_true", help="Search the local replica (see 'context sync')"
+    )
+    context_search_p.add_argument("--limit", type=int, default=10, help="Local results")
+
+    context_sync_p = context_sub.add_parser("sync", help="Update the local context replica")
+    context_sync_p.add_argument("--concurrency", type=int, default=8)
+    context_sync_p.add_argument("--full", action="store_true", help="Re-fetch every context")
 
     context_get_p = context_sub.add_parser("get", help="Get context")
     context_get_p.add_argument("context_id", help="Context ID")
@@ -1145,212 +5686,853 @@ def build_parser() -> argparse.ArgumentParser:
     context_delete_p = context_sub.add_parser("delete", help="Delete context")
     context_delete_p.add_argument("context_id", help="Context ID")
 
+    # Cache commands
+    cache_parser = subparsers.add_parser("cache", help="Local response cache")
+    cache_sub = cache_parser.add_subparsers(dest="action")
+    cache_sub.add_parser("stats", help="Show cache size and hit/miss counters")
+    cache_sub.add_parser("clear", help="Remove all cached responses")
+
+    # Batch commands
+    batch_p = subparsers.add_parser("batch", help="Run JSONL jobs concurrently")
+    batch_p.add_argument("file", nargs="?", default="-", help="JSONL job file (default: stdin)")
+    batch_p.add_argument("--concurrency", type=int, default=8, help="Max jobs in flight")
+
+    # Prefetch worker
+    subparsers.add_parser(
+        "prefetch", help="Warm the cache from a JSON plan on stdin (used by --prefetch)"
+    )
+
+    # Daemon
+    serve_p = subparsers.add_parser("serve", help="Run the warm daemon (used by nia_client.py)")
+    serve_p.add_argument(
+        "--socket", help="Unix socket path (default: ~/.cache/nia-docs/daemon.sock)"
+    )
+    serve_p.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DAEMON_IDLE_TIMEOUT,
+        help="Exit after this many seconds without requests",
+    )
+    serve_p.add_argument("--stop", action="store_true", help="Stop a running daemon")
+
     return parser
 
 
-async def main():
-    parser = build_parser()
+# Commands whose output combines several responses, so there is no single body to pass through
+COMPOSITE_COMMANDS = frozenset(
+    {
+        ("oracle", "run-many"),
+        ("search", "federated"),
+        ("search", "local"),
+        ("repos", "index-many"),
+        ("repos", "mirror"),
+        ("repos", "ls"),
+        ("sources", "index-many"),
+        ("sources", "mirror"),
+        ("sources", "ls"),
+        ("context", "import"),
+        ("context", "sync"),
+        ("cache", "stats"),
+        ("cache", "clear"),
+        ("batch", None),
+        ("prefetch", None),
+        ("serve", None),
+    }
+)
 
-    # Handle args that might come from runtime harness
-    args_to_parse = [arg for arg in sys.argv[1:] if not arg.endswith(".py")]
-    if not args_to_parse:
-        parser.print_help()
-        return
 
-    args = parser.parse_args(args_to_parse)
+def supports_raw(args: argparse.Namespace) -> bool:
+    """Whether ``--format raw`` applies: the command prints exactly one API response."""
+    if getattr(args, "all", False) or getattr(args, "prefix", None) or getattr(args, "glob", None):
+        return False
+    if getattr(args, "local", False) or len(getattr(args, "ids", ())) > 1:
+        return False
+    if getattr(args, "max_matches", None) or getattr(args, "out", None):
+        return False
+    if getattr(args, "line_range", None):
+        return False
+    return (args.command, getattr(args, "action", None)) not in COMPOSITE_COMMANDS
 
-    if not NIA_API_KEY:
-        print("Error: NIA_API_KEY not found. Set in environment or ~/.claude/.env")
-        return
 
-    try:
-        # Oracle commands
-        if args.command == "oracle":
-            if args.action == "research":
-                print(f"Running Oracle research: {args.query}")
-                if args.stream:
-                    await oracle_research_stream(args.query, args.repos, args.sources, args.model)
+def needs_api_key(args: argparse.Namespace) -> bool:
+    """Whether a command talks to the API (local-only commands run without a key)."""
+    if getattr(args, "local", False):
+        return False
+    return (args.command, getattr(args, "action", None)) not in LOCAL_COMMANDS
+
+
+async def dispatch(client: NiaClient, args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Run one parsed CLI command on a shared client."""
+    # Oracle commands
+    if args.command == "oracle":
+        if args.action == "research":
+            note(f"Running Oracle research: {args.query}")
+            if args.stream:
+                stats = StreamStats()
+                await client.oracle_research_stream(
+                    args.query, args.repos, args.sources, args.model, stats=stats
+                )
+                if args.timings:
+                    print(json.dumps(stats.summary()), file=sys.stderr)
+            else:
+                result = await client.oracle_research(
+                    args.query,
+                    args.repos,
+                    args.sources,
+                    model=args.model,
+                    fresh=args.fresh,
+                    ttl=args.cache_ttl,
+                )
+                emit(result, format_oracle_result)
+
+        elif args.action == "sessions":
+            if args.all:
+                await print_all_items(client.iter_oracle_sessions(), "Oracle Sessions")
+                return
+            result = await client.oracle_list_sessions(args.limit)
+            emit(result, format_list_result, "Oracle Sessions")
+
+        elif args.action == "session":
+            if args.messages:
+                result = await client.oracle_get_messages(args.session_id)
+            else:
+                result = await client.oracle_get_session(args.session_id)
+            emit(result)
+
+        elif args.action == "chat":
+            stats = StreamStats()
+            await client.oracle_chat_followup(args.session_id, args.message, stats)
+            if args.timings:
+                print(json.dumps(stats.summary()), file=sys.stderr)
+
+        elif args.action == "jobs":
+            result = await client.oracle_list_jobs()
+            emit(result, format_list_result, "Oracle Jobs")
+
+        elif args.action == "job":
+            if args.cancel:
+                result = await client.oracle_cancel_job(args.job_id)
+            elif args.stream:
+                stats = StreamStats()
+                await client.oracle_stream_job_events(args.job_id, args.last_event_id, stats)
+                if args.timings:
+                    print(json.dumps(stats.summary()), file=sys.stderr)
+                return
+            else:
+                result = await client.oracle_get_job(args.job_id)
+            emit(result)
+
+        elif args.action == "run-many":
+            defaults = {
+                "repositories": args.repos,
+                "data_sources": args.sources,
+                "model": args.model,
+            }
+            queries = read_oracle_queries(args.file, defaults)
+            state_path = Path(args.state) if args.state else Path(args.out) / ".run-many-state.json"
+            note(f"Running {len(queries)} Oracle queries -> {args.out}")
+            counts = await run_oracle_fleet(
+                client,
+                queries,
+                Path(args.out),
+                state_path,
+                args.concurrency,
+                args.max_jobs,
+                args.retry_failed,
+            )
+            emit(counts)
+
+        elif args.action == "create-job":
+            result = await client.oracle_create_job(args.query, args.repos, model=args.model)
+            emit(result)
+
+    # Search commands
+    elif args.command == "search":
+        if args.action == "universal":
+            note(f"Universal search: {args.query}")
+            result = await client.search_universal(args.query, args.limit)
+            emit(result, format_search_result, "Universal Search")
+
+        elif args.action == "web":
+            note(f"Web search: {args.query}")
+            result = await client.search_web(args.query, args.category, args.time)
+            emit(result, format_search_result, "Web Search")
+
+        elif args.action == "deep":
+            note(f"Deep research: {args.query}")
+            result = await client.search_deep(args.query, args.fresh, args.cache_ttl)
+            emit(result, format_search_result, "Deep Research")
+
+        elif args.action == "package":
+            if args.grep:
+                note(f"Package grep: {args.package} / {args.grep}")
+                result = await client.search_package_grep(
+                    args.package, args.grep, args.registry, args.limit
+                )
+            else:
+                note(f"Package search: {args.package} / {args.query}")
+                result = await client.search_package_hybrid(
+                    args.package, args.query or "", args.registry, args.limit
+                )
+            emit(result, format_search_result, "Package Search")
+
+        elif args.action == "local":
+            note(f"Local search: {args.query}")
+            result = search_local(args.query, args.dir, args.limit, args.reindex)
+            emit(result, format_search_result, "Local Search")
+
+        elif args.action == "federated":
+            note(f"Federated search: {args.query}")
+            events = federated_search(
+                client,
+                args.query,
+                [b.strip() for b in args.backends.split(",") if b.strip()],
+                args.budget,
+                args.limit,
+                args.package,
+                args.registry,
+                args.repos,
+                args.sources,
+            )
+            async for event in events:
+                if OUTPUT_FORMAT.get() == "ndjson":
+                    print(dumps_json(event), flush=True)
+                elif "fused" in event:
+                    results = [
+                        {**hit, "title": f"{hit['title']}  [{', '.join(hit['backends'])}]"}
+                        for hit in event["fused"]
+                    ]
+                    print(format_search_result({"results": results}, "Federated Search"))
+                elif "error" in event:
+                    print(f"- {event['backend']}: {event['error']} ({event['ms']}ms)", flush=True)
                 else:
-                    result = await oracle_research(
-                        args.query, args.repos, args.sources, model=args.model
+                    top = event["hits"][0]["title"] if event["hits"] else "-"
+                    print(
+                        f"- {event['backend']}: {len(event['hits'])} hits ({event['ms']}ms), "
+                        f"top: {top}",
+                        flush=True,
                     )
-                    print(format_oracle_result(result))
 
-            elif args.action == "sessions":
-                result = await oracle_list_sessions(args.limit)
-                print(format_list_result(result, "Oracle Sessions"))
+        elif args.action == "query":
+            messages = [{"role": "user", "content": args.query}]
+            result = await client.search_query(messages, args.repos, args.sources)
+            emit(result, format_search_result, "Query")
+
+    # Repository commands
+    elif args.command == "repos":
+        if args.action == "list":
+            if args.all:
+                await print_all_items(client.iter_repos(args.filter, args.status), "Repositories")
+                return
+            result = await client.repos_list(args.filter, args.status, args.limit)
+            emit(result, format_list_result, "Repositories")
+
+        elif args.action == "index":
+            note(f"Indexing repository: {args.repo}")
+            result = await client.repos_index(args.repo, args.token)
+            emit(result)
+
+        elif args.action == "index-many":
+            repos = args.repos + read_lines(args.file)
+            note(f"Indexing {len(repos)} repositories")
+            result = await index_many(
+                client, "repos", repos, args.concurrency, not args.no_wait, args.timeout, args.token
+            )
+            emit(result)
+
+        elif args.action == "status":
+            result = await client.repos_status(args.repo_id)
+            emit(result)
+
+        elif args.action == "tree":
+            if args.prefix or args.glob:
+                if args.prefetch and client.cache is not None:
+                    await prefetch_tree(client, "repos", args.repo_id, args.prefix, args.glob)
+                files = indexed_tree_files(client, "repos", args.repo_id, args.prefix, args.glob)
+                await print_tree_files(files)
+                return
+            if OUTPUT_FORMAT.get() == "ndjson":
+                await print_tree_files(client.iter_tree("repos", args.repo_id))
+                return
+            result = await client.repos_tree(args.repo_id)
+            emit(result)
+
+        elif args.action == "ls":
+            try:
+                index = await client.path_index("repos", args.repo_id)
+            except RuntimeError as e:
+                emit({"error": str(e)})
+                return
+            entries = index.ls(args.path)
+            # Before printing: a reader that stops early (| head) must not cancel it
+            if args.prefetch:
+                files = [entry["path"] for entry in entries if entry["type"] == "file"]
+                start_prefetch(client, "repos", args.repo_id, files)
+            emit(entries, format_ls_result, args.path)
+
+        elif args.action == "mirror":
+            note(f"Mirroring repository {args.repo_id} -> {args.dir}")
+            result = await mirror_tree(client, "repos", args.repo_id, args.dir, args.concurrency)
+            emit(result)
+
+        elif args.action == "content":
+            if args.out or args.line_range:
+                ok = await write_content(
+                    client, "repos", args.repo_id, args.path, args.out, args.line_range
+                )
+            else:
+                result = await client.repos_content(args.repo_id, args.path)
+                emit(result, format_content)
+                ok = "error" not in result
+            if ok and client.cache is not None:
+                await record_access("repos", args.repo_id, args.path)
+
+        elif args.action == "grep":
+            if not args.ids and not args.all:
+                parser.error("repos grep needs a repository ID or --all")
+            if args.all or len(args.ids) > 1 or args.max_matches:
+                ids = await indexed_ids(client, "repos") if args.all else args.ids
+                matches = grep_many(
+                    client,
+                    "repos",
+                    ids,
+                    args.pattern,
+                    args.concurrency,
+                    args.max_matches,
+                    args.context,
+                )
+                await print_grep_matches(matches)
+                return
+            result = await client.repos_grep(args.ids[0], args.pattern, args.context)
+            emit(result, format_search_result, "Repository Grep")
+
+        elif args.action == "delete":
+            result = await client.repos_delete(args.repo_id)
+            emit(result)
+
+    # Data sources commands
+    elif args.command == "sources":
+        if args.action == "list":
+            if args.all:
+                await print_all_items(client.iter_sources(args.filter, args.status), "Data Sources")
+                return
+            result = await client.sources_list(args.filter, args.status, limit=args.limit)
+            emit(result, format_list_result, "Data Sources")
+
+        elif args.action == "index":
+            note(f"Indexing: {args.url}")
+            result = await client.sources_index(args.url, args.name)
+            emit(result)
+
+        elif args.action == "index-many":
+            urls = args.urls + read_lines(args.file)
+            note(f"Indexing {len(urls)} data sources")
+            result = await index_many(
+                client, "sources", urls, args.concurrency, not args.no_wait, args.timeout
+            )
+            emit(result)
+
+        elif args.action == "get":
+            result = await client.sources_get(args.source_id)
+            emit(result)
+
+        elif args.action == "tree":
+            if args.prefix or args.glob:
+                if args.prefetch and client.cache is not None:
+                    await prefetch_tree(client, "sources", args.source_id, args.prefix, args.glob)
+                files = indexed_tree_files(
+                    client, "sources", args.source_id, args.prefix, args.glob
+                )
+                await print_tree_files(files)
+                return
+            if OUTPUT_FORMAT.get() == "ndjson":
+                await print_tree_files(client.iter_tree("sources", args.source_id))
+                return
+            result = await client.sources_tree(args.source_id)
+            emit(result)
+
+        elif args.action == "ls":
+            try:
+                index = await client.path_index("sources", args.source_id)
+            except RuntimeError as e:
+                emit({"error": str(e)})
+                return
+            entries = index.ls(args.path)
+            # Before printing: a reader that stops early (| head) must not cancel it
+            if args.prefetch:
+                files = [entry["path"] for entry in entries if entry["type"] == "file"]
+                start_prefetch(client, "sources", args.source_id, files)
+            emit(entries, format_ls_result, args.path)
+
+        elif args.action == "mirror":
+            note(f"Mirroring data source {args.source_id} -> {args.dir}")
+            result = await mirror_tree(
+                client, "sources", args.source_id, args.dir, args.concurrency
+            )
+            emit(result)
+
+        elif args.action == "content":
+            if args.out or args.line_range:
+                ok = await write_content(
+                    client, "sources", args.source_id, args.path, args.out, args.line_range
+                )
+            else:
+                result = await client.sources_content(args.source_id, args.path)
+                emit(result, format_content)
+                ok = "error" not in result
+            if ok and client.cache is not None:
+                await record_access("sources", args.source_id, args.path)
+
+        elif args.action == "grep":
+            if not args.ids and not args.all:
+                parser.error("sources grep needs a source ID or --all")
+            if args.all or len(args.ids) > 1 or args.max_matches:
+                ids = await indexed_ids(client, "sources") if args.all else args.ids
+                matches = grep_many(
+                    client,
+                    "sources",
+                    ids,
+                    args.pattern,
+                    args.concurrency,
+                    args.max_matches,
+                    args.context,
+                )
+                await print_grep_matches(matches)
+                return
+            result = await client.sources_grep(args.ids[0], args.pattern, args.context)
+            emit(result, format_search_result, "Source Grep")
+
+        elif args.action == "delete":
+            result = await client.sources_delete(args.source_id)
+            emit(result)
+
+    # Papers commands
+    elif args.command == "papers":
+        if args.action == "list":
+            if args.all:
+                await print_all_items(client.iter_papers(args.status), "Research Papers")
+                return
+            result = await client.papers_list(args.limit, status=args.status)
+            emit(result, format_list_result, "Research Papers")
+
+        elif args.action == "index":
+            note(f"Indexing arXiv paper: {args.arxiv_id}")
+            result = await client.papers_index(args.arxiv_id)
+            emit(result)
+
+    # Context commands
+    elif args.command == "context":
+        if args.action == "list":
+            if args.all:
+                await print_all_items(client.iter_contexts(args.tags), "Contexts")
+                return
+            result = await client.context_list(args.limit, tags=args.tags)
+            emit(result, format_list_result, "Contexts")
+
+        elif args.action == "save":
+            result = await client.context_save(args.title, args.content, args.summary, args.tags)
+            emit(result)
+
+        elif args.action == "import":
+            result = await import_contexts(
+                client,
+                args.paths,
+                args.tags,
+                args.concurrency,
+                args.chunk_size,
+                args.manifest,
+                args.dry_run,
+            )
+            emit(result)
+
+        elif args.action == "search":
+            store = ContextStore()
+            if args.local:
+                result = store.search(args.query, args.limit)
+            else:
+                import aiohttp
 
-            elif args.action == "session":
-                if args.messages:
-                    result = await oracle_get_messages(args.session_id)
+                if args.semantic:
+                    search = client.context_search_semantic
                 else:
-                    result = await oracle_get_session(args.session_id)
-                print(json.dumps(result, indent=2, default=str))
+                    search = client.context_search_text
+                try:
+                    result = await search(args.query)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result = {"error": str(e) or type(e).__name__}
+                if "error" in result and store.path.exists() and store.count():
+                    synced = store.get_meta("synced_at")
+                    age = f", synced {(time.time() - synced) / 3600:.1f}h ago" if synced else ""
+                    note(f"Remote search failed ({result['error']}); using the local replica{age}")
+                    result = store.search(args.query, args.limit)
+            store.close()
+            emit(result, format_search_result, "Context Search")
+
+        elif args.action == "sync":
+            store = ContextStore()
+            try:
+                result = await sync_contexts(client, store, args.concurrency, args.full)
+            except RuntimeError as e:
+                result = {"error": str(e)}
+            finally:
+                store.close()
+            emit(result)
+
+        elif args.action == "get":
+            result = await client.context_get(args.context_id)
+            emit(result)
+
+        elif args.action == "delete":
+            result = await client.context_delete(args.context_id)
+            emit(result)
+
+    # Cache commands
+    elif args.command == "cache":
+        cache = client.cache or ResponseCache()
+        if args.action == "stats":
+            emit(cache.stats())
+        elif args.action == "clear":
+            cache.clear()
+            removed = PathIndex.clear_all()
+            locks = 0
+            for lock in cache.lock_dir.glob("*.lock"):
+                lock.unlink(missing_ok=True)
+                locks += 1
+            emit(
+                {
+                    "status": "cleared",
+                    "path": str(cache.path),
+                    "path_indexes": removed,
+                    "locks": locks,
+                }
+            )
+        if cache is not client.cache:
+            cache.close()
+
+    # Batch commands
+    elif args.command == "batch":
+        start = time.monotonic()
+        if args.file == "-":
+            counts = await run_batch(client, sys.stdin, args.concurrency)
+        else:
+            with open(args.file) as f:
+                counts = await run_batch(client, f, args.concurrency)
+        print(
+            f"batch: {counts['ok']} ok, {counts['failed']} failed "
+            f"in {time.monotonic() - start:.1f}s",
+            file=sys.stderr,
+        )
+
+    # Prefetch worker
+    elif args.command == "prefetch":
+        plan = json.load(sys.stdin)
+        stats = await prefetch_pages(
+            client, plan["kind"], plan["id"], plan["paths"], op=plan.get("op", "content")
+        )
+        emit(stats)
+
+    else:
+        parser.print_help()
+
+
+def build_client(args: argparse.Namespace, api_key: str = None, base_url: str = None) -> NiaClient:
+    """Construct the client described by the global CLI flags."""
+    if args.record or args.replay:
+        # A cache hit would leave a hole in the recording (or mask the cassette on replay)
+        cassette = Cassette(args.record, "record") if args.record else Cassette(args.replay)
+        cache = None
+    else:
+        cassette = None
+        cache = None if args.no_cache else ResponseCache()
+    return NiaClient(
+        api_key=api_key,
+        base_url=base_url,
+        limit_per_host=args.connections,
+        cache=cache,
+        refresh=args.refresh,
+        limiter=RateLimiter(args.rate),
+        retry=RetryPolicy(args.retries),
+        hedge=HedgePolicy() if args.hedge else None,
+        cassette=cassette,
+    )
+
 
-            elif args.action == "chat":
-                await oracle_chat_followup(args.session_id, args.message)
+# =============================================================================
+# DAEMON
+# =============================================================================
 
-            elif args.action == "jobs":
-                result = await oracle_list_jobs()
-                print(format_list_result(result, "Oracle Jobs"))
+DAEMON_SOCKET = Path(os.environ.get("NIA_DAEMON_SOCKET") or NIA_CACHE_DIR / "daemon.sock")
+DAEMON_IDLE_TIMEOUT = 900
+
+# Commands the daemon hands back to the caller: they read stdin, resolve paths
+# against the caller's working directory, or manage the daemon itself
+DAEMON_LOCAL_COMMANDS = LOCAL_COMMANDS | {
+    ("batch", None),
+    ("prefetch", None),
+    ("oracle", "run-many"),
+    ("repos", "index-many"),
+    ("sources", "index-many"),
+    ("repos", "mirror"),
+    ("sources", "mirror"),
+    ("context", "import"),
+}
+
+# Client-shaping flags; requests that agree on these share one warm client
+DAEMON_CLIENT_FLAGS = ("connections", "rate", "retries", "hedge", "no_cache", "refresh")
+
+# Tunables read once at import; a caller whose values differ runs the command itself
+DAEMON_ENV_VARS = (
+    "NIA_POOL_LIMIT",
+    "NIA_POOL_PER_HOST",
+    "NIA_CACHE_MAX_MB",
+    "NIA_RATE_LIMIT",
+    "NIA_RESEARCH_TTL",
+    "NIA_PREFETCH_PAGES",
+    "NIA_PREFETCH_BYTES",
+)
+
+# (stdout, stderr) of the daemon request running in the current context
+DAEMON_STREAMS = contextvars.ContextVar("nia_daemon_streams", default=None)
+
+
+def runs_in_daemon(args: argparse.Namespace) -> bool:
+    """Whether a parsed command can be served by the daemon on the caller's behalf."""
+    if (args.command, getattr(args, "action", None)) in DAEMON_LOCAL_COMMANDS:
+        return False
+    if getattr(args, "out", None):
+        return False  # a relative FILE belongs to the caller's working directory
+    return not (args.trace or args.record or args.replay or args.format == "raw")
+
+
+class DaemonOutput:
+    """Text stream that forwards writes to a daemon client as ``{name: text}`` frames."""
+
+    def __init__(self, writer, name: str):
+        self.writer = writer
+        self.name = name
+
+    def write(self, text: str) -> int:
+        if text and not self.writer.is_closing():
+            self.writer.write((json.dumps({self.name: text}) + "\n").encode())
+        return len(text)
+
+    def writelines(self, lines) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class RoutedStream:
+    """Stand-in for ``sys.stdout``/``sys.stderr`` that writes to the current daemon
+    request's stream, or to the original stream outside of one."""
+
+    def __init__(self, default, index: int):
+        self.default = default
+        self.index = index
+
+    def __getattr__(self, name):
+        streams = DAEMON_STREAMS.get()
+        return getattr(streams[self.index] if streams else self.default, name)
+
+
+class Daemon:
+    """Resident server that runs CLI commands on warm, pooled clients.
+
+    Listens on a Unix socket (mode 0600). Each connection sends one JSON line
+    ``{"argv": [...], "api_key": ..., "api_url": ..., "cache_dir": ..., "env":
+    {...}}`` and receives ``{"out": ...}`` and ``{"err": ...}`` frames followed
+    by ``{"exit": code}``, or ``{"local": true}`` when the command must run in
+    the caller's process instead. Clients are pooled per API key and URL. The
+    daemon never lends its own API key: a request without one is refused. A
+    caller with a different cache directory (where the cache, indexes and
+    context store live) or different ``DAEMON_ENV_VARS`` is handed back.
+    Exits after ``idle_timeout`` seconds without requests.
+    """
 
-            elif args.action == "job":
-                if args.cancel:
-                    result = await oracle_cancel_job(args.job_id)
-                elif args.stream:
-                    await oracle_stream_job_events(args.job_id)
+    def __init__(self, socket_path: Path = None, idle_timeout: float = DAEMON_IDLE_TIMEOUT):
+        self.socket_path = Path(socket_path or DAEMON_SOCKET)
+        self.idle_timeout = idle_timeout
+        self.parser = build_parser()
+        self.clients: dict[tuple, NiaClient] = {}
+        self.active = 0
+        self.last_request = time.monotonic()
+        self.stopping = False
+
+    async def client_for(self, args: argparse.Namespace, api_key: str, api_url: str) -> NiaClient:
+        key = (api_key, api_url, *(getattr(args, flag) for flag in DAEMON_CLIENT_FLAGS))
+        if key not in self.clients:
+            self.clients[key] = await build_client(args, api_key, api_url).__aenter__()
+        return self.clients[key]
+
+    @staticmethod
+    def same_environment(request: dict) -> bool:
+        """Whether the caller's cache directory and tunables match the daemon's own."""
+        cache_dir = Path(request.get("cache_dir") or NIA_CACHE_DIR)
+        if cache_dir.resolve() != NIA_CACHE_DIR.resolve():
+            return False
+        env = request.get("env") or {}
+        return all(env.get(name) == os.environ.get(name) for name in DAEMON_ENV_VARS)
+
+    async def handle(self, reader, writer) -> None:
+        self.active += 1
+        code = 0
+        try:
+            request = json.loads(await reader.readline())
+            if request.get("stop"):
+                self.stopping = True
+                writer.write(b'{"exit": 0}\n')
+                return
+            out, err = DaemonOutput(writer, "out"), DaemonOutput(writer, "err")
+            DAEMON_STREAMS.set((out, err))
+            try:
+                args = self.parser.parse_args(request["argv"])
+            except SystemExit as e:
+                code = e.code
+            else:
+                if not (runs_in_daemon(args) and self.same_environment(request)):
+                    writer.write(b'{"local": true}\n')
                     return
+                OUTPUT_FORMAT.set(args.format)
+                api_key = request.get("api_key")
+                api_url = (request.get("api_url") or NIA_API_URL).rstrip("/")
+                if not api_key and needs_api_key(args):
+                    print("Error: NIA_API_KEY not found. Set in environment or ~/.claude/.env")
+                    code = 1
                 else:
-                    result = await oracle_get_job(args.job_id)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "create-job":
-                result = await oracle_create_job(args.query, args.repos, model=args.model)
-                print(json.dumps(result, indent=2, default=str))
-
-        # Search commands
-        elif args.command == "search":
-            if args.action == "universal":
-                print(f"Universal search: {args.query}")
-                result = await search_universal(args.query, args.limit)
-                print(format_search_result(result, "Universal Search"))
-
-            elif args.action == "web":
-                print(f"Web search: {args.query}")
-                result = await search_web(args.query, args.category, args.time)
-                print(format_search_result(result, "Web Search"))
-
-            elif args.action == "deep":
-                print(f"Deep research: {args.query}")
-                result = await search_deep(args.query)
-                print(format_search_result(result, "Deep Research"))
-
-            elif args.action == "package":
-                if args.grep:
-                    print(f"Package grep: {args.package} / {args.grep}")
-                    result = await search_package_grep(
-                        args.package, args.grep, args.registry, args.limit
-                    )
-                else:
-                    print(f"Package search: {args.package} / {args.query}")
-                    result = await search_package_hybrid(
-                        args.package, args.query or "", args.registry, args.limit
-                    )
-                print(format_search_result(result, "Package Search"))
-
-            elif args.action == "query":
-                messages = [{"role": "user", "content": args.query}]
-                result = await search_query(messages, args.repos, args.sources)
-                print(format_search_result(result, "Query"))
-
-        # Repository commands
-        elif args.command == "repos":
-            if args.action == "list":
-                result = await repos_list(args.filter, args.status, args.limit)
-                print(format_list_result(result, "Repositories"))
-
-            elif args.action == "index":
-                print(f"Indexing repository: {args.repo}")
-                result = await repos_index(args.repo, args.token)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "status":
-                result = await repos_status(args.repo_id)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "tree":
-                result = await repos_tree(args.repo_id)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "content":
-                result = await repos_content(args.repo_id, args.path)
-                print(result.get("content", json.dumps(result, indent=2)))
-
-            elif args.action == "grep":
-                result = await repos_grep(args.repo_id, args.pattern, args.context)
-                print(format_search_result(result, "Repository Grep"))
-
-            elif args.action == "delete":
-                result = await repos_delete(args.repo_id)
-                print(json.dumps(result, indent=2))
-
-        # Data sources commands
-        elif args.command == "sources":
-            if args.action == "list":
-                result = await sources_list(args.filter, args.status, limit=args.limit)
-                print(format_list_result(result, "Data Sources"))
-
-            elif args.action == "index":
-                print(f"Indexing: {args.url}")
-                result = await sources_index(args.url, args.name)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "get":
-                result = await sources_get(args.source_id)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "tree":
-                result = await sources_tree(args.source_id)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "content":
-                result = await sources_content(args.source_id, args.path)
-                print(result.get("content", json.dumps(result, indent=2)))
-
-            elif args.action == "grep":
-                result = await sources_grep(args.source_id, args.pattern)
-                print(format_search_result(result, "Source Grep"))
-
-            elif args.action == "delete":
-                result = await sources_delete(args.source_id)
-                print(json.dumps(result, indent=2))
-
-        # Papers commands
-        elif args.command == "papers":
-            if args.action == "list":
-                result = await papers_list(args.limit, status=args.status)
-                print(format_list_result(result, "Research Papers"))
-
-            elif args.action == "index":
-                print(f"Indexing arXiv paper: {args.arxiv_id}")
-                result = await papers_index(args.arxiv_id)
-                print(json.dumps(result, indent=2, default=str))
-
-        # Context commands
-        elif args.command == "context":
-            if args.action == "list":
-                result = await context_list(args.limit, tags=args.tags)
-                print(format_list_result(result, "Contexts"))
-
-            elif args.action == "save":
-                result = await context_save(args.title, args.content, args.summary, args.tags)
-                print(json.dumps(result, indent=2, default=str))
-
-            elif args.action == "search":
-                if args.semantic:
-                    result = await context_search_semantic(args.query)
-                else:
-                    result = await context_search_text(args.query)
-                print(format_search_result(result, "Context Search"))
+                    code = await self.run(args, api_key, api_url)
+            writer.write((json.dumps({"exit": code}) + "\n").encode())
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            DAEMON_STREAMS.set(None)
+            self.active -= 1
+            self.last_request = time.monotonic()
+            try:
+                await writer.drain()
+                writer.close()
+            except ConnectionError:
+                pass
+
+    async def run(self, args: argparse.Namespace, api_key: str, api_url: str) -> int:
+        try:
+            client = await self.client_for(args, api_key, api_url)
+            try:
+                await dispatch(client, args, self.parser)
+            finally:
+                # Counters otherwise reach disk only at exit; `cache stats` reads them from there
+                if client.cache is not None:
+                    client.cache.flush()
+            return 0
+        except SystemExit as e:
+            return e.code or 0
+        except Exception as e:
+            print(f"Error: {e}")
+            import traceback
+
+            traceback.print_exc()
+            return 1
+
+    def stop(self) -> bool:
+        """Ask a running daemon on this socket to exit once idle; False if none is running."""
+        import socket
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(str(self.socket_path))
+            except (FileNotFoundError, ConnectionRefusedError):
+                return False
+            sock.sendall(b'{"stop": true}\n')
+            sock.recv(64)
+        return True
+
+    async def serve(self) -> None:
+        """Serve until idle; returns immediately if another daemon holds the socket."""
+        import fcntl
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        lock = open(self.socket_path.with_suffix(".lock"), "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print(f"nia daemon already running on {self.socket_path}", file=sys.stderr)
+            lock.close()
+            return
+
+        self.socket_path.unlink(missing_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle, path=str(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        sys.stdout, sys.stderr = RoutedStream(sys.stdout, 0), RoutedStream(sys.stderr, 1)
+        print(f"nia daemon listening on {self.socket_path}", file=sys.stderr, flush=True)
+        try:
+            async with server:
+                while self.active or not (
+                    self.stopping or time.monotonic() - self.last_request > self.idle_timeout
+                ):
+                    await asyncio.sleep(0.2)
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+            for client in self.clients.values():
+                await client.close()
+            sys.stdout, sys.stderr = sys.stdout.default, sys.stderr.default
+            lock.close()
 
-            elif args.action == "get":
-                result = await context_get(args.context_id)
-                print(json.dumps(result, indent=2, default=str))
 
-            elif args.action == "delete":
-                result = await context_delete(args.context_id)
-                print(json.dumps(result, indent=2))
+async def main():
+    parser = build_parser()
 
-        else:
-            parser.print_help()
+    # Handle args that might come from runtime harness
+    args_to_parse = [arg for arg in sys.argv[1:] if not arg.endswith(".py")]
+    if not args_to_parse:
+        parser.print_help()
+        return
 
+    args = parser.parse_args(args_to_parse)
+
+    if not NIA_API_KEY and not args.replay and needs_api_key(args):
+        print("Error: NIA_API_KEY not found. Set in environment or ~/.claude/.env")
+        return
+
+    if args.format == "raw" and not supports_raw(args):
+        parser.error("--format raw needs a command that prints a single API response")
+    OUTPUT_FORMAT.set(args.format)
+    if args.format == "raw":
+        RAW_OUTPUT.set(sys.stdout.buffer)
+
+    if args.command == "serve":
+        daemon = Daemon(args.socket, args.idle_timeout)
+        if not args.stop:
+            await daemon.serve()
+        elif not daemon.stop():
+            print(f"No nia daemon running on {daemon.socket_path}")
+        return
+
+    tracer = Tracer(args.trace) if args.trace else None
+    ACTIVE_TRACER.set(tracer)
+    try:
+        async with build_client(args) as client:
+            await dispatch(client, args, parser)
     except ImportError:
         print("Error: aiohttp not installed. Run: pip install aiohttp")
+    except BrokenPipeError:
+        # The reader went away (e.g. output piped into head); discard the rest quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
     except Exception as e:
         print(f"Error: {e}")
         import traceback
 
         traceback.print_exc()
+    finally:
+        if tracer is not None:
+            tracer.close()
+            print(tracer.summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Nia v2 API, for offline development and benchmarks.
+
+Serves the routes nia_docs.py calls with synthetic data. Latency, error rate
+and payload sizes are configurable so client-side changes can be measured
+without touching the paid API.
+
+Usage:
+  python scripts/nia_standin.py --port 8900 --latency 20 --jitter 10
+  NIA_API_URL=http://127.0.0.1:8900 NIA_API_KEY=x python scripts/nia_docs.py repos list
+
+  # Large trees, 1% throttling, 64 KiB pages
+  python scripts/nia_standin.py --tree-files 50000 --error-rate 0.01 --content-bytes 65536
+
+Requires: aiohttp
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+# Collection route -> (list key, id prefix) for the paginated list endpoints
+COLLECTIONS = {
+    "repositories": ("repositories", "repo"),
+    "data-sources": ("data_sources", "src"),
+    "research-papers": ("papers", "paper"),
+    "contexts": ("contexts", "ctx"),
+    "oracle/sessions": ("sessions", "sess"),
+    "oracle/jobs": ("jobs", "job"),
+}
+
+# Trailing route segments naming an action on an item; the segments between the
+# collection and the action are the item id (repository ids look like owner/repo)
+ACTIONS = ("tree", "content", "read", "ls", "grep", "messages", "rename")
+
+
+class StandIn:
+    """Synthetic responses for the v2 routes, shaped like the real API."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        items: int = 50,
+        tree_files: int = 1000,
+        content_bytes: int = 4096,
+        results: int = 10,
+        events: int = 20,
+        event_interval: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.items = items
+        self.tree_files = tree_files
+        self.content_bytes = content_bytes
+        self.results = results
+        self.events = events
+        self.event_interval = event_interval
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._tree = None
+
+    # -------------------------------------------------------------------------
+    # Payloads
+    # -------------------------------------------------------------------------
+
+    def item(self, collection: str, i: int) -> dict:
+        prefix = COLLECTIONS[collection][1]
+        if collection == "contexts":
+            return {
+                "id": f"{prefix}-{i}",
+                "title": f"Session {i} summary",
+                "summary": f"Agent session {i} on topic-{i % 7}",
+                "tags": ["agent", f"topic-{i % 7}"],
+                "created_at": "2025-01-01T00:00:00Z",
+                "updated_at": "2025-01-02T00:00:00Z",
+            }
+        return {
+            "id": f"{prefix}-{i}",
+            "repository": f"owner/project-{i}",
+            "url": f"https://docs.example.com/project-{i}",
+            "display_name": f"Project {i}",
+            "title": f"Item {i}",
+            "status": "completed" if collection.startswith("oracle") else "indexed",
+            "created_at": "2025-01-01T00:00:00Z",
+        }
+
+    def tree(self) -> dict:
+        """A nested tree of ``tree_files`` files, 50 per directory, built once."""
+        if self._tree is None:
+            dirs = []
+            for d in range(0, self.tree_files, 50):
+                files = [
+                    {"name": f"file_{f}.md", "type": "file", "sha": f"{d}-{f}", "size": 1024}
+                    for f in range(d, min(d + 50, self.tree_files))
+                ]
+                dirs.append({"name": f"dir_{d // 50}", "type": "dir", "children": files})
+            self._tree = {"tree": [{"name": "docs", "type": "dir", "children": dirs}]}
+        return self._tree
+
+    def text(self, seed: str) -> str:
+        line = f"Content of {seed}: lorem ipsum dolor sit amet, consectetur adipiscing.\n"
+        return (line * (self.content_bytes // len(line) + 1))[: self.content_bytes]
+
+    def search_results(self, query: str) -> list:
+        return [
+            {
+                "title": f"Result {i} for {query}",
+                "url": f"https://docs.example.com/{i}",
+                "snippet": self.text(f"result {i}")[:300],
+                "score": round(1 - i / (self.results + 1), 3),
+            }
+            for i in range(self.results)
+        ]
+
+    # -------------------------------------------------------------------------
+    # Handlers
+    # -------------------------------------------------------------------------
+
+    async def delay(self) -> None:
+        wait = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def json(data, status: int = 200):
+        from aiohttp import web
+
+        return web.json_response(data, status=status)
+
+    async def handle(self, request):
+        """Route one request; every route shares the latency and error settings."""
+        from aiohttp import web
+
+        self.requests += 1
+        await self.delay()
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.json_response(
+                {"detail": "stand-in throttled"}, status=429, headers={"Retry-After": "0.1"}
+            )
+
+        path = request.path.rstrip("/")
+        parts = path.split("/")[2:]  # drop "", "v2"
+        body = await request.json() if request.can_read_body else {}
+        method = request.method
+
+        if path.endswith("/events") or path == "/v2/oracle/stream" or path.endswith("/chat"):
+            return await self.stream(request)
+
+        collection = next((c for c in COLLECTIONS if path == f"/v2/{c}"), None)
+        if collection and method == "GET":
+            return self.page(collection, request.query)
+        if collection and method == "POST":
+            return self.json({**self.item(collection, self.random.randrange(10**6)), **body})
+
+        if parts[:1] == ["oracle"] and method == "POST":
+            return self.json(
+                {"final_report": self.text(body.get("query", "oracle")), "citations": []}
+            )
+        if parts[:1] == ["search"] or parts[:1] == ["package-search"]:
+            query = body.get("query") or body.get("messages", [{}])[-1].get("content", "")
+            return self.json({"results": self.search_results(query or "query"), "sources": []})
+        if path.startswith("/v2/contexts/") and method == "GET" and len(parts) == 2:
+            if parts[1] in ("search", "semantic-search"):
+                return self.json({"contexts": [self.item("contexts", i) for i in range(5)]})
+            i = int(parts[1].rsplit("-", 1)[-1]) if parts[1][-1:].isdigit() else 0
+            return self.json({**self.item("contexts", i), "content": self.text(parts[1])})
+
+        oracle = parts[:1] == ["oracle"]
+        if oracle:
+            parts = parts[1:]
+        if len(parts) >= 2:
+            name = parts[-1] if len(parts) > 2 and parts[-1] in ACTIONS else None
+            item_id = "/".join(parts[1:-1] if name else parts[1:])
+            if name == "tree":
+                return self.json(self.tree())
+            if name == "content":
+                return self.json({"content": self.text(body.get("path", item_id))})
+            if name == "read":
+                return self.json({"content": self.text(request.query.get("path", item_id))})
+            if name == "ls":
+                return self.json({"entries": self.tree()["tree"][0]["children"][:20]})
+            if name == "messages":
+                messages = [{"role": "assistant", "content": self.text(item_id)}]
+                return self.json({"messages": messages})
+            if name == "grep":
+                matches = [
+                    {"path": f"docs/file_{i}.md", "line": i + 1, "content": body.get("pattern")}
+                    for i in range(self.results)
+                ]
+                return self.json({"matches": matches})
+            if name == "rename" or method in ("PUT", "PATCH"):
+                return self.json({"success": True, **body})
+            if method == "DELETE":
+                return self.json({"success": True})
+            if method == "GET":
+                return self.json(
+                    {
+                        "id": item_id,
+                        "status": "completed" if oracle else "indexed",
+                        "progress": 100,
+                        "final_report": self.text(item_id),
+                    }
+                )
+        return self.json({"detail": f"Not found: {method} {path}"}, status=404)
+
+    def page(self, collection: str, query):
+        key = COLLECTIONS[collection][0]
+        limit = int(query.get("limit", 50))
+        offset = int(query.get("offset", 0))
+        end = min(offset + limit, self.items)
+        items = [self.item(collection, i) for i in range(offset, end)]
+        return self.json({key: items, "total": self.items, "has_more": end < self.items})
+
+    async def stream(self, request):
+        """Server-sent events ending with a ``done`` event; honors Last-Event-ID."""
+        from aiohttp import web
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        start = int(request.headers.get("Last-Event-ID", -1)) + 1
+        for i in range(start, self.events):
+            data = json.dumps({"type": "content", "index": i, "text": self.text(str(i))[:200]})
+            await resp.write(f"id: {i}\nevent: message\ndata: {data}\n\n".encode())
+            if self.event_interval:
+                await asyncio.sleep(self.event_interval)
+        await resp.write(f"id: {self.events}\nevent: done\ndata: {{}}\n\n".encode())
+        await resp.write_eof()
+        return resp
+
+
+def make_app(standin: StandIn):
+    from aiohttp import web
+
+    app = web.Application(client_max_size=64 * 1024**2)
+    app.router.add_route("*", "/v2/{tail:.*}", standin.handle)
+    return app
+
+
+async def serve(standin: StandIn, host: str, port: int) -> None:
+    from aiohttp import web
+
+    runner = web.AppRunner(make_app(standin), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    # The bound port (useful with --port 0) is the first line of output
+    bound = runner.addresses[0][1]
+    print(f"listening on http://{host}:{bound}", flush=True)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Nia v2 API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="Port (0 picks a free one)")
+    parser.add_argument("--latency", type=float, default=0, help="Added latency in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Latency jitter (+/- ms)")
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="Fraction of requests answered 429"
+    )
+    parser.add_argument("--items", type=int, default=50, help="Items per list endpoint")
+    parser.add_argument("--tree-files", type=int, default=1000, help="Files in every tree")
+    parser.add_argument("--content-bytes", type=int, default=4096, help="Size of file content")
+    parser.add_argument("--results", type=int, default=10, help="Search/grep results")
+    parser.add_argument("--events", type=int, default=20, help="Events per stream")
+    parser.add_argument(
+        "--event-interval", type=float, default=0, help="Delay between stream events in ms"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and errors")
+    args = parser.parse_args()
+
+    standin = StandIn(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        items=args.items,
+        tree_files=args.tree_files,
+        content_bytes=args.content_bytes,
+        results=args.results,
+        events=args.events,
+        event_interval=args.event_interval / 1000,
+        seed=args.seed,
+    )
+    started = time.monotonic()
+    try:
+        asyncio.run(serve(standin, args.host, args.port))
+    except KeyboardInterrupt:
+        elapsed = time.monotonic() - started
+        print(f"served {standin.requests} requests in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
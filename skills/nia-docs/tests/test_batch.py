@@ -0,0 +1,89 @@
+"""run_batch: record order, the concurrency limit and per-job error records."""
+
+import asyncio
+import io
+import json
+
+from nia_docs import run_batch
+
+
+class BatchClient:
+    """Stand-ins for a few BATCH_OPS methods, tracking how many run at once."""
+
+    def __init__(self):
+        self.active = self.peak = 0
+
+    async def search_web(self, query: str, category: str = None) -> dict:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(float(query))
+        self.active -= 1
+        return {"results": [query]}
+
+    async def repos_status(self, repository_id: str) -> dict:
+        return {"error": f"API error 404: {repository_id}"}
+
+    async def sources_get(self, source_id: str) -> dict:
+        raise ConnectionError("reset")
+
+
+def batch(lines, concurrency=8, client=None):
+    out = io.StringIO()
+    counts = asyncio.run(
+        run_batch(client or BatchClient(), io.StringIO("\n".join(lines) + "\n"), concurrency, out)
+    )
+    return counts, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def job(**fields):
+    return json.dumps(fields)
+
+
+def test_records_arrive_in_completion_order_with_line_ids():
+    counts, records = batch(
+        [
+            job(op="search_web", query="0.15"),
+            job(op="search_web", query="0.05"),
+            job(op="search_web", query="0.1", id="mine"),
+        ]
+    )
+    assert counts == {"ok": 3, "failed": 0}
+    assert [r["id"] for r in records] == [2, "mine", 1]
+    assert records[0] == {"id": 2, "op": "search_web", "ok": True, "result": {"results": ["0.05"]}}
+
+
+def test_concurrency_is_bounded():
+    client = BatchClient()
+    counts, records = batch([job(op="search_web", query="0.02")] * 12, 3, client)
+    assert counts["ok"] == 12 and len(records) == 12
+    assert client.peak == 3
+
+
+def test_each_failure_is_its_own_record():
+    counts, records = batch(
+        [
+            "{not json",
+            "",
+            job(op="no_such_op"),
+            job(op="search_web", nope=1),
+            job(op="repos_status", repository_id="o/r"),
+            job(op="sources_get", source_id="s1"),
+            "[1, 2]",
+            job(op="search_web", query="0"),
+        ]
+    )
+    assert counts == {"ok": 1, "failed": 6}
+    by_id = {r["id"]: r for r in records}
+    assert by_id[1]["error"].startswith("invalid JSON")
+    assert 2 not in by_id  # blank lines are skipped but still numbered
+    assert by_id[3]["error"] == "unknown op: no_such_op"
+    assert by_id[4]["error"].startswith("bad arguments")
+    assert by_id[5] == {
+        "id": 5,
+        "op": "repos_status",
+        "ok": False,
+        "error": "API error 404: o/r",
+    }
+    assert by_id[6]["error"] == "ConnectionError: reset"
+    assert by_id[7] == {"id": 7, "ok": False, "error": "job must be a JSON object"}
+    assert by_id[8]["ok"] is True
@@ -0,0 +1,152 @@
+"""ResponseCache expiry, LRU eviction, invalidation and hit/miss accounting."""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from nia_docs import NiaClient, ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    yield cache
+    cache.close()
+
+
+def test_round_trip_and_counters(cache):
+    key = cache.key("GET", "http://x/v2/repositories", {"limit": 1})
+    assert cache.get(key) is None
+    cache.put(key, "/v2/repositories", {"items": [1, "é"]}, 60)
+    assert cache.get(key) == {"items": [1, "é"]}
+    assert cache.contains(key)
+    assert (cache.hits, cache.misses) == (1, 1)  # contains() is not counted
+
+
+def test_key_depends_on_every_part():
+    base = ResponseCache.key("POST", "http://x/a", {"p": 1}, {"b": 2})
+    assert base == ResponseCache.key("POST", "http://x/a", {"p": 1}, {"b": 2})
+    assert base != ResponseCache.key("GET", "http://x/a", {"p": 1}, {"b": 2})
+    assert base != ResponseCache.key("POST", "http://x/b", {"p": 1}, {"b": 2})
+    assert base != ResponseCache.key("POST", "http://x/a", {"p": 2}, {"b": 2})
+    assert base != ResponseCache.key("POST", "http://x/a", {"p": 1}, {"b": 3})
+
+
+def test_entries_expire(cache, clock):
+    cache.put("k", "/v2/repositories", {"v": 1}, 30)
+    clock[0] += 29
+    assert cache.get("k") == {"v": 1}
+    clock[0] += 2
+    assert not cache.contains("k")
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0  # an expired row is dropped when read
+
+
+def test_lru_eviction_at_the_size_cap(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    # Random bodies of about the same compressed size; the cap fits three
+    cache.put("a", "/v2/a", {"v": os.urandom(600).hex()}, 60)
+    size = cache.stats()["bytes"]
+    cache.max_bytes = 3 * size + size // 2
+    for key in ("b", "c"):
+        clock[0] += 1
+        cache.put(key, f"/v2/{key}", {"v": os.urandom(600).hex()}, 60)
+    clock[0] += 1
+    assert cache.get("a") is not None  # a is now the most recently used
+    clock[0] += 1
+    cache.put("d", "/v2/d", {"v": os.urandom(600).hex()}, 60)
+    assert [cache.contains(key) for key in "abcd"] == [True, False, True, True]
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    cache.close()
+
+
+def test_invalidate_by_path_prefix(cache):
+    cache.put("list", "/v2/repositories", {}, 60)
+    cache.put("tree", "/v2/repositories/o%2Fr/tree", {}, 60)
+    cache.put("other", "/v2/data-sources", {}, 60)
+    cache.put("like", "/v2/repositories_x", {}, 60)
+    cache.invalidate("/v2/repositories/")
+    kept = [cache.contains(key) for key in ("list", "tree", "other", "like")]
+    assert kept == [True, False, True, True]
+    cache.invalidate("/v2/repositories")
+    assert not cache.contains("list")
+    assert cache.contains("other")
+
+
+def test_counters_persist_and_clear(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first = ResponseCache(path)
+    first.put("k", "/v2/x", {}, 60)
+    first.get("k")
+    first.get("missing")
+    first.close()
+    second = ResponseCache(path)
+    second.get("k")
+    stats = second.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    second.clear()
+    assert second.stats()["hits"] == 0 and second.stats()["entries"] == 0
+    second.close()
+
+
+class StubClient(NiaClient):
+    """A NiaClient whose network layer is a counter."""
+
+    def __init__(self, cache):
+        super().__init__(api_key="x", cache=cache)
+        self.sent = []
+
+    async def _send(self, method, path, route, params, payload, timeout, decode):
+        self.sent.append(f"{method} {path}")
+        return {"n": len(self.sent)}
+
+
+def test_client_caches_reads_and_mutations_invalidate(cache):
+    client = StubClient(cache)
+
+    async def run():
+        first = await client._request("GET", "/v2/repositories")
+        again = await client._request("GET", "/v2/repositories")
+        fresh = await client._request("GET", "/v2/repositories", fresh=True)
+        await client._request("POST", "/v2/repositories", payload={"repository": "o/r"})
+        after = await client._request("GET", "/v2/repositories")
+        return first, again, fresh, after
+
+    first, again, fresh, after = asyncio.run(run())
+    assert first == again == {"n": 1}
+    assert fresh == {"n": 2}
+    assert after == {"n": 4}
+    assert client.sent == [
+        "GET /v2/repositories",
+        "GET /v2/repositories",
+        "POST /v2/repositories",
+        "GET /v2/repositories",
+    ]
+
+
+def test_uncached_routes_and_errors_are_not_stored(cache):
+    client = StubClient(cache)
+
+    async def failing(*args):
+        client.sent.append("fail")
+        return {"error": "API error 500"}
+
+    async def run():
+        await client._request("POST", "/v2/search/web", payload={"query": "q"})
+        await client._request("POST", "/v2/search/web", payload={"query": "q"})
+        client._send = failing
+        await client._request("GET", "/v2/data-sources")
+        await client._request("GET", "/v2/data-sources")
+
+    asyncio.run(run())
+    assert client.sent == ["POST /v2/search/web", "POST /v2/search/web", "fail", "fail"]
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,39 @@
+"""chunk_text cut points and reassembly."""
+
+import random
+
+import pytest
+
+from nia_docs import chunk_text
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("abc", 10) == ["abc"]
+
+
+def test_prefers_paragraph_breaks():
+    text = "a" * 40 + "\n\n" + "b" * 40 + "\n\n" + "c" * 40
+    assert chunk_text(text, 90) == ["a" * 40 + "\n\n" + "b" * 40, "c" * 40]
+
+
+def test_long_paragraph_splits_on_lines():
+    text = "\n".join(["x" * 30] * 5)
+    assert chunk_text(text, 70) == ["x" * 30 + "\n" + "x" * 30] * 2 + ["x" * 30]
+
+
+def test_hard_split_keeps_order():
+    text = "intro\n\n" + "y" * 25 + "\n\nend"
+    assert chunk_text(text, 10) == ["intro", "y" * 10, "y" * 10, "y" * 5 + "\n\nend"]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_texts(seed):
+    rng = random.Random(seed)
+    text = "".join(
+        rng.choice(["w", "word ", "\n", "\n\n", "z" * rng.randint(1, 90)]) for _ in range(300)
+    )
+    limit = rng.randint(5, 120)
+    chunks = chunk_text(text, limit)
+    assert all(0 < len(chunk) <= limit for chunk in chunks)
+    # Cuts drop only the line breaks they fall on
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
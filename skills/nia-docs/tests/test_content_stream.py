@@ -0,0 +1,153 @@
+"""JSONStringField, LineWindow and NiaClient.stream_content."""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+
+import pytest
+
+import nia_docs
+from nia_docs import JSONStringField, LineWindow, parse_line_range
+
+ALPHABET = 'ab \n"\\/\t\r\x01é€😀{}[]:,'
+
+
+def decode(body: bytes, size: int, name: str = "content") -> tuple:
+    field = JSONStringField(name)
+    out = [field.feed(body[i : i + size]) for i in range(0, len(body), size)]
+    out.append(field.feed(b"", final=True))
+    return "".join(out), field
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_field_matches_json_loads(seed):
+    rng = random.Random(seed)
+    text = lambda n: "".join(rng.choice(ALPHABET) for _ in range(n))  # noqa: E731
+    content = text(rng.randrange(0, 400))
+    doc = {
+        "meta": {"content": text(5), "x": [1, "content", {"content": "no"}]},
+        'k"ey': text(4),
+        "content": content,
+        "after": text(3),
+    }
+    items = list(doc.items())
+    rng.shuffle(items)
+    body = json.dumps(dict(items), ensure_ascii=seed % 2 == 0).encode()
+    for size in (1, 2, 3, 11, 4096):
+        got, field = decode(body, size)
+        assert (got, field.found, field.done) == (content, True, True)
+
+
+def test_field_missing_or_not_top_level():
+    got, field = decode(b'{"data": {"content": "nested"}, "n": 1}', 3)
+    assert (got, field.found) == ("", False)
+
+
+def test_field_key_with_escapes():
+    got, _ = decode(json.dumps({"content": "x"}, ensure_ascii=True).encode(), 1)
+    assert got == "x"
+    got, _ = decode(b'{"con\\u0074ent": "y"}', 1)
+    assert got == "y"
+
+
+def test_field_surrogate_pair_split_across_chunks():
+    body = b'{"content": "a\\ud83d\\ude00b"}'
+    for size in range(1, len(body)):
+        assert decode(body, size)[0] == "a\U0001f600b"
+
+
+def window(text: str, first: int = 1, last: int = None, size: int = 3) -> tuple:
+    lines = LineWindow(first, last)
+    kept = []
+    for i in range(0, len(text), size):
+        kept.append(lines.feed(text[i : i + size]))
+        if lines.complete:
+            break
+    return "".join(kept), lines
+
+
+@pytest.mark.parametrize(
+    "first, last, expected",
+    [
+        (1, None, "l1\nl2\n\nl4\r\nl5"),
+        (1, 1, "l1\n"),
+        (2, 3, "l2\n\n"),
+        (3, 3, "\n"),
+        (4, 9, "l4\r\nl5"),
+        (5, 5, "l5"),
+        (6, None, ""),
+    ],
+)
+def test_line_window(first, last, expected):
+    text = "l1\nl2\n\nl4\r\nl5"
+    for size in (1, 2, 5, 100):
+        kept, lines = window(text, first, last, size)
+        assert kept == expected
+        assert lines.stats() == {"chars": len(expected), "lines": len(expected.splitlines())}
+
+
+def test_line_window_completes_early():
+    kept, lines = window("a\nb\nc\nd\n" * 1000, 2, 3)
+    assert (kept, lines.complete) == ("b\nc\n", True)
+    assert lines.feed("more\n") == ""
+
+
+@pytest.mark.parametrize(
+    "value, expected", [("5:10", (5, 10)), ("5:", (5, None)), (":3", (1, 3)), ("7", (7, 7))]
+)
+def test_parse_line_range(value, expected):
+    assert parse_line_range(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0:3", "5:2", "a:b", "-1", ""])
+def test_parse_line_range_rejects(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_line_range(value)
+
+
+def serve_gzip(content: str):
+    """An app answering every content POST with a gzip-encoded JSON body."""
+    from aiohttp import web
+
+    async def handle(request):
+        body = gzip.compress(json.dumps({"path": "f", "content": content}).encode())
+        return web.Response(
+            body=body, headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        )
+
+    app = web.Application()
+    app.router.add_post("/v2/{tail:.*}", handle)
+    return app
+
+
+@pytest.mark.parametrize("lines", [None, (3, 5)])
+def test_stream_content_decodes_gzip_bodies(tmp_path, lines):
+    from aiohttp import web
+
+    content = "".join(f"line {i} é\n" for i in range(20000))
+
+    async def run():
+        runner = web.AppRunner(serve_gzip(content))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with nia_docs.NiaClient(
+                api_key="x", base_url=f"http://127.0.0.1:{port}", limiter=nia_docs.RateLimiter(0)
+            ) as client:
+                out = tmp_path / "f.txt.gz"
+                stats = await nia_docs.download_content(
+                    client, "repos", "owner/repo", "f", str(out), lines
+                )
+        finally:
+            await runner.cleanup()
+        return stats, gzip.decompress(out.read_bytes()).decode()
+
+    stats, written = asyncio.run(run())
+    expected = content if lines is None else "line 2 é\nline 3 é\nline 4 é\n"
+    assert written == expected
+    assert stats["chars"] == len(expected)
+    assert not (tmp_path / "f.txt.gz.part").exists()
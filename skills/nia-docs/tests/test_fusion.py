@@ -0,0 +1,89 @@
+"""reciprocal_rank_fusion and the federated_search budget."""
+
+import asyncio
+import time
+
+import pytest
+
+import nia_docs
+from nia_docs import reciprocal_rank_fusion
+
+
+def test_rrf_merges_duplicates_and_orders_by_score():
+    ranked = {
+        "universal": [{"url": "https://a.dev/x/"}, {"url": "https://b.dev"}, {"url": "c"}],
+        "web": [{"url": "http://A.dev/x#intro", "snippet": "from web"}, {"url": "c"}],
+    }
+    fused = reciprocal_rank_fusion(ranked, k=60)
+    assert [hit["url"] for hit in fused] == ["https://a.dev/x/", "c", "https://b.dev"]
+    assert fused[0]["backends"] == ["universal", "web"]
+    assert fused[0]["snippet"] == "from web"
+    assert fused[0]["score"] == pytest.approx(2 / 61)
+    assert fused[1]["score"] == pytest.approx(1 / 63 + 1 / 62)
+
+
+def test_rrf_single_backend_keeps_order():
+    hits = [{"title": f"t{i}"} for i in range(5)]
+    assert [h["title"] for h in reciprocal_rank_fusion({"web": hits})] == [h["title"] for h in hits]
+
+
+class SlowClient:
+    async def search_universal(self, query, limit):
+        return {"results": [{"url": "u1"}, {"url": "shared"}]}
+
+    async def search_web(self, query):
+        await asyncio.sleep(5)
+        return {"results": [{"url": "late"}]}
+
+
+def test_budget_cancels_slow_backends(monkeypatch):
+    monkeypatch.setattr(
+        nia_docs, "search_local", lambda query, dirs, limit: {"results": [{"url": "shared"}]}
+    )
+
+    async def run():
+        gen = nia_docs.federated_search(SlowClient(), "q", ["universal", "web", "local"], 0.3)
+        return [record async for record in gen]
+
+    started = time.monotonic()
+    records = asyncio.run(run())
+    assert time.monotonic() - started < 2
+    by_backend = {r["backend"]: r for r in records if "backend" in r}
+    assert by_backend["web"]["error"] == "timeout"
+    assert "hits" in by_backend["universal"]
+    assert [hit["url"] for hit in records[-1]["fused"]][0] == "shared"
+
+
+def test_backend_errors_are_reported(monkeypatch):
+    def broken(query, dirs, limit):
+        raise OSError("no mirrors")
+
+    monkeypatch.setattr(nia_docs, "search_local", broken)
+
+    async def run():
+        gen = nia_docs.federated_search(SlowClient(), "q", ["local", "nope", "package"], 1)
+        return [record async for record in gen]
+
+    records = asyncio.run(run())
+    local = next(r for r in records if r.get("backend") == "local")
+    assert local == {"backend": "local", "error": "OSError: no mirrors", "ms": local["ms"]}
+    assert {"backend": "nope", "error": "unknown backend", "ms": 0} in records
+    assert records[-1] == {"fused": []}
+
+
+def test_slow_local_search_does_not_hold_back_remote_backends(monkeypatch):
+    def slow_local(query, dirs, limit):
+        time.sleep(1.5)
+        return {"results": [{"url": "local"}]}
+
+    monkeypatch.setattr(nia_docs, "search_local", slow_local)
+
+    async def run():
+        gen = nia_docs.federated_search(SlowClient(), "q", ["local", "universal"], 0.3)
+        return [record async for record in gen]
+
+    started = time.monotonic()
+    records = asyncio.run(run())
+    assert time.monotonic() - started < 1
+    assert records[0]["backend"] == "universal" and "hits" in records[0]
+    assert records[1] == {"backend": "local", "error": "timeout", "ms": 300}
@@ -0,0 +1,132 @@
+"""first_success races, the HedgePolicy budget and LatencyHistory persistence."""
+
+import asyncio
+import json
+
+import pytest
+
+from nia_docs import HedgePolicy, LatencyHistory, first_success
+
+
+class Attempts:
+    """Scripted attempts: each call runs the next ``(seconds, outcome)`` step."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        seconds, outcome = self.steps[self.started]
+        self.started += 1
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def race(attempts, delay=0.05, allow=lambda: True):
+    return asyncio.run(first_success(attempts, delay, allow))
+
+
+def test_fast_primary_is_not_hedged():
+    attempts = Attempts((0.01, (200, "primary")))
+    assert race(attempts) == (200, "primary")
+    assert attempts.started == 1
+
+
+def test_hedge_wins_and_the_loser_is_cancelled():
+    attempts = Attempts((1.0, (200, "primary")), (0.01, (200, "hedge")))
+    assert race(attempts) == (200, "hedge")
+    assert (attempts.started, attempts.cancelled) == (2, 1)
+
+
+def test_primary_can_still_win_after_hedging():
+    attempts = Attempts((0.1, (200, "primary")), (1.0, (200, "hedge")))
+    assert race(attempts) == (200, "primary")
+    assert attempts.cancelled == 1
+
+
+def test_failed_attempt_waits_for_the_other():
+    attempts = Attempts((0.2, (200, "primary")), (0.01, (503, "hedge")))
+    assert race(attempts) == (200, "primary")
+    attempts = Attempts((0.1, (500, "primary")), (0.2, (502, "hedge")))
+    assert race(attempts) == (502, "hedge")  # no success: the last to finish
+
+
+def test_early_failure_does_not_trigger_the_hedge():
+    attempts = Attempts((0.01, (503, "primary")))
+    assert race(attempts) == (503, "primary")
+    attempts = Attempts((0.01, ConnectionError("reset")))
+    with pytest.raises(ConnectionError):
+        race(attempts)
+    assert attempts.started == 1
+
+
+def test_no_hedge_when_the_budget_refuses():
+    attempts = Attempts((0.1, (200, "primary")))
+    assert race(attempts, allow=lambda: False) == (200, "primary")
+    assert attempts.started == 1
+
+
+def test_all_attempts_raising_propagates():
+    attempts = Attempts((0.1, TimeoutError()), (0.01, ConnectionError("reset")))
+    with pytest.raises(TimeoutError):
+        race(attempts)
+
+
+def history_with(tmp_path, samples):
+    history = LatencyHistory(tmp_path / "latency.json")
+    for seconds in samples:
+        history.record("GET /v2/x", seconds)
+    return history
+
+
+def test_delay_needs_enough_samples(tmp_path):
+    history = history_with(tmp_path, [0.1] * 19)
+    policy = HedgePolicy(history, min_samples=20)
+    assert policy.delay("GET /v2/x") is None
+    history.record("GET /v2/x", 0.1)
+    assert policy.delay("GET /v2/x") == pytest.approx(0.1)
+    assert policy.delay("GET /v2/other") is None
+
+
+def test_delay_is_the_p95_with_a_floor(tmp_path):
+    policy = HedgePolicy(history_with(tmp_path, [i / 100 for i in range(1, 21)]))
+    assert policy.delay("GET /v2/x") == pytest.approx(0.19)  # nearest rank, not the max
+    fast = HedgePolicy(history_with(tmp_path, [0.001] * 20), min_delay=0.05)
+    assert fast.delay("GET /v2/x") == 0.05
+
+
+def test_allow_bounds_hedges_to_a_share_of_requests(tmp_path):
+    policy = HedgePolicy(history_with(tmp_path, []), max_extra=0.1)
+    granted = 0
+    for _ in range(100):
+        policy.delay("GET /v2/x")
+        granted += policy.allow()
+    assert granted == 10 and policy.hedged == 10
+
+
+def test_history_keeps_a_window_and_merges_on_save(tmp_path):
+    path = tmp_path / "latency.json"
+    first = LatencyHistory(path, window=3)
+    for seconds in (1, 2, 3, 4):
+        first.record("GET /v2/x", seconds)
+    assert first.samples["GET /v2/x"] == [2, 3, 4]
+
+    other = LatencyHistory(path, window=3)
+    other.record("GET /v2/y", 0.5)
+    other.save()
+    first.save()
+    assert json.loads(path.read_text()) == {"GET /v2/x": [2, 3, 4], "GET /v2/y": [0.5]}
+    assert LatencyHistory(path).p95("GET /v2/x", min_samples=3) == 4
+
+
+def test_corrupt_history_starts_empty(tmp_path):
+    path = tmp_path / "latency.json"
+    path.write_text("{not json")
+    assert LatencyHistory(path).samples == {}
@@ -0,0 +1,112 @@
+"""ListResult/ListItem views: slots, mapping access and unchanged list output."""
+
+import json
+
+import pytest
+
+from nia_docs import ListItem, ListResult, dumps_json, format_list_item, format_list_result
+
+RESPONSES = [
+    {
+        "repositories": [
+            {"repository_id": "o/r", "display_name": "Repo", "status": "indexed"},
+            {"repository_id": "o/s", "status": "indexing"},
+            {"id": "r3"},
+        ],
+        "total": 40,
+    },
+    {"data_sources": [{"source_id": "s1", "title": "Docs", "status": "completed", "url": "u"}]},
+    {"papers": [{"paper_id": "p1", "title": "Paper"}, "plain string item"]},
+    {"contexts": [{"id": f"c{i}", "title": f"Context {i}"} for i in range(25)]},
+    {"sessions": [{"session_id": "x"}], "jobs": [{"job_id": "j"}]},
+    {"repositories": []},
+    {},
+]
+
+
+def baseline_format_list_result(result: dict, item_type: str) -> str:
+    """format_list_result as it was before the views, for comparison."""
+    if "error" in result:
+        return f"Error: {result['error']}"
+    output = [f"# {item_type}\n"]
+    items = (
+        result.get("repositories")
+        or result.get("data_sources")
+        or result.get("papers")
+        or result.get("contexts")
+        or result.get("sessions")
+        or result.get("jobs")
+        or []
+    )
+    if not items:
+        output.append("No items found.")
+    else:
+        for i, item in enumerate(items[:20], 1):
+            if isinstance(item, dict):
+                name = item.get(
+                    "display_name",
+                    item.get("title", item.get("repository_id", item.get("id", f"Item {i}"))),
+                )
+                status = item.get("status", "")
+                output.append(f"{i}. {name} {f'({status})' if status else ''}")
+            else:
+                output.append(f"{i}. {item}")
+    total = result.get("total", len(items))
+    output.append(f"\n---\nTotal: {total}")
+    return "\n".join(output)
+
+
+@pytest.mark.parametrize("response", RESPONSES + [{"error": "API error 500"}])
+def test_pretty_output_is_unchanged(response):
+    assert format_list_result(response, "Items") == baseline_format_list_result(response, "Items")
+
+
+@pytest.mark.parametrize("response", RESPONSES)
+def test_views_leave_the_response_as_json_serializes_it(response):
+    before = dumps_json(response)
+    listing = ListResult(response)
+    list(listing)
+    assert listing.raw is response
+    assert dumps_json(listing.raw) == before
+    assert json.loads(before) == response
+
+
+def test_list_result_sequence_protocol():
+    listing = ListResult(RESPONSES[0])
+    assert listing.kind == "repositories"
+    assert len(listing) == 3 and listing.total == 40
+    assert [item.id for item in listing] == ["o/r", "o/s", "r3"]
+    assert listing[1].raw is RESPONSES[0]["repositories"][1]
+    assert listing.error is None
+
+    empty = ListResult({"repositories": []})
+    assert len(empty) == 0 and empty.total == 0 and list(empty) == []
+    with pytest.raises(IndexError):
+        empty[0]
+    assert ListResult({"error": "nope"}).error == "nope"
+
+
+def test_list_item_reads_through_to_the_raw_dict():
+    raw = {"source_id": "s1", "id": "other", "title": "Docs", "status": "completed", "url": "u"}
+    item = ListItem(raw, "data_sources")
+    assert item.id == "s1" and item.name == "Docs" and item.status == "completed"
+    assert item["url"] == "u" and item.get("tags", []) == [] and "url" in item
+    assert "missing" not in item
+    with pytest.raises(KeyError):
+        item["missing"]
+    assert ListItem({"id": "x"}).id == "x"
+    assert ListItem({"nested": {"job_id": "j1"}}, "jobs").id == "j1"
+    assert ListItem({}, "jobs").status == ""
+
+
+def test_views_are_slotted():
+    for view in (ListItem({}), ListResult({})):
+        assert not hasattr(view, "__dict__")
+        with pytest.raises(AttributeError):
+            view.extra = 1
+
+
+def test_format_list_item_accepts_views_and_dicts():
+    raw = {"display_name": "Repo", "status": "indexed"}
+    assert format_list_item(1, ListItem(raw)) == format_list_item(1, raw) == "1. Repo (indexed)"
+    assert format_list_item(2, "text") == "2. text"
@@ -0,0 +1,77 @@
+"""LocalIndex: BM25 ranking and what update() notices without a forced re-check."""
+
+import os
+
+import pytest
+
+from nia_docs import LocalIndex, write_atomic
+
+UNCHANGED = {"added": 0, "changed": 0, "removed": 0}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "guide").mkdir()
+    (tmp_path / "guide" / "retry.md").write_text("retry with exponential backoff and jitter\n")
+    (tmp_path / "guide" / "auth.md").write_text("authentication tokens and sessions\n")
+    (tmp_path / "notes.txt").write_text("backoff notes\n")
+    return tmp_path
+
+
+def paths(index, query):
+    return [hit["path"] for hit in index.search(query)]
+
+
+def test_search_ranks_by_bm25(tree):
+    index = LocalIndex(tree)
+    assert index.update() == {"added": 3, "changed": 0, "removed": 0}
+    assert paths(index, "exponential backoff") == ["guide/retry.md", "notes.txt"]
+    assert paths(index, "sessions") == ["guide/auth.md"]
+    assert paths(index, "missing") == []
+    index.close()
+
+
+def test_unchanged_tree_is_not_rescanned(tree, monkeypatch):
+    index = LocalIndex(tree)
+    index.update()
+    index.update()  # the first index write touched the root; this settles the stamp
+
+    def walked(self):
+        raise AssertionError("files were walked")
+
+    monkeypatch.setattr(LocalIndex, "_files", walked)
+    assert index.update() == UNCHANGED
+
+
+def test_added_replaced_and_removed_files_are_noticed(tree):
+    index = LocalIndex(tree)
+    index.update()
+    index.update()
+
+    (tree / "guide" / "new.md").write_text("circuit breaker\n")
+    assert index.update() == {"added": 1, "changed": 0, "removed": 0}
+
+    write_atomic(tree / "guide" / "auth.md", "oauth device flow\n")
+    assert index.update() == {"added": 0, "changed": 1, "removed": 0}
+    assert paths(index, "oauth") == ["guide/auth.md"]
+
+    (tree / "notes.txt").unlink()
+    assert index.update() == {"added": 0, "changed": 0, "removed": 1}
+    assert paths(index, "backoff") == ["guide/retry.md"]
+    index.close()
+
+
+def test_in_place_edit_needs_force(tree):
+    index = LocalIndex(tree)
+    index.update()
+    index.update()
+
+    target = tree / "guide" / "retry.md"
+    stat = (tree / "guide").stat()
+    target.write_text("token bucket rate limiting, longer than before\n")
+    os.utime(tree / "guide", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert index.update() == UNCHANGED
+    assert index.update(force=True) == {"added": 0, "changed": 1, "removed": 0}
+    assert paths(index, "bucket") == ["guide/retry.md"]
+    index.close()
@@ -0,0 +1,64 @@
+"""mirror_tree against the stand-in server: cache bypass, manifest checks, removals."""
+
+import asyncio
+import json
+
+import pytest
+
+import nia_docs
+from nia_docs import MIRROR_MANIFEST, NiaClient, RateLimiter, ResponseCache, mirror_tree
+from nia_standin import StandIn, make_app
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(nia_docs, "mirror_registry_path", lambda: tmp_path / "mirrors.json")
+
+
+def mirror(tmp_path, dest, kind="sources", item_id="s1", files=60):
+    from aiohttp import web
+
+    async def run():
+        runner = web.AppRunner(make_app(StandIn(tree_files=files, content_bytes=256)))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        cache = ResponseCache(tmp_path / "cache.sqlite")
+        try:
+            async with NiaClient(
+                api_key="x",
+                base_url=f"http://127.0.0.1:{port}",
+                cache=cache,
+                limiter=RateLimiter(0),
+            ) as client:
+                stats = await mirror_tree(client, kind, item_id, dest)
+        finally:
+            await runner.cleanup()
+        return stats, ResponseCache(tmp_path / "cache.sqlite").stats()
+
+    return asyncio.run(run())
+
+
+def test_mirror_bypasses_the_response_cache(tmp_path, registry):
+    stats, cache = mirror(tmp_path, tmp_path / "m")
+    assert stats["fetched"] == 60 and not stats["failed"]
+    assert cache["entries"] <= 1  # the tree listing at most, never the 60 file bodies
+    assert len(list((tmp_path / "m").rglob("*.md"))) == 60
+
+
+def test_removed_counts_only_real_unlinks(tmp_path, registry):
+    dest = tmp_path / "m"
+    mirror(tmp_path, dest, files=60)
+    (dest / "docs" / "dir_1" / "file_55.md").unlink()
+    stats, _ = mirror(tmp_path, dest, files=50)
+    assert stats["removed"] == 9  # ten files left the tree; one was already deleted locally
+    assert len(list(dest.rglob("*.md"))) == 50
+
+
+def test_manifest_without_id_is_reported(tmp_path, registry):
+    dest = tmp_path / "m"
+    dest.mkdir()
+    (dest / MIRROR_MANIFEST).write_text(json.dumps({"kind": "repos"}))
+    with pytest.raises(ValueError, match="mirrors repos None"):
+        mirror(tmp_path, dest)
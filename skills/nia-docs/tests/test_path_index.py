@@ -0,0 +1,81 @@
+"""PathIndex prefix/glob queries and ls against brute force over the same paths."""
+
+import fnmatch
+import random
+
+import pytest
+
+import nia_docs
+
+
+@pytest.fixture(scope="module")
+def paths():
+    rng = random.Random(7)
+    names = ["src", "docs", "api", "a", "a-b", "a.b", "a0", "z", "日本", "x y"]
+    out = set()
+    for _ in range(3000):
+        depth = rng.randint(1, 5)
+        parts = [rng.choice(names) + (str(rng.randint(0, 3)) if rng.random() < 0.3 else "")]
+        parts += [rng.choice(names) for _ in range(depth - 1)]
+        out.add("/".join(parts) + rng.choice(["", ".md", ".py", ".txt"]))
+    # A file and a directory that share a name prefix, and a very long shared prefix
+    out |= {"a/b", "a/b.md", "a/b/c", "ab", "a0/x", "p" * 300 + "/1", "p" * 300 + "/2"}
+    # Nothing may be both a file and a directory
+    dirs = {path.rsplit("/", 1)[0] for path in out if "/" in path}
+    dirs |= {d.rsplit("/", i)[0] for d in list(dirs) for i in range(1, d.count("/") + 1)}
+    return sorted(out - dirs)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory, paths):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(nia_docs, "PATH_INDEX_DIR", tmp_path_factory.mktemp("paths"))
+        shuffled = paths + paths[:50]
+        random.Random(1).shuffle(shuffled)
+        built = nia_docs.PathIndex.build("repos", "owner/repo", shuffled, "rev-1")
+        yield built
+        built.close()
+
+
+def brute_ls(paths, directory):
+    base = f"{directory.strip('/')}/" if directory.strip("/") else ""
+    entries = {}
+    for path in paths:
+        if path.startswith(base):
+            name, sep, _ = path[len(base) :].partition("/")
+            entries[name] = {
+                "name": name,
+                "path": base + name if sep else path,
+                "type": "dir" if sep else "file",
+            }
+    return [entries[name] for name in sorted(entries)]
+
+
+def test_all_paths_round_trip(index, paths):
+    assert list(index.files()) == paths
+
+
+@pytest.mark.parametrize("prefix", ["", "a", "a/", "src", "docs/api", "日本", "p" * 300, "nope"])
+@pytest.mark.parametrize("glob", [None, "*.md", "a*/*.py", "src/*", "*[0-9]*", "*/x y*"])
+def test_files_match_tree_filter(index, paths, prefix, glob):
+    keep = nia_docs.tree_filter(prefix, glob)
+    expected = [p for p in paths if keep is None or keep(p)]
+    assert list(index.files(prefix or None, glob)) == expected
+    if glob:
+        assert all(fnmatch.fnmatchcase(p, glob) for p in expected)
+
+
+@pytest.mark.parametrize(
+    "directory", ["", "/", "a", "a/", "src", "docs/api", "a/b", "p" * 300, "zz"]
+)
+def test_ls_matches_brute_force(index, paths, directory):
+    assert index.ls(directory) == brute_ls(paths, directory)
+
+
+def test_reopen_keeps_header(index, paths, monkeypatch):
+    monkeypatch.setattr(nia_docs, "PATH_INDEX_DIR", index.path.parent)
+    reopened = nia_docs.PathIndex.open("repos", "owner/repo")
+    assert reopened is not None
+    assert list(reopened.files("docs")) == [p for p in paths if p.startswith("docs/")]
+    reopened.close()
+    assert nia_docs.PathIndex.open("repos", "other/repo") is None
@@ -0,0 +1,28 @@
+"""percentile: nearest rank, the smallest value with at least q% of samples at or below it."""
+
+import pytest
+
+from nia_docs import percentile
+
+
+@pytest.mark.parametrize(
+    "values, q, expected",
+    [
+        (range(1, 21), 95, 19),
+        (range(1, 101), 95, 95),
+        (range(1, 101), 50, 50),
+        (range(1, 101), 99, 99),
+        ([1, 2], 50, 1),
+        ([1, 2, 3], 50, 2),
+        ([3, 1, 2], 100, 3),
+        ([5, 7], 0, 5),
+        ([42], 95, 42),
+        (range(1, 11), 91, 10),
+    ],
+)
+def test_nearest_rank(values, q, expected):
+    assert percentile(list(values), q) == expected
+
+
+def test_empty_is_none():
+    assert percentile([], 50) is None
@@ -0,0 +1,101 @@
+"""prefetch_pages (cache entries warmed, byte budget) and the record_access log."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import nia_docs
+from nia_docs import ResponseCache, prefetch_pages
+
+URL = "http://nia.test"
+
+
+class PageClient:
+    """Serves pages of fixed sizes and tracks how many fetches overlap."""
+
+    def __init__(self, cache, sizes):
+        self.cache = cache
+        self.sizes = sizes
+        self.fetched = []
+        self.active = self.peak = 0
+
+    def _url(self, path):
+        return URL + path
+
+    async def _page(self, path):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.fetched.append(path)
+        return {"content": "x" * self.sizes[path]}
+
+    async def sources_read(self, source_id, path):
+        return await self._page(path)
+
+    async def sources_content(self, source_id, path):
+        return await self._page(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / "cache.sqlite")
+
+
+def test_read_op_checks_read_cache_entries(cache):
+    read_key = cache.key("GET", f"{URL}/v2/data-sources/s1/read", {"path": "a.md"}, None)
+    cache.put(read_key, "/v2/data-sources/{id}/read", {"content": "cached"}, 3600)
+    client = PageClient(cache, {"a.md": 10, "b.md": 10})
+
+    stats = asyncio.run(prefetch_pages(client, "sources", "s1", ["a.md", "b.md"], op="read"))
+    assert stats == {"fetched": 1, "cached": 1, "failed": 0, "bytes": 10}
+    assert client.fetched == ["b.md"]
+
+    # The same read is not in the content op's cache entries
+    client = PageClient(cache, {"a.md": 10, "b.md": 10})
+    stats = asyncio.run(prefetch_pages(client, "sources", "s1", ["a.md", "b.md"]))
+    assert stats["cached"] == 0
+
+
+def test_repos_have_no_read_op(cache):
+    with pytest.raises(ValueError):
+        asyncio.run(prefetch_pages(PageClient(cache, {}), "repos", "o/r", ["a"], op="read"))
+
+
+def test_budget_holds_with_concurrent_fetches(cache):
+    paths = [f"p{i}.md" for i in range(12)]
+    client = PageClient(cache, dict.fromkeys(paths, 100))
+    stats = asyncio.run(prefetch_pages(client, "sources", "s1", paths, budget=450, concurrency=4))
+    assert stats["bytes"] <= 450
+    assert stats["fetched"] >= 3
+    assert client.peak > 1  # pages after the first still overlap
+
+
+def test_zero_budget_fetches_nothing(cache):
+    client = PageClient(cache, {"a.md": 1})
+    stats = asyncio.run(prefetch_pages(client, "sources", "s1", ["a.md"], budget=0))
+    assert stats["fetched"] == 0 and client.fetched == []
+
+
+def test_record_access_keeps_concurrent_counts(tmp_path):
+    script = (
+        "import asyncio, nia_docs\n"
+        "async def main():\n"
+        "    for _ in range(10):\n"
+        "        await nia_docs.record_access('sources', 's1', 'a.md')\n"
+        "asyncio.run(main())\n"
+    )
+    env = {**os.environ, "NIA_CACHE_DIR": str(tmp_path), "NIA_API_KEY": "x"}
+    scripts = Path(nia_docs.__file__).parent
+    procs = [
+        subprocess.Popen([sys.executable, "-c", script], cwd=scripts, env=env) for _ in range(4)
+    ]
+    assert all(proc.wait(timeout=60) == 0 for proc in procs)
+    log = json.loads((tmp_path / "access.json").read_text())
+    assert log["sources:s1"]["a.md"] == 40
+    assert not (tmp_path / "access.lock").exists()
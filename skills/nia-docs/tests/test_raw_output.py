@@ -0,0 +1,57 @@
+"""--format raw: a body cut off after reaching the sink is not retried into it again."""
+
+import asyncio
+import io
+
+import pytest
+
+import nia_docs
+
+
+def serve_stalling(hits: list, prefix: bytes):
+    """An app that sends ``prefix`` of a longer body, then stalls."""
+    from aiohttp import web
+
+    async def handle(request):
+        hits.append(request.path)
+        resp = web.StreamResponse(headers={"Content-Type": "application/json"})
+        resp.content_length = len(prefix) * 4
+        await resp.prepare(request)
+        await resp.write(prefix)
+        await asyncio.sleep(1)
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/v2/{tail:.*}", handle)
+    return app
+
+
+def test_partial_raw_body_is_not_retried():
+    from aiohttp import web
+
+    hits, sink = [], io.BytesIO()
+    prefix = b'{"content": "partial'
+
+    async def run():
+        runner = web.AppRunner(serve_stalling(hits, prefix))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        token = nia_docs.RAW_OUTPUT.set(sink)
+        try:
+            async with nia_docs.NiaClient(
+                api_key="x",
+                base_url=f"http://127.0.0.1:{port}",
+                limiter=nia_docs.RateLimiter(0),
+                retry=nia_docs.RetryPolicy(3),
+            ) as client:
+                await client._request("GET", "/v2/data-sources/s1/read", timeout=0.3)
+        finally:
+            nia_docs.RAW_OUTPUT.reset(token)
+            await runner.cleanup()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert len(hits) == 1
+    assert sink.getvalue() == prefix
@@ -0,0 +1,53 @@
+"""Research single-flight: shared calls, the fresh split and where the lock lives."""
+
+import asyncio
+
+import nia_docs
+from nia_docs import NiaClient, ResponseCache
+
+
+class CountingClient(NiaClient):
+    """A NiaClient whose requests are answered locally, slowly, and counted."""
+
+    def __init__(self, cache):
+        super().__init__(api_key="x", cache=cache)
+        self.calls = 0
+
+    async def _request(self, method, path, params=None, payload=None, timeout=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return {"answer": payload["query"], "n": self.calls}
+
+
+def test_concurrent_identical_calls_share_one_request(tmp_path):
+    client = CountingClient(ResponseCache(tmp_path / "cache.sqlite"))
+
+    async def run():
+        return await asyncio.gather(
+            client.oracle_research("How does auth work?"),
+            client.oracle_research("how does AUTH work"),
+            client.oracle_research("How does auth work?", fresh=True),
+        )
+
+    first, second, fresh = asyncio.run(run())
+    assert first == second
+    assert client.calls == 2  # the fresh call never shares a cached lookup
+    assert asyncio.run(client.oracle_research("how does auth work?")) == fresh
+    assert client.calls == 2
+    client.cache.close()
+
+
+def test_lock_lives_next_to_the_cache(tmp_path, monkeypatch):
+    seen = []
+    real_lock = nia_docs.file_lock
+
+    def recording_lock(path, timeout):
+        seen.append(path.parent)
+        return real_lock(path, timeout)
+
+    monkeypatch.setattr(nia_docs, "file_lock", recording_lock)
+    client = CountingClient(ResponseCache(tmp_path / "custom" / "cache.sqlite"))
+    asyncio.run(client.oracle_research("q"))
+    assert seen == [tmp_path / "custom" / "locks"]
+    assert list((tmp_path / "custom" / "locks").iterdir()) == []
+    client.cache.close()
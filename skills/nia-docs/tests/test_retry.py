@@ -0,0 +1,85 @@
+"""RetryPolicy decisions and RateLimiter pacing."""
+
+import asyncio
+import time
+
+import pytest
+
+import nia_docs
+from nia_docs import RateLimiter, RetryPolicy
+
+
+@pytest.mark.parametrize(
+    "status, idempotent, expected",
+    [
+        (429, False, True),
+        (429, True, True),
+        (503, True, True),
+        (503, False, False),
+        (502, True, True),
+        (500, True, False),
+        (404, True, False),
+        (None, True, True),
+        (None, False, False),
+    ],
+)
+def test_should_retry(status, idempotent, expected):
+    assert RetryPolicy(3).should_retry(0, status, idempotent) is expected
+
+
+def test_attempts_are_bounded():
+    policy = RetryPolicy(3)
+    assert policy.should_retry(1, 429, True)
+    assert not policy.should_retry(2, 429, True)
+    assert not RetryPolicy(0).should_retry(0, 429, True)
+
+
+def test_delay_honors_retry_after_and_cap():
+    policy = RetryPolicy(base=0.5, cap=4)
+    assert policy.delay(0, retry_after=2.5) == 2.5
+    assert policy.delay(0, retry_after=60) == 4
+    for attempt in range(8):
+        assert 0 <= policy.delay(attempt) <= min(4, 0.5 * 2**attempt)
+
+
+@pytest.mark.parametrize(
+    "value, expected", [("3", 3.0), ("0.5", 0.5), (None, None), ("soon", None), ("-2", 0.0)]
+)
+def test_parse_retry_after(value, expected):
+    assert nia_docs.parse_retry_after(value) == expected
+
+
+def test_throttling_halves_and_success_recovers():
+    limiter = RateLimiter(8, min_rate=1)
+    limiter.throttled()
+    limiter.throttled()
+    assert limiter.rate == 2
+    for _ in range(3):
+        limiter.throttled()
+    assert limiter.rate == 1
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.rate == 8
+
+
+def test_acquire_paces_after_burst():
+    async def run():
+        limiter = RateLimiter(20, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    # Two tokens up front, then four more at 20/s
+    assert 0.15 <= asyncio.run(run()) < 0.6
+
+
+def test_retry_after_pauses_the_bucket():
+    async def run():
+        limiter = RateLimiter(0)
+        limiter.throttled(0.2)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.19
@@ -0,0 +1,58 @@
+"""SSEDecoder over byte-by-byte and chunked feeds."""
+
+import pytest
+
+import nia_docs
+from nia_docs import SSEEvent
+
+STREAM = (
+    ": keep-alive comment\n"
+    "retry: 2500\n"
+    "id: 1\n"
+    "event: message\n"
+    "data: first\n\n"
+    "data: multi\r\n"
+    "data:line\r\n"
+    "id: 2\r\n\r\n"
+    "event: done\r"
+    'data: {"ok": true}\r'
+    "\r"
+    "data: ünïcödé ✓\n"
+    "id: bad\0id\n\n"
+    "event: ignored-without-data\n\n"
+    "data: tail-without-blank-line\n"
+).encode()
+
+EXPECTED = [
+    SSEEvent("message", "first", "1", 2500),
+    SSEEvent("message", "multi\nline", "2", 2500),
+    SSEEvent("done", '{"ok": true}', "2", 2500),
+    SSEEvent("message", "ünïcödé ✓", "2", 2500),
+]
+
+
+def decode(data: bytes, size: int) -> list:
+    decoder = nia_docs.SSEDecoder()
+    events = []
+    for i in range(0, len(data), size):
+        events += decoder.feed(data[i : i + size])
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 16, len(STREAM)])
+def test_events_independent_of_chunking(size):
+    assert decode(STREAM, size) == EXPECTED
+
+
+def test_cr_split_from_lf_is_one_line_ending():
+    decoder = nia_docs.SSEDecoder()
+    assert decoder.feed(b"data: a\r") == []
+    assert decoder.feed(b"\n\r") == []
+    assert decoder.feed(b"\n") == [SSEEvent("message", "a", None, None)]
+
+
+def test_resume_state_is_kept():
+    decoder = nia_docs.SSEDecoder(last_event_id="7", retry=100)
+    assert decoder.feed(b"data: x\n\n") == [SSEEvent("message", "x", "7", 100)]
+    decoder.feed(b"id: 8\nretry: soon\n")
+    assert (decoder.last_event_id, decoder.retry) == ("8", 100)
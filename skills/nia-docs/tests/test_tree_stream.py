@@ -0,0 +1,71 @@
+"""JSONEvents + TreeStream against iter_tree_files, across chunk boundaries."""
+
+import json
+
+import pytest
+
+import nia_docs
+from nia_standin import StandIn
+
+SHAPES = [
+    # Nested names, as the stand-in (and the API) send them
+    StandIn(tree_files=120).tree(),
+    # Absolute paths in a flat list
+    {"files": [{"path": f"src/m{i}.py", "type": "file", "size": i} for i in range(30)]},
+    # A name -> subtree mapping
+    {"tree": {"docs": {"a.md": None, "guide": {"b.md": 1, "c.md": 2}}, "README": "x"}},
+    # Escapes, unicode and nested values inside file entries
+    {
+        "tree": [
+            {
+                "name": 'd"ir\\é',
+                "type": "dir",
+                "children": [
+                    {"name": "ünï .md", "type": "file", "meta": {"tags": ["a", 1.5e3]}},
+                    {"name": "n.md", "type": "file", "ok": True, "n": None, "size": -12},
+                ],
+            }
+        ]
+    },
+]
+
+
+def stream(body: bytes, size: int, keep=None) -> list:
+    parser, tree = nia_docs.JSONEvents(), nia_docs.TreeStream(keep)
+    out = []
+    for i in range(0, len(body), size):
+        out += tree.feed(parser.feed(body[i : i + size]))
+    return out + tree.feed(parser.feed(b"", final=True))
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("size", [1, 7, 64, 65536])
+def test_matches_iter_tree_files(shape, size):
+    body = json.dumps(shape, ensure_ascii=size % 2 == 0).encode()
+    assert stream(body, size) == list(nia_docs.iter_tree_files(shape))
+
+
+def test_filter_applies_to_full_paths():
+    shape = SHAPES[0]
+    keep = nia_docs.tree_filter("docs/dir_1", "*file_6?.md")
+    got = [path for path, _ in stream(json.dumps(shape).encode(), 13, keep)]
+    expected = [p for p, _ in nia_docs.iter_tree_files(shape) if keep(p)]
+    assert got == expected == [f"docs/dir_1/file_{i}.md" for i in range(60, 70)]
+
+
+def test_nested_names_are_emitted_before_end_of_input():
+    body = json.dumps(StandIn(tree_files=5000).tree()).encode()
+    parser, tree = nia_docs.JSONEvents(), nia_docs.TreeStream()
+    first = None
+    for i in range(0, len(body), 4096):
+        if tree.feed(parser.feed(body[i : i + 4096])) and first is None:
+            first = i
+    assert first is not None and first < len(body) // 10
+
+
+def test_truncated_input_raises():
+    body = json.dumps(SHAPES[1]).encode()
+    parser = nia_docs.JSONEvents()
+    parser.feed(body[:-5])
+    with pytest.raises(ValueError):
+        parser.feed(b"", final=True)